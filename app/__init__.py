@@ -2,13 +2,19 @@ import os
 import sys
 from flask import Flask
 from app.config import DevelopmentConfig, TestingConfig, ProductionConfig
-from app.extensions import db, ma, limiter
+from app.extensions import db, ma, limiter, cache
 from app.blueprints.mechanic import mechanic_bp
 from app.blueprints.service_ticket import service_ticket_bp
 from app.blueprints.customer import customer_bp
 from app.blueprints.inventory import inventory_bp
+from app.blueprints.invoice import invoice_bp
 from flask_swagger_ui import get_swaggerui_blueprint
 from flask_swagger import swagger
+from app.autho.utils import token_cache_stats, auth_metrics_stats, admin_token_required
+from app.autho.passwords import password_hasher, HashingQueueFull
+from app.events import init_event_hub, current_hub
+from app.response_cache import response_cache_stats
+from app.blueprints.inventory.ledger import init_stock_ledger
 
 CONFIGS = {
     "development": DevelopmentConfig,
@@ -28,6 +34,10 @@ def create_app(config_name: str = None):
 
     db.init_app(app)
     ma.init_app(app)
+    cache.init_app(app)
+    password_hasher.init_app(app)
+    init_event_hub(app)
+    init_stock_ledger(app)
     if limiter:
         limiter.init_app(app)
 
@@ -35,6 +45,7 @@ def create_app(config_name: str = None):
     app.register_blueprint(service_ticket_bp, url_prefix = "/service-tickets")
     app.register_blueprint(customer_bp, url_prefix = "/customers")
     app.register_blueprint(inventory_bp, url_prefix = "/inventory")
+    app.register_blueprint(invoice_bp, url_prefix = "/invoices")
 
     SWAGGER_URL = '/api/docs'
     API_URL = '/static/swagger.yaml'
@@ -65,7 +76,8 @@ def create_app(config_name: str = None):
                 'mechanics': '/mechanics/',
                 'customers': '/customers/', 
                 'service_tickets': '/service-tickets/',
-                'inventory': '/inventory/'
+                'inventory': '/inventory/',
+                'invoices': '/invoices/'
             }
         }
 
@@ -73,4 +85,20 @@ def create_app(config_name: str = None):
     def health():
         return {'status': 'healthy', 'database': 'connected', 'type': app.config.get('SQLALCHEMY_DATABASE_URI', 'unknown')}
 
+    @app.errorhandler(HashingQueueFull)
+    def hashing_busy(e):
+        return {'error': "Service is busy, please try again shortly."}, 503
+
+    @app.route('/metrics')
+    @admin_token_required
+    def metrics(admin_id):
+        return {
+            'token_cache': token_cache_stats(),
+            'auth': auth_metrics_stats(),
+            'password_hasher': password_hasher.stats(),
+            'event_hub': current_hub().stats(),
+            'response_cache': response_cache_stats(),
+            'stock_ledger': app.extensions['stock_ledger'].stats()
+        }
+
     return app
\ No newline at end of file
@@ -4,7 +4,13 @@ from .utils import (
     mechanic_token_required,
     customer_token_required,
     token_required,
-    get_token_info
+    get_token_info,
+    decode_token,
+    token_cache_stats,
+    roles_required,
+    Principal,
+    auth_metrics_stats,
+    register_auth_hook
 )
 
 encode_token = encode_customer_token
@@ -16,5 +22,11 @@ __all__ = [
     'customer_token_required',
     'token_required',
     'get_token_info',
+    'decode_token',
+    'token_cache_stats',
+    'roles_required',
+    'Principal',
+    'auth_metrics_stats',
+    'register_auth_hook',
     'encode_token'
 ]
\ No newline at end of file
@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app
+
+logger = logging.getLogger("app.autho")
+
+DEFAULT_SAMPLE_RATE = 0.0
+
+class AuthInstrumentation:
+    """Counters, latency timers and a sampled event hook for the auth layer.
+
+    Counters and timers are always on and cost a dict update under a lock.
+    Events are only built and handed to hooks / the trace logger when the
+    sampler picks them, so an idle hook costs nothing on the request path.
+    A field given as a callable is only called then, for values such as
+    token fingerprints that cost a hash to work out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hooks = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.events = Counter()
+            self.failures = Counter()
+            self.role_mismatches = Counter()
+            self.timers = {}
+
+    def register_hook(self, hook):
+        self._hooks.append(hook)
+        return hook
+
+    def unregister_hook(self, hook):
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def _settings(self):
+        try:
+            config = current_app.config
+        except RuntimeError:
+            return False, DEFAULT_SAMPLE_RATE
+        return bool(config.get('AUTH_TRACE_ENABLED')), float(config.get('AUTH_TRACE_SAMPLE_RATE', DEFAULT_SAMPLE_RATE))
+
+    def _emit(self, event, fields):
+        trace_enabled, sample_rate = self._settings()
+        if not self._hooks and not trace_enabled:
+            return
+        if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+            return
+
+        record = {'event': event, **{key: value() if callable(value) else value for key, value in fields.items()}}
+        if trace_enabled:
+            logger.info(f"AUTH_TRACE: {record}")
+        for hook in list(self._hooks):
+            try:
+                hook(record)
+            except Exception:
+                logger.exception(f"AUTH_HOOK_ERROR: {getattr(hook, '__name__', hook)}")
+
+    def record(self, event, **fields):
+        with self._lock:
+            self.events[event] += 1
+        self._emit(event, fields)
+
+    def failure(self, reason, **fields):
+        with self._lock:
+            self.events['failure'] += 1
+            self.failures[reason] += 1
+        self._emit('failure', {'reason': reason, **fields})
+
+    def role_mismatch(self, expected, actual, **fields):
+        with self._lock:
+            self.events['role_mismatch'] += 1
+            self.role_mismatches[f"{expected}:{actual}"] += 1
+        self._emit('role_mismatch', {'expected': expected, 'actual': actual, **fields})
+
+    def observe(self, name, elapsed_ms):
+        with self._lock:
+            timer = self.timers.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            timer['count'] += 1
+            timer['total_ms'] += elapsed_ms
+            if elapsed_ms > timer['max_ms']:
+                timer['max_ms'] = elapsed_ms
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def stats(self):
+        with self._lock:
+            timers = {
+                name: {
+                    'count': timer['count'],
+                    'avg_ms': round(timer['total_ms'] / timer['count'], 4) if timer['count'] else 0.0,
+                    'max_ms': round(timer['max_ms'], 4)
+                } for name, timer in self.timers.items()
+            }
+            return {
+                'events': dict(self.events),
+                'failures': dict(self.failures),
+                'role_mismatches': dict(self.role_mismatches),
+                'timers': timers
+            }
+
+def token_fingerprint(token):
+    if not token:
+        return None
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:12]
+
+auth_metrics = AuthInstrumentation()
@@ -0,0 +1,141 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_HASH_METHOD = "scrypt:32768:8:1"
+
+class HashingQueueFull(Exception):
+    pass
+
+class PasswordHasher:
+    """Runs werkzeug's KDF on a small, bounded thread pool.
+
+    PASSWORD_HASH_WORKERS caps how many hashes run at once and
+    PASSWORD_HASH_MAX_QUEUE caps how many may wait behind them; callers past
+    that get HashingQueueFull instead of piling onto the CPU. Stored hashes
+    whose method prefix differs from PASSWORD_HASH_METHOD are reported by
+    needs_rehash() so logins can upgrade them in place. The comparison is
+    against the prefix werkzeug actually writes for the method, which spells
+    out defaults ("pbkdf2:sha256" is stored as "pbkdf2:sha256:1000000"), so
+    it is taken from a real hash once per method and kept.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._workers = None
+        self._lock = threading.Lock()
+        self._prefixes = {}
+        self.queued = 0
+        self.in_flight = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.wait_ms_total = 0.0
+        self.run_ms_total = 0.0
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_MAX_QUEUE', 32)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+        app.extensions['password_hasher'] = self
+
+    @property
+    def method(self):
+        return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._workers = int(current_app.config.get('PASSWORD_HASH_WORKERS', 2))
+                    self._executor = ThreadPoolExecutor(max_workers = self._workers, thread_name_prefix = "password-hash")
+        return self._executor
+
+    def _run(self, fn, *args):
+        config = current_app.config
+        max_queue = int(config.get('PASSWORD_HASH_MAX_QUEUE', 32))
+        timeout = config.get('PASSWORD_HASH_TIMEOUT', 10)
+        executor = self._get_executor()
+
+        with self._lock:
+            if self.queued >= max_queue:
+                self.rejected += 1
+                raise HashingQueueFull(f"{self.queued} password hashes already queued")
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.in_flight += 1
+                self.wait_ms_total += (started - submitted) * 1000
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self.completed += 1
+                    self.run_ms_total += (time.perf_counter() - started) * 1000
+
+        future = executor.submit(task)
+        try:
+            return future.result(timeout = timeout)
+        except FutureTimeout:
+            if future.cancel():
+                with self._lock:
+                    self.queued -= 1
+            raise HashingQueueFull("password hashing timed out")
+
+    def hash(self, password):
+        method = self.method
+        password_hash = self._run(generate_password_hash, password, method)
+        self._prefixes.setdefault(method, password_hash.split("$", 1)[0])
+        return password_hash
+
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def _prefix(self, method):
+        if method not in self._prefixes:
+            self._prefixes[method] = self._run(generate_password_hash, "", method).split("$", 1)[0]
+        return self._prefixes[method]
+
+    def needs_rehash(self, password_hash):
+        if not password_hash or "$" not in password_hash:
+            return True
+        return password_hash.split("$", 1)[0] != self._prefix(self.method)
+
+    def verify_and_update(self, password_hash, password):
+        if not self.verify(password_hash, password):
+            return False, None
+        if not self.needs_rehash(password_hash):
+            return True, None
+        new_hash = self.hash(password)
+        with self._lock:
+            self.rehashed += 1
+        return True, new_hash
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self._workers,
+                'queue_depth': self.queued,
+                'max_queue_depth': self.max_queued,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'rehashed': self.rehashed,
+                'avg_wait_ms': round(self.wait_ms_total / self.completed, 3) if self.completed else 0.0,
+                'avg_run_ms': round(self.run_ms_total / self.completed, 3) if self.completed else 0.0
+            }
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,73 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+TOKEN_CACHE_MAXSIZE = 4096
+
+class TokenCache:
+    """Bounded, process-local cache of verified JWT claims.
+
+    Entries are keyed by an HMAC-SHA256 of the raw token under the secret
+    that verified it, so rotating SECRET_KEY misses every entry made under
+    the old key, and are dropped once the token's ``exp`` passes, so a cached
+    entry never outlives the token. Callers get their own copy of the claims.
+    """
+
+    def __init__(self, maxsize = TOKEN_CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token, secret):
+        return hmac.new(secret.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).digest()
+
+    def get(self, token, secret = ""):
+        key = self._digest(token, secret)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(payload)
+
+    def put(self, token, payload, secret = ""):
+        expires_at = payload.get('exp')
+        if not isinstance(expires_at, (int, float)) or self.maxsize <= 0:
+            return
+        key = self._digest(token, secret)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last = False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize
+            }
+
+token_cache = TokenCache()
@@ -1,30 +1,70 @@
 from jose import jwt, JWTError
 from flask import request, jsonify, current_app
-from functools import wraps
+from functools import wraps, partial
+from collections import namedtuple
 from datetime import datetime, timedelta
 import os
-import traceback
-from flask import current_app
-from jose import jwt
+import time
+import logging
 import werkzeug.exceptions
+from .token_cache import token_cache
+from .instrumentation import auth_metrics, token_fingerprint
+
+logger = logging.getLogger(__name__)
 
 def get_secret_key():
     SECRET_KEY = os.environ.get("SECRET_KEY") or "mechanic-shop-development-secret-key-2025-very-long-and-secure-fixed"
 
     try:
         if current_app and current_app.config.get('SECRET_KEY'):
-            key = str(current_app.config['SECRET_KEY'])
-            print(f"Using Flask config secret key: {key[:20]}...")
-            return key
+            return str(current_app.config['SECRET_KEY'])
     except RuntimeError:
         pass
 
-    print(f"Using fixed development secret key: {SECRET_KEY[:1]}...")
     return SECRET_KEY
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480
 
+def _failure_reason(error):
+    if isinstance(error, jwt.ExpiredSignatureError):
+        return 'expired'
+    if isinstance(error, jwt.JWTClaimsError):
+        return 'invalid_claims'
+    return 'invalid_token'
+
+def decode_token(token):
+    secret = get_secret_key()
+    payload = token_cache.get(token, secret)
+    if payload is not None:
+        auth_metrics.record('cache_hit')
+        return payload
+
+    start = time.perf_counter()
+    try:
+        payload = jwt.decode(token, secret, algorithms = [ALGORITHM])
+    except JWTError as e:
+        auth_metrics.failure(_failure_reason(e), token = partial(token_fingerprint, token), detail = str(e))
+        raise
+    finally:
+        auth_metrics.observe('decode', (time.perf_counter() - start) * 1000)
+
+    token_cache.put(token, payload, secret)
+    auth_metrics.record('decoded', role = payload.get('role'), token = partial(token_fingerprint, token))
+    return payload
+
+def _role_mismatch(expected, payload):
+    auth_metrics.role_mismatch(expected, payload.get('role'), sub = payload.get('sub'), endpoint = request.endpoint)
+
+def token_cache_stats():
+    return token_cache.stats()
+
+def auth_metrics_stats():
+    return auth_metrics.stats()
+
+def register_auth_hook(hook):
+    return auth_metrics.register_hook(hook)
+
 def encode_mechanic_token(mechanic_id):
     try:
         now = datetime.utcnow()
@@ -37,94 +77,56 @@ def encode_mechanic_token(mechanic_id):
             'iat': now
         }
         
-        secret_key = get_secret_key()
-        
-        print(f"Creating token:")
-        print(f"   Mechanic ID: {mechanic_id}")
-        print(f"   Secret key length: {len(secret_key)}")
-        print(f"   Expires: {expire}")
-
-        token = jwt.encode(payload, secret_key, algorithm = ALGORITHM)
-        
-        try:
-            decoded = jwt.decode(token, secret_key, algorithms = [ALGORITHM])
-            print(f"Token verification successful: {decoded}")
-        except Exception as verify_error:
-            print(f"Token verification failed: {verify_error}")
-            return None
-        
-        print(f"Token created successfully (length: {len(token)})")
+        token = jwt.encode(payload, get_secret_key(), algorithm = ALGORITHM)
+        auth_metrics.record('issued', role = 'mechanic', sub = str(mechanic_id), expires = str(expire))
         return token
         
     except Exception as e:
-        print(f"Token creation error: {e}")
-        traceback.print_exc()
+        logger.exception(f"MECHANIC_TOKEN_ERROR: Mechanic {mechanic_id} - {str(e)}")
         return None
 
 def mechanic_token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         try:
-            print(f"Auth check for {f.__name__}")
-            
             auth_header = request.headers.get("Authorization")
-            print(f"   Auth header present: {auth_header is not None}")
             
             if not auth_header:
-                print("   No Authorization header")
+                auth_metrics.failure('missing_header', endpoint = request.endpoint)
                 return jsonify({'error': "Missing Authorization header."}), 401
             
-            print(f"   Auth header: {auth_header[:30]}...")
-            
             if not auth_header.startswith("Bearer "):
-                print("   Invalid Authorization format")
+                auth_metrics.failure('malformed_header', endpoint = request.endpoint)
                 return jsonify({'error': "Invalid Authorization format. Use 'Bearer <token>'."}), 401
             
             token = auth_header.split(" ")[1].strip()
             
             if token.startswith('"') and token.endswith('"'):
                 token = token[1:-1]
-                print(f"   Removed quotes from token")
-            
-            print(f"   Token length: {len(token)}")
-            print(f"   Token starts with: {token[:20]}...")
-            print(f"   Token ends with: ...{token[-20:]}")
-            
-            secret_key = get_secret_key()
-            print(f"   Secret key length: {len(secret_key)}")
             
             try:
-                payload = jwt.decode(token, secret_key, algorithms = [ALGORITHM])
-                print(f"   Token decoded: {payload}")
+                payload = decode_token(token)
             except JWTError as jwt_err:
-                print(f"   JWT decode error: {jwt_err}")
-                print(f"   Token being decoded: {token}")
                 return jsonify({'error': f"Token decode failed: {str(jwt_err)}"}), 401
             
             exp_time = payload.get('exp')
             if isinstance(exp_time, datetime):
-                now = datetime.utcnow()
-                if exp_time <= now:
-                    print(f"   Token expired: {exp_time} <= {now}")
+                if exp_time <= datetime.utcnow():
+                    auth_metrics.failure('expired', endpoint = request.endpoint)
                     return jsonify({'error': "Token expired"}), 401
-                print(f"   Token valid until: {exp_time}")
             
-            role = payload.get('role')
-            if role != 'mechanic':
-                print(f"   Wrong role: {role}")
+            if payload.get('role') != 'mechanic':
+                _role_mismatch('mechanic', payload)
                 return jsonify({'error': "Mechanic access required"}), 403
             
             mechanic_id = int(payload['sub'])
-            print(f"   Access granted to mechanic {mechanic_id}")
             
             return f(mechanic_id, *args, **kwargs)
         
-        except werkzeug.exceptions.NotFound as nf:
-            
+        except werkzeug.exceptions.NotFound:
             raise
         except Exception as e:
-            print(f"   Unexpected error: {e}")
-            traceback.print_exc()
+            logger.exception(f"MECHANIC_AUTH_ERROR: {f.__name__} - {str(e)}")
             return jsonify({'error': "Authentication failed"}), 401
     
     return decorated
@@ -144,10 +146,12 @@ def encode_customer_token(customer_id):
             'iat': now
         }
         
-        return jwt.encode(payload, get_secret_key(), algorithm = ALGORITHM)
+        token = jwt.encode(payload, get_secret_key(), algorithm = ALGORITHM)
+        auth_metrics.record('issued', role = 'customer', sub = str(customer_id))
+        return token
         
     except Exception as e:
-        print(f"Customer token error: {e}")
+        logger.exception(f"CUSTOMER_TOKEN_ERROR: Customer {customer_id} - {str(e)}")
         return None
 
 def customer_token_required(f):
@@ -157,6 +161,7 @@ def customer_token_required(f):
             auth_header = request.headers.get("Authorization")
             
             if not auth_header or not auth_header.startswith("Bearer "):
+                auth_metrics.failure('missing_header' if not auth_header else 'malformed_header', endpoint = request.endpoint)
                 return jsonify({'error': "Missing or invalid token"}), 401
             
             token = auth_header.split(" ")[1].strip()
@@ -164,9 +169,10 @@ def customer_token_required(f):
             if token.startswith('"') and token.endswith('"'):
                 token = token[1:-1]
             
-            payload = jwt.decode(token, get_secret_key(), algorithms = [ALGORITHM])
+            payload = decode_token(token)
             
             if payload.get("role") != "customer":
+                _role_mismatch('customer', payload)
                 return jsonify({'error': "Customer access required"}), 403
                 
             customer_id = int(payload['sub'])
@@ -184,6 +190,7 @@ def token_required(f):
     def decorated(*args, **kwargs):
         auth_header = request.headers.get("Authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
+            auth_metrics.failure('missing_header' if not auth_header else 'malformed_header', endpoint = request.endpoint)
             return jsonify({'error': "Missing or invalid token"}), 401
         
         token = auth_header.split(" ")[1].strip()
@@ -192,7 +199,7 @@ def token_required(f):
             token = token[1:-1]
             
         try:
-            payload = jwt.decode(token, get_secret_key(), algorithms = [ALGORITHM])
+            payload = decode_token(token)
             user_id = payload.get("customer_id") or payload.get("sub")
             if user_id:
                 user_id = int(user_id)
@@ -204,7 +211,7 @@ def token_required(f):
 
 def get_token_info(token):
     try:
-        payload = jwt.decode(token, get_secret_key(), algorithms = [ALGORITHM])
+        payload = decode_token(token)
         exp_time = payload.get('exp')
         
         if isinstance(exp_time, datetime):
@@ -241,10 +248,11 @@ def encode_admin_token(admin_id):
         }
         
         token = jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm = 'HS256')
+        auth_metrics.record('issued', role = 'admin', sub = str(admin_id))
         return token
         
     except Exception as e:
-        print(f"Admin token encoding error: {e}")
+        logger.exception(f"ADMIN_TOKEN_ERROR: Admin {admin_id} - {str(e)}")
         return None
 
 def admin_token_required(f):
@@ -254,19 +262,20 @@ def admin_token_required(f):
             auth_header = request.headers.get('Authorization')
             
             if not auth_header:
+                auth_metrics.failure('missing_header', endpoint = request.endpoint)
                 return jsonify({'error': 'Authorization header required.'}), 401
             
             if not auth_header.startswith('Bearer '):
+                auth_metrics.failure('malformed_header', endpoint = request.endpoint)
                 return jsonify({'error': 'Invalid authorization header format.'}), 401
             
             token = auth_header.split(' ')[1]
             
-            secret_key = current_app.config.get('SECRET_KEY')
-            
             try:
-                payload = jwt.decode(token, secret_key, algorithms = ['HS256'])
+                payload = decode_token(token)
                 
                 if payload.get('role') != 'admin':
+                    _role_mismatch('admin', payload)
                     return jsonify({'error': 'Admin access required'}), 403
                 
                 admin_id = int(payload['sub'])
@@ -275,7 +284,7 @@ def admin_token_required(f):
                 
             except jwt.ExpiredSignatureError:
                 return jsonify({'error': 'Token has expired'}), 401
-            except jwt.InvalidTokenError:
+            except JWTError:
                 return jsonify({'error': 'Invalid token'}), 401
                 
         except Exception as e:
@@ -284,25 +293,60 @@ def admin_token_required(f):
     return decorated
 
 def decode_admin_token(token):
-    secret_key = current_app.config.get('SECRET_KEY')
     try:
-        payload = jwt.decode(token, secret_key, algorithms = ['HS256'])
+        payload = decode_token(token)
         if payload.get('role') != 'admin':
             return None
         return int(payload['sub'])
     except Exception as e:
-        print(f"decode_admin_token error: {e}")
+        logger.debug(f"decode_admin_token error: {e}")
         return None
-    
-from flask import current_app
-from jose import jwt
+
 def decode_mechanic_token(token):
-    secret_key = current_app.config.get('SECRET_KEY')
     try:
-        payload = jwt.decode(token, secret_key, algorithms = ['HS256'])
+        payload = decode_token(token)
         if payload.get('role') != 'mechanic':
             return None
         return int(payload['sub'])
     except Exception as e:
-        print(f"decode_mechanic_token error: {e}")
-        return None
\ No newline at end of file
+        logger.debug(f"decode_mechanic_token error: {e}")
+        return None
+
+class Principal(namedtuple('Principal', ['role', 'id'])):
+    __slots__ = ()
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def label(self):
+        return self.role.capitalize()
+
+def roles_required(*roles):
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            token = request.headers.get('Authorization', '').replace('Bearer ', '').strip()
+
+            if token.startswith('"') and token.endswith('"'):
+                token = token[1:-1]
+
+            if not token:
+                auth_metrics.failure('missing_header', endpoint = request.endpoint)
+                return jsonify({'error': 'Authorization token required.'}), 401
+
+            try:
+                payload = decode_token(token)
+                principal = Principal(payload.get('role'), int(payload['sub']))
+            except (JWTError, KeyError, TypeError, ValueError):
+                return jsonify({'error': 'Invalid or expired token.'}), 401
+
+            if principal.role not in roles:
+                _role_mismatch("|".join(roles), payload)
+                allowed = " or ".join(role.capitalize() for role in roles)
+                return jsonify({'error': f"{allowed} access required"}), 403
+
+            return f(principal, *args, **kwargs)
+        return decorated
+    return decorator
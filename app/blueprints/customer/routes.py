@@ -1,29 +1,23 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy import select
 from . import customer_bp
 from app.models import Customer, ServiceTicket
 from .schemas import login_schema, customer_schema, customers_schema
-from app.extensions import db
+from app.extensions import db, limiter
+from app.autho.passwords import password_hasher, HashingQueueFull
 from app.autho.utils import (encode_token, 
     encode_customer_token, token_required, 
     customer_token_required, admin_token_required
 )
 from app.blueprints.service_ticket.schemas import tickets_schema
+from app.blueprints.service_ticket.loaders import tickets_for_customer
+from app.dashboard_cache import invalidate_dashboards, mechanics_for_customer
+from app.serializers import dump_many
 import logging
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from flask import current_app
 
 logging.basicConfig(level = logging.INFO)
 logger = logging.getLogger(__name__)
 
-limiter = Limiter(
-    key_func = get_remote_address,
-    app = current_app,
-    default_limits = []
-)
-
 @customer_bp.route("/", methods = ['POST'])
 @admin_token_required
 def create_customer(admin_id):
@@ -38,13 +32,17 @@ def create_customer(admin_id):
         if 'password' not in data or not data['password']:
             return jsonify({'error': "Password required for new customers."}), 400
         
-        new_customer.password = generate_password_hash(data['password'])
+        new_customer.password = password_hasher.hash(data['password'])
         
         db.session.add(new_customer)
         db.session.commit()
         
         logger.info(f"ADMIN_CUSTOMER_CREATE: Admin {admin_id} created customer {new_customer.id}.")
         return customer_schema.jsonify(new_customer), 201    
+    except HashingQueueFull as e:
+        db.session.rollback()
+        logger.warning(f"ADMIN_CUSTOMER_CREATE_BUSY: Admin {admin_id} - {str(e)}")
+        return jsonify({'error': "Service is busy, please try again shortly."}), 503
     except Exception as e:
         db.session.rollback()
         logger.error(f"ADMIN_CUSTOMER_CREATE_ERROR: Admin {admin_id} - {str(e)}")
@@ -69,10 +67,25 @@ def login_customer():
         logger.warning(f"LOGIN_FAILED: Customer not found or no password set - Email: {valid_data.get('email', 'unknown')}")
         return jsonify({'error': "Please set up your password first."}), 401
     
-    if not check_password_hash(customer.password, valid_data["password"]):
+    try:
+        password_ok, upgraded_hash = password_hasher.verify_and_update(customer.password, valid_data["password"])
+    except HashingQueueFull as e:
+        logger.warning(f"LOGIN_BUSY: Customer ID: {customer.id} - {str(e)}")
+        return jsonify({'error': "Login is busy, please try again shortly."}), 503
+    
+    if not password_ok:
         logger.warning(f"LOGIN_FAILED: Invalid password - Customer ID: {customer.id}")
         return jsonify({'error': "Invalid email or password."}), 401
     
+    if upgraded_hash:
+        try:
+            customer.password = upgraded_hash
+            db.session.commit()
+            logger.info(f"PASSWORD_REHASH: Customer {customer.id} password hash upgraded.")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"PASSWORD_REHASH_ERROR: Customer {customer.id} - {str(e)}")
+    
     logger.info(f"LOGIN_SUCCESS: Customer {customer.id} logged in successfully.")
     token = encode_customer_token(customer.id)
     
@@ -107,7 +120,7 @@ def register_customer():
         if len(data['password']) < 8:
             return jsonify({'error': "Password must be at least 8 characters."}), 400
         
-        new_customer.password = generate_password_hash(data['password'])
+        new_customer.password = password_hasher.hash(data['password'])
         
         db.session.add(new_customer)
         db.session.commit()
@@ -115,6 +128,10 @@ def register_customer():
         logger.info(f"CUSTOMER_REGISTER: Customer {new_customer.id} registered.")
         return customer_schema.jsonify(new_customer), 201
         
+    except HashingQueueFull as e:
+        db.session.rollback()
+        logger.warning(f"CUSTOMER_REGISTER_BUSY: {str(e)}")
+        return jsonify({'error': "Service is busy, please try again shortly."}), 503
     except Exception as e:
         db.session.rollback()
         logger.error(f"CUSTOMER_REGISTER_ERROR: {str(e)}")
@@ -123,8 +140,8 @@ def register_customer():
 @customer_bp.route("/my-tickets", methods = ['GET'])
 @customer_token_required
 def get_my_tickets(customer_id):
-    tickets = ServiceTicket.query.filter_by(customer_id = customer_id).all()
-    return tickets_schema.jsonify(tickets)
+    tickets = tickets_for_customer(customer_id).all()
+    return jsonify(dump_many(tickets_schema, tickets))
 
 @customer_bp.route("/", methods = ['GET'])
 @admin_token_required
@@ -206,13 +223,18 @@ def admin_update_customer(admin_id, id):
         if password:
             if len(password) < 8:
                 return jsonify({'error': "Password must be at least 8 characters."}), 400
-            customer.password = generate_password_hash(password)
+            customer.password = password_hasher.hash(password)
         
         db.session.commit()
+        invalidate_dashboards(mechanics_for_customer(id))
         
         logger.info(f"ADMIN_CUSTOMER_UPDATE: Admin {admin_id} updated customer {id}")
         return customer_schema.jsonify(customer)
         
+    except HashingQueueFull as e:
+        db.session.rollback()
+        logger.warning(f"ADMIN_CUSTOMER_UPDATE_BUSY: Admin {admin_id} - {str(e)}")
+        return jsonify({'error': "Service is busy, please try again shortly."}), 503
     except Exception as e:
         db.session.rollback()
         logger.error(f"ADMIN_CUSTOMER_UPDATE_ERROR: Admin {admin_id} - {str(e)}")
@@ -239,7 +261,7 @@ def update_customer_profile(current_customer_id, id):
             if not old_password:
                 return jsonify({'error': "Old password required when changing password."}), 400
             
-            if not customer.password or not check_password_hash(customer.password, old_password):
+            if not customer.password or not password_hasher.verify(customer.password, old_password):
                 return jsonify({'error': "Current password is incorrect."}), 401
             
             if old_password == new_password:
@@ -248,7 +270,7 @@ def update_customer_profile(current_customer_id, id):
             if len(new_password) < 8:
                 return jsonify({'error': "New password must be at least 8 characters long."}), 400
             
-            customer.password = generate_password_hash(new_password)
+            customer.password = password_hasher.hash(new_password)
             data.pop('password', None)
             data.pop('old_password', None)
         
@@ -263,10 +285,15 @@ def update_customer_profile(current_customer_id, id):
             updated_customer = customer_schema.load(data, instance = customer, partial = True)
         
         db.session.commit()
+        invalidate_dashboards(mechanics_for_customer(id))
         
         logger.info(f"CUSTOMER_UPDATE: Customer {current_customer_id} updated profile.")
         return customer_schema.jsonify(customer)
         
+    except HashingQueueFull as e:
+        db.session.rollback()
+        logger.warning(f"CUSTOMER_UPDATE_BUSY: Customer {current_customer_id} - {str(e)}")
+        return jsonify({'error': "Service is busy, please try again shortly."}), 503
     except Exception as e:
         db.session.rollback()
         logger.error(f"CUSTOMER_UPDATE_ERROR: Customer {current_customer_id} - {str(e)}")
@@ -279,9 +306,11 @@ def admin_delete_customer(admin_id, id):
         customer = Customer.query.get_or_404(id)
         customer_email = customer.email
         customer_name = customer.name
+        mechanic_ids = mechanics_for_customer(id)
         
         db.session.delete(customer)
         db.session.commit()
+        invalidate_dashboards(mechanic_ids)
         
         logger.info(f"ADMIN_CUSTOMER_DELETE: Admin {admin_id} deleted customer {id} ({customer_email})")
         return jsonify({'message': f"Customer {customer_name} has been deleted successfully."}), 200
@@ -8,6 +8,7 @@ class CustomerSchema(ma.SQLAlchemyAutoSchema):
         model = Customer
         load_instance = True
         include_fk = True
+        dump_only = ("version",)
 
     password = fields.String(load_only = True, validate = fields.Length(min = 8))   
     created_at = fields.DateTime(format = '%Y-%m-%d %H:%M:%S', dump_only = True)
@@ -0,0 +1,310 @@
+import csv
+import io
+import json
+import time
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import db
+from app.models import Inventory, to_cents
+from app.versioning import bump_counters
+from app.dashboard_cache import invalidate_dashboards, mechanics_for_parts
+from app.response_cache import invalidate_part_responses
+from app.blueprints.inventory.low_stock import is_low, note_stock_level
+from app.blueprints.inventory.search import vocabulary
+from app.blueprints.inventory.ledger import record_movements
+
+# Supplier price lists are imported as a stream: rows are read off the
+# request body one line at a time, validated, and written in chunks of
+# INVENTORY_IMPORT_CHUNK_SIZE distinct part names. Each chunk commits on its
+# own, so memory and lock time stay bounded however long the file is. A row
+# that fails validation is reported and skipped; it never stops the import.
+#
+# A chunk is written in three statements. New parts go in with one
+# executemany INSERT ... ON CONFLICT (name) DO NOTHING RETURNING, so the
+# database itself says which names it inserted, even if another request
+# created one of them a moment earlier. The rest are then read with
+# SELECT ... FOR UPDATE, which pins their current stock until the commit,
+# and updated by name. Rows that leave out the price can only update an
+# existing part.
+#
+# Rows only set the columns they supply, so a price list with just name and
+# price leaves stock levels alone. A part named twice in one chunk takes its
+# last row.
+#
+# Quantities that change go to the stock ledger like any other write (new
+# parts as receipts, updated ones as adjustments), and parts that end up at
+# or under their reorder point publish inventory.low_stock.
+
+IMPORT_COLUMNS = ('name', 'description', 'price', 'quantity', 'reorder_point')
+EXPORT_COLUMNS = ('id', 'name', 'description', 'price', 'quantity', 'reorder_point')
+NAME_LENGTH = Inventory.__table__.c.name.type.length
+DESCRIPTION_LENGTH = Inventory.__table__.c.description.type.length
+
+class RowError(ValueError):
+    pass
+
+class ImportFormatError(ValueError):
+    pass
+
+def _count(raw, key):
+    value = raw[key]
+    try:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError
+        value = int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{key} must be a whole number.")
+    if value < 0:
+        raise RowError(f"{key} cannot be negative.")
+    return value
+
+def clean_row(raw):
+    """Column values for one imported row, only those the row supplies."""
+    if not isinstance(raw, dict):
+        raise RowError("Row is not a JSON object.")
+    raw = {key: value for key, value in raw.items() if key in IMPORT_COLUMNS and value not in (None, '')}
+
+    name = raw.get('name')
+    if not isinstance(name, str) or not name.strip():
+        raise RowError("Part name is required.")
+    name = name.strip()
+    if len(name) > NAME_LENGTH:
+        raise RowError(f"Part name is longer than {NAME_LENGTH} characters.")
+    values = {'name': name}
+
+    if 'description' in raw:
+        description = str(raw['description'])
+        if len(description) > DESCRIPTION_LENGTH:
+            raise RowError(f"Description is longer than {DESCRIPTION_LENGTH} characters.")
+        values['description'] = description
+
+    if 'price' in raw:
+        try:
+            if isinstance(raw['price'], bool):
+                raise ValueError
+            price_cents = to_cents(raw['price'])
+        except (ArithmeticError, TypeError, ValueError):
+            raise RowError("price must be a number.")
+        if price_cents < 0:
+            raise RowError("price cannot be negative.")
+        values['price_cents'] = price_cents
+
+    for key in ('quantity', 'reorder_point'):
+        if key in raw:
+            values[key] = _count(raw, key)
+    return values
+
+def csv_rows(stream):
+    """(line number, row dict) for each record of a CSV body with a header."""
+    text = io.TextIOWrapper(stream, encoding = 'utf-8-sig', newline = '')
+    reader = csv.DictReader(text)
+    if reader.fieldnames is None:
+        return
+    if 'name' not in reader.fieldnames:
+        raise ImportFormatError("CSV header must include a name column.")
+    for row in reader:
+        row.pop(None, None)
+        yield reader.line_num, row
+
+def ndjson_rows(stream):
+    """(line number, decoded value) for each non-blank line of an NDJSON body."""
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+READERS = {'csv': csv_rows, 'ndjson': ndjson_rows}
+
+def _insert_new(dialect):
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    table = Inventory.__table__
+    return (insert(table)
+            .on_conflict_do_nothing(index_elements = ['name'])
+            .returning(table.c.id, table.c.name, table.c.quantity, table.c.reorder_point))
+
+class InventoryImport:
+    """Validates and upserts a stream of rows, counting what happened."""
+
+    def __init__(self, chunk_size = 1000, max_rejects = 100):
+        self.chunk_size = chunk_size
+        self.max_rejects = max_rejects
+        self.rows = self.inserted = self.updated = self.rejected = self.chunks = 0
+        self.rejects = []
+        self.elapsed = 0.0
+
+    def reject(self, number, message):
+        self.rejected += 1
+        if len(self.rejects) < self.max_rejects:
+            self.rejects.append({'line': number, 'error': message})
+
+    def run(self, rows):
+        start = time.perf_counter()
+        try:
+            chunk = {}
+            for number, raw in rows:
+                self.rows += 1
+                try:
+                    values = clean_row(raw)
+                except RowError as e:
+                    self.reject(number, str(e))
+                    continue
+                chunk[values['name']] = (number, values)
+                if len(chunk) >= self.chunk_size:
+                    self._write(chunk)
+                    chunk = {}
+            if chunk:
+                self._write(chunk)
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def _write(self, chunk):
+        self.chunks += 1
+        rows = [values for _, values in chunk.values()]
+        try:
+            inserted = {row.name: row for row in self._insert_new_parts([values for values in rows if 'price_cents' in values])}
+            existing = {row.name: row for row in db.session.execute(
+                select(Inventory.id, Inventory.name, Inventory.quantity, Inventory.reorder_point)
+                .where(Inventory.name.in_([name for name in chunk if name not in inserted]))
+                .with_for_update()
+            )}
+
+            updates = {}
+            unpriced = []
+            for values in rows:
+                if values['name'] in inserted:
+                    continue
+                if values['name'] not in existing:
+                    unpriced.append(chunk[values['name']][0])
+                    continue
+                updates.setdefault(tuple(sorted(values)), []).append(values)
+            for columns, group in updates.items():
+                self._update_parts(columns, group)
+            updated = [values for group in updates.values() for values in group]
+            if not inserted and not updated:
+                db.session.rollback()
+                self._reject_unpriced(unpriced)
+                return
+            bump_counters('inventory')
+
+            movements = []
+            for new in inserted.values():
+                movements.append({'inventory_id': new.id, 'kind': 'receipt', 'change': new.quantity})
+                note_stock_level(db.session, new.id, new.name, False, new.quantity, new.reorder_point)
+            for values in updated:
+                old = existing[values['name']]
+                if 'quantity' in values:
+                    movements.append({'inventory_id': old.id, 'kind': 'adjustment', 'change': values['quantity'] - old.quantity})
+                if 'quantity' in values or 'reorder_point' in values:
+                    note_stock_level(db.session, old.id, old.name, is_low(old.quantity, old.reorder_point),
+                                     values.get('quantity', old.quantity), values.get('reorder_point', old.reorder_point))
+            record_movements(movements)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for number, _ in chunk.values():
+                self.reject(number, f"Chunk was not saved: {getattr(e, 'orig', e)}")
+            return
+
+        self._reject_unpriced(unpriced)
+        updated_ids = [existing[values['name']].id for values in updated]
+        self.inserted += len(inserted)
+        self.updated += len(updated_ids)
+
+        spelling = vocabulary()
+        for name in inserted:
+            spelling.add_name(name)
+        invalidate_part_responses(updated_ids)
+        if updated_ids:
+            invalidate_dashboards(mechanics_for_parts(updated_ids))
+
+    def _reject_unpriced(self, numbers):
+        # Recorded once the chunk's outcome is known, so a chunk that then
+        # fails reports each of its lines only once.
+        for number in numbers:
+            self.reject(number, "Part price is required for a new part.")
+
+    def _insert_new_parts(self, rows):
+        """Insert the rows whose names are free; (id, name, quantity,
+        reorder_point) of each part actually inserted."""
+        groups = {}
+        for values in rows:
+            groups.setdefault(tuple(sorted(values)), []).append(values)
+        dialect = db.session.get_bind().dialect.name
+        inserted = []
+        for group in groups.values():
+            if dialect in ('sqlite', 'postgresql'):
+                inserted += db.session.execute(_insert_new(dialect), group).all()
+                continue
+            taken = set(db.session.scalars(select(Inventory.name).where(Inventory.name.in_([values['name'] for values in group]))))
+            new_rows = [values for values in group if values['name'] not in taken]
+            if new_rows:
+                db.session.execute(Inventory.__table__.insert(), new_rows)
+                inserted += db.session.execute(
+                    select(Inventory.id, Inventory.name, Inventory.quantity, Inventory.reorder_point)
+                    .where(Inventory.name.in_([values['name'] for values in new_rows]))
+                ).all()
+        return inserted
+
+    def _update_parts(self, columns, rows):
+        table = Inventory.__table__
+        changes = {column: bindparam(f"new_{column}") for column in columns if column != 'name'}
+        db.session.execute(
+            update(table).where(table.c.name == bindparam('match_name')).values({**changes, 'version': table.c.version + 1}),
+            [{'match_name': values['name'], **{f"new_{column}": value for column, value in values.items()}} for values in rows]
+        )
+
+    @property
+    def summary(self):
+        elapsed = round(self.elapsed, 3)
+        return {
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'rejected': self.rejected,
+            'chunks': self.chunks,
+            'elapsed_seconds': elapsed,
+            'rows_per_second': round(self.rows / self.elapsed) if self.elapsed else self.rows,
+            'rejects': sorted(self.rejects, key = lambda reject: reject['line'])
+        }
+
+def _price_text(price_cents):
+    return f"{price_cents // 100}.{price_cents % 100:02d}"
+
+def export_rows(batch_size):
+    """Every part as a tuple of EXPORT_COLUMNS, in id order, batch_size rows at a time."""
+    statement = (select(Inventory.id, Inventory.name, Inventory.description, Inventory.price_cents,
+                        Inventory.quantity, Inventory.reorder_point)
+                 .order_by(Inventory.id)
+                 .execution_options(yield_per = batch_size))
+    for partition in db.session.execute(statement).partitions():
+        yield partition
+
+def export_csv(batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for partition in export_rows(batch_size):
+        writer.writerows((part_id, name, description or '', _price_text(price_cents), quantity, reorder_point)
+                         for part_id, name, description, price_cents, quantity, reorder_point in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_ndjson(batch_size, dumps = json.dumps):
+    for partition in export_rows(batch_size):
+        yield "".join(
+            dumps({'id': part_id, 'name': name, 'description': description, 'price': price_cents / 100,
+                   'quantity': quantity, 'reorder_point': reorder_point}) + "\n"
+            for part_id, name, description, price_cents, quantity, reorder_point in partition
+        )
+
+EXPORTERS = {'csv': (export_csv, "text/csv"), 'ndjson': (export_ndjson, "application/x-ndjson")}
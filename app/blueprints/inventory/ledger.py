@@ -0,0 +1,262 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, inspect, select, insert, delete, func, and_, false, literal
+from app.extensions import db
+from app.models import Inventory, StockMovement, StockSnapshot
+
+# Every change to a part's stock is also appended to stock_movement, in the
+# transaction that makes it: receipts when a part is added, reservations
+# and releases from ticket parts, and adjustments when a quantity is set or
+# a part deleted. Inventory.quantity stays the live figure that reservations
+# check against; the ledger is its history and never changes once written.
+#
+# Reading a balance from the ledger alone would mean summing a part's whole
+# history, so a background thread periodically folds each part's new
+# movements into a stock_snapshot row: (part, last movement folded in,
+# quantity). The on-hand at any moment is then the latest snapshot at or
+# before it plus the few movements after that snapshot, two index range
+# reads. Snapshots are appended too, which is what keeps point-in-time
+# queries cheap.
+#
+# Compaction tracks how far it got per part, not across the whole table.
+# Movement ids are handed out when a transaction inserts, not when it
+# commits, so a global "everything up to id N" mark would step over a slow
+# transaction's lower id for good. Within one part that can't happen: every
+# stock write updates (or inserts, or deletes) the part's row before it
+# appends the movement, so writers to the same part take their ids one at
+# a time behind its row lock, in commit order. Whatever a part's newest
+# committed movement is, all of its earlier ones have committed too.
+#
+# Only one compactor should run against a database. The interval defaults
+# to off, so web workers, init_db.py and the benchmarks never start one;
+# run compact_stock_ledger.py as its own process, or set
+# STOCK_SNAPSHOT_INTERVAL on a single-process deployment. Each pass also
+# takes a lock first (an advisory lock on PostgreSQL, the database write
+# lock on SQLite), so a second compactor skips or waits instead of writing
+# the same snapshots.
+
+COMPACTION_LOCK_KEY = 0x534C4447
+
+logger = logging.getLogger(__name__)
+
+MOVEMENT_KINDS = ('opening', 'receipt', 'reservation', 'release', 'adjustment')
+
+movements = StockMovement.__table__
+snapshots = StockSnapshot.__table__
+
+def record_movements(rows, connection = None):
+    """Append movements to the ledger in the current transaction.
+
+    rows are dicts of inventory_id, kind, change and, optionally,
+    service_ticket_id; rows that change nothing are skipped.
+    """
+    now = datetime.utcnow()
+    rows = [{'service_ticket_id': None, 'created_at': now, **row} for row in rows if row['change']]
+    if rows:
+        (connection or db.session).execute(insert(movements), rows)
+
+def _committed_quantity(obj):
+    history = inspect(obj).attrs.quantity.history
+    if history.deleted:
+        return history.deleted[0]
+    return obj.quantity
+
+@event.listens_for(db.session, "after_flush")
+def _record_flushed_movements(session, flush_context):
+    rows = []
+    for obj in session.new:
+        if isinstance(obj, Inventory):
+            rows.append({'inventory_id': obj.id, 'kind': 'receipt', 'change': obj.quantity or 0})
+    for obj in session.dirty:
+        if isinstance(obj, Inventory):
+            history = inspect(obj).attrs.quantity.history
+            if history.added and history.deleted:
+                rows.append({'inventory_id': obj.id, 'kind': 'adjustment', 'change': history.added[0] - history.deleted[0]})
+    for obj in session.deleted:
+        if isinstance(obj, Inventory):
+            rows.append({'inventory_id': obj.id, 'kind': 'adjustment', 'change': -(_committed_quantity(obj) or 0)})
+    record_movements(rows, session.connection())
+
+def ensure_stock_ledger():
+    """Bring every part's ledger in line with its quantity.
+
+    Parts whose movements don't add up to their quantity, whether they
+    predate the ledger entirely or were only partly recorded (a reservation
+    logged against stock that was never received), get an opening movement
+    for the difference. Parts already in balance are left alone, so running
+    it again changes nothing.
+    """
+    recorded = (select(func.coalesce(func.sum(movements.c.change), 0))
+                .where(movements.c.inventory_id == Inventory.id)
+                .scalar_subquery())
+    with db.engine.begin() as connection:
+        connection.execute(insert(movements).from_select(
+            ['inventory_id', 'kind', 'change', 'created_at'],
+            select(Inventory.id, literal('opening'), Inventory.quantity - recorded, literal(datetime.utcnow(), db.DateTime))
+            .where(Inventory.quantity != recorded)
+        ))
+
+def _latest_snapshots(inventory_ids):
+    latest = (select(snapshots.c.inventory_id, func.max(snapshots.c.movement_id).label('movement_id'))
+              .where(snapshots.c.inventory_id.in_(inventory_ids))
+              .group_by(snapshots.c.inventory_id)
+              .subquery())
+    rows = db.session.execute(
+        select(snapshots.c.inventory_id, snapshots.c.quantity)
+        .join(latest, and_(snapshots.c.inventory_id == latest.c.inventory_id, snapshots.c.movement_id == latest.c.movement_id))
+    )
+    return dict(rows.all())
+
+def _take_compaction_lock():
+    """True once this transaction holds the compactor lock, False if
+    another compactor holds it."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return db.session.scalar(select(func.pg_try_advisory_xact_lock(COMPACTION_LOCK_KEY)))
+    # A write that matches nothing still takes SQLite's write lock, so a
+    # second compactor waits here and then reads what the first one wrote.
+    db.session.execute(delete(snapshots).where(false()))
+    return True
+
+def compact_ledger(batch_size = 10000):
+    """Snapshot up to batch_size parts that have movements past their latest
+    snapshot, and commit. Returns how many snapshots were written."""
+    if not _take_compaction_lock():
+        db.session.rollback()
+        return 0
+    latest = (select(snapshots.c.inventory_id, func.max(snapshots.c.movement_id).label('movement_id'))
+              .group_by(snapshots.c.inventory_id)
+              .subquery())
+    totals = db.session.execute(
+        select(movements.c.inventory_id, func.sum(movements.c.change), func.max(movements.c.id))
+        .select_from(movements.outerjoin(latest, latest.c.inventory_id == movements.c.inventory_id))
+        .where(movements.c.id > func.coalesce(latest.c.movement_id, 0))
+        .group_by(movements.c.inventory_id)
+        .order_by(movements.c.inventory_id)
+        .limit(batch_size)
+    ).all()
+    if not totals:
+        db.session.rollback()
+        return 0
+
+    previous = _latest_snapshots([inventory_id for inventory_id, _, _ in totals])
+    db.session.execute(insert(snapshots), [
+        {'inventory_id': inventory_id, 'movement_id': last_id, 'quantity': previous.get(inventory_id, 0) + change}
+        for inventory_id, change, last_id in totals
+    ])
+    db.session.commit()
+    return len(totals)
+
+def on_hand(inventory_id, at = None):
+    """A part's quantity from the ledger, now or as of the datetime at."""
+    boundary = select(movements.c.id).where(movements.c.inventory_id == inventory_id)
+    if at is None:
+        boundary = boundary.order_by(movements.c.id.desc())
+    else:
+        boundary = boundary.where(movements.c.created_at <= at).order_by(movements.c.created_at.desc(), movements.c.id.desc())
+    movement_id = db.session.scalar(boundary.limit(1))
+    result = {'inventory_id': inventory_id, 'at': at.isoformat() if at else None, 'quantity': 0,
+              'movement_id': movement_id, 'snapshot_movement_id': None, 'tail_movements': 0}
+    if movement_id is None:
+        return result
+
+    snapshot = db.session.execute(
+        select(snapshots.c.movement_id, snapshots.c.quantity)
+        .where(snapshots.c.inventory_id == inventory_id, snapshots.c.movement_id <= movement_id)
+        .order_by(snapshots.c.movement_id.desc())
+        .limit(1)
+    ).first()
+    start, base = snapshot or (0, 0)
+    count, total = db.session.execute(
+        select(func.count(), func.coalesce(func.sum(movements.c.change), 0))
+        .where(movements.c.inventory_id == inventory_id, movements.c.id > start, movements.c.id <= movement_id)
+    ).one()
+    result.update(quantity = base + total, snapshot_movement_id = snapshot[0] if snapshot else None, tail_movements = count)
+    return result
+
+def movement_page(inventory_id, limit, before = None):
+    """A part's movements, newest first, limit at a time."""
+    statement = select(StockMovement).where(StockMovement.inventory_id == inventory_id)
+    if before is not None:
+        statement = statement.where(StockMovement.id < before)
+    return db.session.scalars(statement.order_by(StockMovement.id.desc()).limit(limit)).all()
+
+class LedgerCompactor:
+    """Runs compact_ledger every STOCK_SNAPSHOT_INTERVAL seconds on a daemon thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.snapshots = 0
+        self.failures = 0
+        self.last_run_ms = 0.0
+        self.last_error = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target = self._loop, name = "stock-ledger-compactor", daemon = True)
+                self._thread.start()
+
+    def stop(self, timeout = None):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.wait(self.app.config['STOCK_SNAPSHOT_INTERVAL']):
+            self.run_once()
+
+    def run_once(self):
+        """Compact until every part is caught up. Returns snapshots written."""
+        config = self.app.config
+        started = time.perf_counter()
+        written = 0
+        with self.app.app_context():
+            try:
+                while True:
+                    count = compact_ledger(config['STOCK_SNAPSHOT_BATCH_SIZE'])
+                    written += count
+                    if not count:
+                        break
+                error = None
+            except Exception as e:
+                db.session.rollback()
+                error = str(e)
+                logger.error(f"STOCK_LEDGER_COMPACTION_ERROR: {error}")
+            finally:
+                db.session.remove()
+
+        with self._lock:
+            self.runs += 1
+            self.snapshots += written
+            self.failures += error is not None
+            self.last_error = error
+            self.last_run_ms = round((time.perf_counter() - started) * 1000, 3)
+        return written
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self._thread is not None,
+                'runs': self.runs,
+                'snapshots_written': self.snapshots,
+                'failures': self.failures,
+                'last_run_ms': self.last_run_ms,
+                'last_error': self.last_error
+            }
+
+def init_stock_ledger(app):
+    app.config.setdefault('STOCK_SNAPSHOT_INTERVAL', 0)
+    app.config.setdefault('STOCK_SNAPSHOT_BATCH_SIZE', 10000)
+    compactor = app.extensions['stock_ledger'] = LedgerCompactor(app)
+    if app.config['STOCK_SNAPSHOT_INTERVAL'] > 0:
+        compactor.start()
+    return compactor
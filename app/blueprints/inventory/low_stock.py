@@ -0,0 +1,88 @@
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from app.extensions import db
+from app.models import Inventory
+
+# The low-stock list is kept by the database itself: ix_inventory_low_stock
+# only holds parts at or under their reorder point, ordered by how far under
+# they are, and every write that changes a quantity or reorder point (ORM
+# flushes and the set-based stock updates alike) maintains it in the same
+# transaction. Reading the first k entries is a k-row index walk no matter
+# how big the catalog is, and every worker sees the same list.
+#
+# Writes also note each part whose quantity or reorder point changed. When
+# the transaction commits, a part that went from above its reorder point to
+# at or under it publishes inventory.low_stock, and one that went back above
+# publishes inventory.restocked. A new part counts as coming from above, so
+# one created already short publishes inventory.low_stock too. A part that
+# dips and recovers within one transaction publishes nothing, and a rolled
+# back write is forgotten.
+
+PENDING_KEY = 'stock_levels'
+
+def is_low(quantity, reorder_point):
+    return quantity <= reorder_point
+
+def low_stock_parts(limit, threshold = None):
+    """Parts running short, most urgent first, at most limit of them.
+
+    By default that is every part at or under its own reorder point, most
+    units under first. With threshold, it is parts with at most threshold
+    units, fewest first.
+    """
+    if threshold is None:
+        statement = (select(Inventory)
+                     .where(Inventory.quantity <= Inventory.reorder_point)
+                     .order_by((Inventory.reorder_point - Inventory.quantity).desc(), Inventory.id))
+    else:
+        statement = (select(Inventory)
+                     .where(Inventory.quantity <= threshold)
+                     .order_by(Inventory.quantity, Inventory.id))
+    return db.session.scalars(statement.limit(limit)).all()
+
+def note_stock_level(session, inventory_id, name, was_low, quantity, reorder_point):
+    """Record a part's new level; was_low is its state before this change."""
+    pending = session.info.setdefault(PENDING_KEY, {})
+    first_was_low = pending[inventory_id][0] if inventory_id in pending else was_low
+    pending[inventory_id] = (first_was_low, name, quantity, reorder_point)
+
+def _previous(attr):
+    history = attr.history
+    if history.deleted:
+        return history.deleted[0]
+    return attr.value
+
+@event.listens_for(db.session, "after_flush")
+def _note_flushed_levels(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Inventory):
+            note_stock_level(session, obj.id, obj.name, False, obj.quantity, obj.reorder_point)
+    for obj in session.dirty:
+        if not isinstance(obj, Inventory):
+            continue
+        attrs = inspect(obj).attrs
+        if not (attrs.quantity.history.has_changes() or attrs.reorder_point.history.has_changes()):
+            continue
+        was_low = is_low(_previous(attrs.quantity), _previous(attrs.reorder_point))
+        note_stock_level(session, obj.id, obj.name, was_low, obj.quantity, obj.reorder_point)
+
+@event.listens_for(db.session, "after_commit")
+def _publish_crossings(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    hub = current_app.extensions.get('event_hub') if pending else None
+    if hub is None:
+        return
+
+    for inventory_id, (was_low, name, quantity, reorder_point) in sorted(pending.items()):
+        now_low = is_low(quantity, reorder_point)
+        if now_low != was_low:
+            hub.publish('inventory.low_stock' if now_low else 'inventory.restocked', {
+                'inventory_id': inventory_id,
+                'name': name,
+                'quantity': quantity,
+                'reorder_point': reorder_point
+            })
+
+@event.listens_for(db.session, "after_rollback")
+def _forget_levels(session):
+    session.info.pop(PENDING_KEY, None)
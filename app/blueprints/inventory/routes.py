@@ -1,10 +1,20 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app, Response, stream_with_context
 from app.extensions import db
 from app.blueprints.inventory import inventory_bp
 from app.models import Inventory
 from app.blueprints.inventory.schemas import inventory_schema, inventories_schema
-from app.autho.utils import mechanic_token_required
+from app.autho.utils import mechanic_token_required, roles_required
+from app.dashboard_cache import invalidate_dashboards, mechanics_for_part
+from app.serializers import dump_many
+from app.versioning import conditional, collection_versions
+from app.response_cache import cached_response, invalidate_part_responses
+from app.blueprints.inventory.search import search_parts, find_part_by_name, vocabulary
+from app.blueprints.inventory.low_stock import low_stock_parts
+from app.blueprints.inventory.ledger import on_hand, movement_page
+from app.blueprints.inventory.bulk import InventoryImport, ImportFormatError, READERS, EXPORTERS
+from app.events import requested_last_event_id, event_stream_response
 import logging
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +43,8 @@ def add_part(current_mechanic_id):
         new_part = inventory_schema.load(data)
         db.session.add(new_part)
         db.session.commit()
+        vocabulary().add_name(new_part.name)
+        invalidate_part_responses()
         
         logger.info(f"INVENTORY_ADD: Mechanic {current_mechanic_id} added this part '{new_part.name}' (ID: {new_part.id})")
         
@@ -44,6 +56,8 @@ def add_part(current_mechanic_id):
         return jsonify({'error': str(e)}), 400
 
 @inventory_bp.route("/", methods = ['GET'])
+@conditional(lambda: collection_versions('inventory'))
+@cached_response('inventory')
 def get_parts_public():
     page = request.args.get('page', 1, type = int)
     per_page = request.args.get('per_page', 20, type = int)
@@ -74,6 +88,7 @@ def get_parts_public():
     })
 
 @inventory_bp.route("/<int:id>", methods = ['GET'])
+@cached_response('part:{id}')
 def get_part_public(id):
     inventory = Inventory.query.get_or_404(id)
     
@@ -101,9 +116,7 @@ def search_parts_public():
     if limit < 1 or limit > 100:
         return jsonify({'error': "Limit must be between 1 and 100."}), 400
     
-    parts = Inventory.query.filter(
-        Inventory.name.ilike(f'%{query}%')
-    ).limit(limit).all()
+    parts = search_parts(query, limit)
     
     public_parts = []
     for part in parts:
@@ -117,8 +130,24 @@ def search_parts_public():
     
     return jsonify(public_parts)
 
+@inventory_bp.route("/autocomplete", methods = ['GET'])
+def autocomplete_parts():
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 10, type = int)
+    
+    if not query:
+        return jsonify({'error': "Search query required."}), 400
+    
+    if limit < 1 or limit > 20:
+        return jsonify({'error': "Limit must be between 1 and 20."}), 400
+    
+    parts = search_parts(query, limit)
+    
+    return jsonify([{'id': part.id, 'name': part.name} for part in parts])
+
 @inventory_bp.route("/mechanic/", methods = ['GET'])
 @mechanic_token_required
+@conditional(lambda current_mechanic_id: collection_versions('inventory'))
 def get_parts_mechanic(current_mechanic_id):
     page = request.args.get('page', 1, type = int)
     per_page = request.args.get('per_page', 20, type = int)
@@ -134,7 +163,7 @@ def get_parts_mechanic(current_mechanic_id):
     logger.info(f"MECHANIC_INVENTORY_VIEW: Mechanic {current_mechanic_id} viewed parts with pricing (Page: {page}).")
     
     return jsonify({
-        'parts': inventories_schema.dump(parts.items), 
+        'parts': dump_many(inventories_schema, parts.items), 
         'total': parts.total,
         'pages': parts.pages,
         'current_page': parts.page
@@ -160,13 +189,14 @@ def search_parts_mechanic(current_mechanic_id):
     if len(query) < 2:
         return jsonify({'error': "Search query must be at least 2 characters long."}), 400
     
-    part = Inventory.query.filter(
-        Inventory.name.ilike(query)
-    ).first()
+    part = find_part_by_name(query)
     
     if not part:
         logger.info(f"MECHANIC_INVENTORY_SEARCH: Mechanic {current_mechanic_id} searched for'{query}' - No part found.")
-        return jsonify({'error': f"No part found with name of '{query}'"}), 404
+        return jsonify({
+            'error': f"No part found with name of '{query}'",
+            'suggestions': [suggestion.name for suggestion in search_parts(query, 5)]
+        }), 404
     
     result = {
         'id': part.id,
@@ -182,19 +212,119 @@ def search_parts_mechanic(current_mechanic_id):
 @inventory_bp.route("/low-stock", methods = ['GET'])
 @mechanic_token_required
 def get_low_stock_parts(current_mechanic_id):
-    threshold = request.args.get('threshold', 10, type = int)
+    threshold = request.args.get('threshold', type = int)
+    limit = request.args.get('limit', 50, type = int)
     
-    if threshold < 0:
+    if threshold is not None and threshold < 0:
         return jsonify({'error': "Threshold must be a positive number."}), 400
     
-    parts = Inventory.query.filter(
-        Inventory.quantity <= threshold).all()
+    if limit < 1 or limit > 200:
+        return jsonify({'error': "Limit must be between 1 and 200."}), 400
+    
+    parts = low_stock_parts(limit, threshold)
     
     logger.info(f"MECHANIC_LOW_STOCK: Mechanic {current_mechanic_id} checked on low stock - {len(parts)} parts.")
     
-    return inventories_schema.jsonify(parts)
+    return jsonify(dump_many(inventories_schema, parts))
+
+@inventory_bp.route("/events", methods = ['GET'])
+@roles_required('admin', 'mechanic')
+def inventory_events(principal):
+    try:
+        last_event_id = requested_last_event_id()
+    except ValueError:
+        return jsonify({'error': "Last-Event-ID must be a non-negative integer."}), 400
+    
+    logger.info(f"INVENTORY_EVENTS: {principal.label} {principal.id} opened the inventory event stream (Last-Event-ID {last_event_id}).")
+    return event_stream_response(lambda event: event.type.startswith('inventory.'), last_event_id)
 
+def _bulk_format(default):
+    value = request.args.get('format', '').strip().lower()
+    if value:
+        return value
+    if request.mimetype == "text/csv":
+        return 'csv'
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        return 'ndjson'
+    return default
 
+@inventory_bp.route("/import", methods = ['POST'])
+@roles_required('admin', 'mechanic')
+def import_parts(principal):
+    data_format = _bulk_format(None)
+    if data_format not in READERS:
+        return jsonify({'error': "Send text/csv or application/x-ndjson, or set format to csv or ndjson."}), 400
+    
+    config = current_app.config
+    run = InventoryImport(config['INVENTORY_IMPORT_CHUNK_SIZE'], config['INVENTORY_IMPORT_MAX_REJECTS'])
+    try:
+        run.run(READERS[data_format](request.stream))
+    except (ImportFormatError, UnicodeDecodeError) as e:
+        logger.error(f"INVENTORY_IMPORT_ERROR: {principal.label} {principal.id} - {str(e)}")
+        return jsonify({'error': f"Import stopped: {str(e)}", **run.summary}), 400
+    
+    summary = run.summary
+    logger.info(f"INVENTORY_IMPORT: {principal.label} {principal.id} imported {summary['rows']} {data_format} rows "
+                f"({summary['inserted']} new, {summary['updated']} updated, {summary['rejected']} rejected) "
+                f"at {summary['rows_per_second']} rows/s.")
+    return jsonify(summary), 200
+
+@inventory_bp.route("/export", methods = ['GET'])
+@mechanic_token_required
+def export_parts(current_mechanic_id):
+    data_format = _bulk_format('csv')
+    if data_format not in EXPORTERS:
+        return jsonify({'error': "Format must be csv or ndjson."}), 400
+    
+    export, mimetype = EXPORTERS[data_format]
+    logger.info(f"INVENTORY_EXPORT: Mechanic {current_mechanic_id} started a {data_format} inventory export.")
+    return Response(stream_with_context(export(current_app.config['INVENTORY_EXPORT_BATCH_SIZE'])), mimetype = mimetype,
+                    headers = {'Content-Disposition': f'attachment; filename="inventory.{data_format}"'})
+
+@inventory_bp.route("/<int:id>/on-hand", methods = ['GET'])
+@mechanic_token_required
+def get_part_on_hand(current_mechanic_id, id):
+    at = request.args.get('at')
+    if at:
+        try:
+            at = datetime.fromisoformat(at)
+        except ValueError:
+            return jsonify({'error': "at must be an ISO 8601 date or datetime."}), 400
+    
+    result = on_hand(id, at or None)
+    part = db.session.get(Inventory, id)
+    if part is None and result['movement_id'] is None:
+        return jsonify({'error': f"No part or stock history with ID {id}."}), 404
+    
+    if not at:
+        # The live quantity next to the ledger's, for reconciliation.
+        result['recorded_quantity'] = part.quantity if part else None
+    
+    logger.info(f"INVENTORY_ON_HAND: Mechanic {current_mechanic_id} checked on-hand for part {id} (at: {result['at']}).")
+    
+    return jsonify(result)
+
+@inventory_bp.route("/<int:id>/movements", methods = ['GET'])
+@mechanic_token_required
+def get_part_movements(current_mechanic_id, id):
+    limit = request.args.get('limit', 50, type = int)
+    before = request.args.get('before', type = int)
+    
+    if limit < 1 or limit > 200:
+        return jsonify({'error': "Limit must be between 1 and 200."}), 400
+    
+    rows = movement_page(id, limit, before)
+    
+    return jsonify({
+        'movements': [{
+            'id': movement.id,
+            'kind': movement.kind,
+            'change': movement.change,
+            'service_ticket_id': movement.service_ticket_id,
+            'created_at': movement.created_at.isoformat()
+        } for movement in rows],
+        'next_before': rows[-1].id if len(rows) == limit else None
+    })
 
 @inventory_bp.route("/<int:id>", methods = ['PUT'])
 @mechanic_token_required
@@ -216,6 +346,9 @@ def update_part(current_mechanic_id, id):
         
         updated_part = inventory_schema.load(data, instance = part, partial = True)
         db.session.commit()
+        vocabulary().add_name(updated_part.name)
+        invalidate_part_responses([id])
+        invalidate_dashboards(mechanics_for_part(id))
         
         logger.info(f"INVENTORY_UPDATE: Mechanic {current_mechanic_id} updated this part '{updated_part.name}' (ID: {id})")
         
@@ -233,9 +366,12 @@ def delete_part(current_mechanic_id, id):
     
     try:
         part_name = part.name
+        mechanic_ids = mechanics_for_part(id)
         
         db.session.delete(part)
         db.session.commit()
+        invalidate_dashboards(mechanic_ids)
+        invalidate_part_responses([id])
         
         logger.info(f"INVENTORY_DELETE: Mechanic {current_mechanic_id} deleted this part '{part_name}' (ID: {id})")
         
@@ -1,10 +1,15 @@
 from app.extensions import ma
 from app.models import Inventory
+from marshmallow import fields, validate
 
 class InventorySchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Inventory
         load_instance = True
+        dump_only = ("price_cents", "version")
+    
+    price = fields.Float(required = True, validate = validate.Range(min = 0))
+    reorder_point = fields.Integer(validate = validate.Range(min = 0))
         
 inventory_schema = InventorySchema()
-inventories_schema = InventorySchema(many = True)
\ No newline at end of file
+inventories_schema = InventorySchema(many = True)
@@ -0,0 +1,249 @@
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from flask import current_app
+from sqlalchemy import event, inspect, func, or_, select, literal_column, table, column
+from app.extensions import db
+from app.models import Inventory
+
+# Part search has to answer every keystroke at the parts counter, so it
+# never scans the catalog. Like ticket search, the indexes live in the
+# database and are kept current by triggers in the writing transaction:
+#
+# - an expression index on lower(name) answers "name starts with" as a
+#   range scan, which is what autocomplete mostly needs;
+# - on SQLite an FTS5 word index (with 2 and 3 character prefix indexes)
+#   finds names where every typed word starts some word of the name;
+# - on PostgreSQL pg_trgm's GIN index does substring and typo matching.
+#
+# Typos on SQLite are handled by correcting words rather than by scoring
+# every row: a process-local trigram index over the distinct words in part
+# names (read from the FTS vocabulary) maps "brke" to "brake", and the
+# corrected words go through the word index like any other query. Each
+# source returns at most CANDIDATES rows, which are then ranked here:
+# exact name, name prefix, every word matched, then closest spelling.
+
+FTS_TABLE = "inventory_fts"
+VOCAB_TABLE = "inventory_fts_vocab"
+fts = table(FTS_TABLE, column("rowid"))
+fts_vocab = table(VOCAB_TABLE, column("term"))
+
+CANDIDATES = 200
+SIMILARITY_THRESHOLD = 0.3
+CORRECTIONS_PER_TERM = 3
+VOCABULARY_TTL = 300
+
+SQLITE_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_inventory_name_lower ON inventory (lower(name))",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, content='inventory', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {VOCAB_TABLE} USING fts5vocab({FTS_TABLE}, 'row')",
+    f"CREATE TRIGGER IF NOT EXISTS inventory_fts_insert AFTER INSERT ON inventory BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS inventory_fts_delete AFTER DELETE ON inventory BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS inventory_fts_update AFTER UPDATE OF name ON inventory BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+]
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_inventory_name_lower ON inventory (lower(name) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_inventory_name_trgm ON inventory USING GIN (lower(name) gin_trgm_ops)",
+]
+
+def _terms(text):
+    return re.findall(r"\w+", text.lower())
+
+@lru_cache(maxsize = 65536)
+def trigrams(word):
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def similarity(a, b):
+    """Shared trigrams over all trigrams of the two words, as pg_trgm computes it."""
+    ta, tb = trigrams(a), trigrams(b)
+    return len(ta & tb) / len(ta | tb)
+
+def install_search_index(connection):
+    """Create the search indexes for inventory if the dialect supports them.
+
+    Safe to run repeatedly. Returns True when the SQLite FTS table had to be
+    created, in which case existing rows still need rebuild_search_index().
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        created = not inspect(connection).has_table(FTS_TABLE)
+        for statement in SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+        return created
+    if dialect == "postgresql":
+        for statement in POSTGRES_DDL:
+            connection.exec_driver_sql(statement)
+    return False
+
+def rebuild_search_index(connection):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+def ensure_search_index():
+    """Install the indexes on an existing database and backfill them."""
+    with db.engine.begin() as connection:
+        if install_search_index(connection):
+            rebuild_search_index(connection)
+
+@event.listens_for(Inventory.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+@event.listens_for(Inventory.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {VOCAB_TABLE}")
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+def _correctable(word):
+    return len(word) >= 3 and word.isalpha()
+
+class Vocabulary:
+    """Trigram index over the distinct words in part names.
+
+    Reloaded from the FTS vocabulary every VOCABULARY_TTL seconds and
+    extended as this process adds or renames parts. A stale entry can only
+    suggest a word that then matches nothing, so it is never wrong, just
+    briefly less helpful.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._words = {}
+        self._index = {}
+        self._loaded_at = None
+
+    def _add(self, word):
+        if word in self._words:
+            return
+        grams = self._words[word] = trigrams(word)
+        for gram in grams:
+            self._index.setdefault(gram, set()).add(word)
+
+    def _load(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < VOCABULARY_TTL:
+            return
+        words = [word for word in db.session.scalars(select(fts_vocab.c.term)) if _correctable(word)]
+        with self._lock:
+            self._words, self._index = {}, {}
+            for word in words:
+                self._add(word)
+            self._loaded_at = time.monotonic()
+
+    def add_name(self, name):
+        with self._lock:
+            if self._loaded_at is not None:
+                for word in _terms(name):
+                    if _correctable(word):
+                        self._add(word)
+
+    def corrections(self, term, limit = CORRECTIONS_PER_TERM):
+        """Known words spelled closest to term, best first, excluding term."""
+        self._load()
+        grams = trigrams(term)
+        with self._lock:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._index.get(gram, ()))
+            scored = []
+            for word, count in shared.items():
+                score = count / (len(grams) + len(self._words[word]) - count)
+                if score >= SIMILARITY_THRESHOLD and word != term:
+                    scored.append((-score, word))
+        return [word for _, word in sorted(scored)[:limit]]
+
+def vocabulary():
+    return current_app.extensions.setdefault('inventory_vocabulary', Vocabulary())
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _name_starts_with(prefix, dialect):
+    name = func.lower(Inventory.name)
+    if dialect == "postgresql":
+        return name.like(_escape_like(prefix) + "%", escape = "\\")
+    return (name >= prefix) & (name < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+def _rows(*filters, order_by = None):
+    statement = select(Inventory.id, Inventory.name).where(*filters).limit(CANDIDATES)
+    if order_by is not None:
+        statement = statement.order_by(order_by)
+    return db.session.execute(statement).all()
+
+def _fts_rows(groups):
+    match = " AND ".join("(" + " OR ".join(group) + ")" for group in groups)
+    return _rows(literal_column(FTS_TABLE).match(match), Inventory.id == fts.c.rowid)
+
+def _sqlite_candidates(text, terms, limit):
+    rows = _rows(_name_starts_with(text, "sqlite"), order_by = func.lower(Inventory.name))
+    # One-letter words would hit the unindexed single-character prefix.
+    words = [term for term in terms if len(term) > 1]
+    if not words:
+        return rows
+
+    rows += _fts_rows([[f'"{term}"*'] for term in words])
+    if len({row.id for row in rows}) < limit:
+        spelling = vocabulary()
+        groups = [[f'"{term}"*', *(f'"{word}"' for word in (spelling.corrections(term) if _correctable(term) else []))]
+                  for term in words]
+        if any(len(group) > 1 for group in groups):
+            rows += _fts_rows(groups)
+    return rows
+
+def _postgres_candidates(text):
+    name = func.lower(Inventory.name)
+    return _rows(
+        or_(_name_starts_with(text, "postgresql"), name.like(f"%{_escape_like(text)}%", escape = "\\"), name.op("%>")(text)),
+        order_by = func.word_similarity(text, name).desc()
+    )
+
+def _rank(name, text, terms):
+    lowered = name.lower()
+    words = _terms(lowered)
+    if lowered == text:
+        tier = 0
+    elif lowered.startswith(text):
+        tier = 1
+    elif all(any(word.startswith(term) for word in words) for term in terms):
+        tier = 2
+    else:
+        tier = 3
+    closeness = 0.0
+    if tier == 3 and words:
+        closeness = sum(max(1.0 if word.startswith(term) else similarity(term, word) for word in words) for term in terms)
+    return (tier, -closeness, len(lowered), lowered)
+
+def search_parts(text, limit):
+    """Parts best matching text, ranked, at most limit of them."""
+    text = " ".join(text.lower().split())
+    if not text:
+        return []
+    terms = _terms(text)
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        rows = _sqlite_candidates(text, terms, limit)
+    elif dialect == "postgresql":
+        rows = _postgres_candidates(text)
+    else:
+        rows = _rows(func.lower(Inventory.name).like(f"%{_escape_like(text)}%", escape = "\\"))
+
+    names = {row.id: row.name for row in rows}
+    ranked = sorted(names, key = lambda part_id: _rank(names[part_id], text, terms))[:limit]
+    parts = {part.id: part for part in Inventory.query.filter(Inventory.id.in_(ranked))}
+    return [parts[part_id] for part_id in ranked]
+
+def find_part_by_name(name):
+    """The part named name, ignoring case, through the lower(name) index."""
+    return Inventory.query.filter(func.lower(Inventory.name) == name.lower()).first()
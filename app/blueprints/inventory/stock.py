@@ -0,0 +1,61 @@
+from sqlalchemy import update
+from app.extensions import db
+from app.models import Inventory
+from app.versioning import bump_counters
+from app.blueprints.inventory.low_stock import is_low, note_stock_level
+from app.blueprints.inventory.ledger import record_movements
+
+# Stock moves with one conditional UPDATE per part. The database checks
+# and decrements in the same statement, so concurrent reservations on a hot
+# part queue on its row lock for the length of that statement instead of
+# racing a read-then-write, and quantity can never drop below zero.
+# The helpers run inside the caller's transaction; commit or roll back
+# together with the ticket change they belong to, and append the matching
+# reservations and releases to the stock ledger, one per ticket.
+
+LEVEL = (Inventory.quantity, Inventory.reorder_point, Inventory.name)
+
+def _returning_quantity(inventory_id, statement, change, movements):
+    if db.session.get_bind().dialect.update_returning:
+        row = db.session.execute(statement.returning(*LEVEL), execution_options = {'synchronize_session': False}).first()
+    else:
+        result = db.session.execute(statement, execution_options = {'synchronize_session': False})
+        row = None if result.rowcount == 0 else db.session.query(*LEVEL).filter(Inventory.id == inventory_id).first()
+
+    if row is None:
+        return None
+    quantity, reorder_point, name = row
+    bump_counters('inventory')
+    record_movements([{'inventory_id': inventory_id, **movement} for movement in movements])
+    note_stock_level(db.session, inventory_id, name, is_low(quantity - change, reorder_point), quantity, reorder_point)
+    return quantity
+
+def _change(inventory_id, change, movements):
+    statement = update(Inventory).where(Inventory.id == inventory_id)
+    if change < 0:
+        statement = statement.where(Inventory.quantity >= -change)
+    return _returning_quantity(inventory_id,
+        statement.values(quantity = Inventory.quantity + change, version = Inventory.version + 1),
+        change, movements
+    )
+
+def reserve_stock(inventory_id, quantity = 1, service_ticket_id = None):
+    """Take quantity units of a part. Returns the units left, or None if short."""
+    return _change(inventory_id, -quantity,
+                   [{'kind': 'reservation', 'change': -quantity, 'service_ticket_id': service_ticket_id}])
+
+def release_stock(inventory_id, quantity = 1, service_ticket_id = None):
+    """Put quantity units of a part back. Returns the units now on hand."""
+    return _change(inventory_id, quantity,
+                   [{'kind': 'release', 'change': quantity, 'service_ticket_id': service_ticket_id}])
+
+def move_stock(inventory_id, reserved_for = (), released_from = ()):
+    """Reserve one unit for each ticket id in reserved_for and put one back
+    from each in released_from, as a single UPDATE for the net change.
+
+    The ledger still gets one reservation or release per ticket. Returns the
+    units now on hand, or None if the part is short.
+    """
+    movements = ([{'kind': 'reservation', 'change': -1, 'service_ticket_id': ticket_id} for ticket_id in reserved_for]
+                 + [{'kind': 'release', 'change': 1, 'service_ticket_id': ticket_id} for ticket_id in released_from])
+    return _change(inventory_id, len(released_from) - len(reserved_for), movements)
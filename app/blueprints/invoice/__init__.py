@@ -0,0 +1,5 @@
+from flask import Blueprint
+
+invoice_bp = Blueprint('invoice_bp', __name__)
+
+from . import routes
\ No newline at end of file
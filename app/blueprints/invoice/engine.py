@@ -0,0 +1,100 @@
+import numpy as np
+from sqlalchemy import select
+from app.extensions import db
+from app.models import ServiceTicket, Inventory, service_ticket_inventory
+
+# Invoices are priced in integer cents from two flat queries: one row per
+# ticket (id, hours) and one row per ticket part (ticket id, unit price).
+# The part rows are mapped onto ticket positions with searchsorted and
+# summed with bincount, so pricing ten thousand tickets is a couple of
+# vectorised passes rather than a relationship walk per ticket.
+
+def format_cents(cents):
+    sign = "-" if cents < 0 else ""
+    cents = abs(int(cents))
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
+
+def _ticket_rows(filters):
+    return db.session.execute(
+        select(ServiceTicket.id, ServiceTicket.customer_id, ServiceTicket.status,
+               ServiceTicket.created_at, ServiceTicket.hours_worked)
+        .where(*filters)
+        .order_by(ServiceTicket.id)
+    ).all()
+
+def _part_rows(filters):
+    return db.session.execute(
+        select(service_ticket_inventory.c.service_ticket_id, Inventory.price_cents)
+        .join(Inventory, Inventory.id == service_ticket_inventory.c.inventory_id)
+        .join(ServiceTicket, ServiceTicket.id == service_ticket_inventory.c.service_ticket_id)
+        .where(*filters)
+    ).all()
+
+def price_tickets(filters, labor_rate_cents):
+    """Price every ticket matching filters.
+
+    Returns (tickets, totals) where tickets is a list of per-ticket dicts in
+    id order and totals sums each money column across them. All amounts
+    are integer cents.
+    """
+    tickets = _ticket_rows(filters)
+    count = len(tickets)
+
+    ticket_ids = np.fromiter((row.id for row in tickets), dtype = np.int64, count = count)
+    hours = np.fromiter((row.hours_worked or 0 for row in tickets), dtype = np.int64, count = count)
+
+    parts = _part_rows(filters)
+    part_ticket_ids = np.fromiter((row[0] for row in parts), dtype = np.int64, count = len(parts))
+    part_cents = np.fromiter((row[1] for row in parts), dtype = np.int64, count = len(parts))
+
+    positions = np.searchsorted(ticket_ids, part_ticket_ids)
+    # bincount sums in float64, which is exact for integers below 2**53 cents.
+    parts_cents = np.rint(np.bincount(positions, weights = part_cents, minlength = count)).astype(np.int64)
+    part_counts = np.bincount(positions, minlength = count)
+    labor_cents = hours * labor_rate_cents
+    total_cents = parts_cents + labor_cents
+
+    lines = [
+        {
+            'ticket_id': row.id,
+            'customer_id': row.customer_id,
+            'status': row.status,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'hours_worked': int(hours[i]),
+            'part_count': int(part_counts[i]),
+            'parts_cents': int(parts_cents[i]),
+            'labor_cents': int(labor_cents[i]),
+            'total_cents': int(total_cents[i]),
+            'total': format_cents(total_cents[i])
+        }
+        for i, row in enumerate(tickets)
+    ]
+
+    totals = {
+        'ticket_count': count,
+        'hours_worked': int(hours.sum()),
+        'parts_cents': int(parts_cents.sum()),
+        'labor_cents': int(labor_cents.sum()),
+        'total_cents': int(total_cents.sum()),
+        'total': format_cents(total_cents.sum())
+    }
+    return lines, totals
+
+def ticket_invoice(ticket_id, labor_rate_cents):
+    """Invoice for one ticket with its part lines, or None if it does not exist."""
+    lines, _ = price_tickets([ServiceTicket.id == ticket_id], labor_rate_cents)
+    if not lines:
+        return None
+
+    invoice = lines[0]
+    invoice['labor_rate_cents'] = labor_rate_cents
+    invoice['parts'] = [
+        {'id': part.id, 'name': part.name, 'price_cents': part.price_cents, 'price': format_cents(part.price_cents)}
+        for part in db.session.execute(
+            select(Inventory.id, Inventory.name, Inventory.price_cents)
+            .join(service_ticket_inventory, service_ticket_inventory.c.inventory_id == Inventory.id)
+            .where(service_ticket_inventory.c.service_ticket_id == ticket_id)
+            .order_by(Inventory.id)
+        )
+    ]
+    return invoice
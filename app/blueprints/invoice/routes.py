@@ -0,0 +1,85 @@
+from flask import request, jsonify, current_app
+from datetime import datetime
+from . import invoice_bp
+from .engine import price_tickets, ticket_invoice
+from app.extensions import db
+from app.models import ServiceTicket
+from app.autho.utils import admin_token_required, roles_required
+from app.blueprints.service_ticket.counts import TICKET_STATUSES
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _period_filters():
+    filters = []
+    
+    for param, compare in (('since', ServiceTicket.created_at.__ge__), ('until', ServiceTicket.created_at.__lt__)):
+        value = request.args.get(param)
+        if value:
+            try:
+                filters.append(compare(datetime.fromisoformat(value)))
+            except ValueError:
+                raise ValueError(f"{param} must be an ISO 8601 date or datetime.")
+    
+    status = request.args.get('status', '').strip().lower()
+    if status:
+        if status not in TICKET_STATUSES:
+            raise ValueError(f"Invalid status. Must be one of: {', '.join(TICKET_STATUSES)}")
+        filters.append(ServiceTicket.status == status)
+    
+    customer_id = request.args.get('customer_id')
+    if customer_id:
+        if not customer_id.isdigit():
+            raise ValueError("customer_id must be an integer.")
+        filters.append(ServiceTicket.customer_id == int(customer_id))
+    
+    return filters
+
+@invoice_bp.route("/tickets/<int:ticket_id>", methods = ['GET'])
+@roles_required('admin', 'customer')
+def get_ticket_invoice(principal, ticket_id):
+    if not principal.is_admin:
+        owner_id = db.session.scalar(db.select(ServiceTicket.customer_id).where(ServiceTicket.id == ticket_id))
+        if owner_id != principal.id:
+            return jsonify({'error': "Ticket not found."}), 404
+    
+    try:
+        invoice = ticket_invoice(ticket_id, current_app.config['LABOR_RATE_CENTS'])
+    except Exception as e:
+        logger.error(f"INVOICE_TICKET_ERROR: {principal.label} {principal.id}, Ticket {ticket_id} - {str(e)}")
+        return jsonify({'error': "Failed to build invoice."}), 500
+    
+    if invoice is None:
+        return jsonify({'error': "Ticket not found."}), 404
+    
+    logger.info(f"INVOICE_TICKET: {principal.label} {principal.id} viewed invoice for ticket {ticket_id}.")
+    return jsonify(invoice), 200
+
+@invoice_bp.route("/", methods = ['GET'])
+@admin_token_required
+def get_period_invoices(current_admin_id):
+    try:
+        filters = _period_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    include_lines = request.args.get('include_lines', 'true').strip().lower() in ('1', 'true', 'yes')
+    labor_rate_cents = current_app.config['LABOR_RATE_CENTS']
+    
+    try:
+        lines, totals = price_tickets(filters, labor_rate_cents)
+    except Exception as e:
+        logger.error(f"INVOICE_PERIOD_ERROR: Admin {current_admin_id} - {str(e)}")
+        return jsonify({'error': "Failed to build invoices."}), 500
+    
+    response = {
+        'labor_rate_cents': labor_rate_cents,
+        'since': request.args.get('since'),
+        'until': request.args.get('until'),
+        'totals': totals
+    }
+    if include_lines:
+        response['invoices'] = lines
+    
+    logger.info(f"INVOICE_PERIOD: Admin {current_admin_id} priced {totals['ticket_count']} tickets.")
+    return jsonify(response), 200
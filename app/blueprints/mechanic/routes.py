@@ -1,10 +1,10 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy import select
 from . import mechanic_bp
 from app.models import Mechanic, ServiceTicket
-from .schemas import mechanic_schema, mechanics_schema, login_schema
-from app.extensions import db
+from .schemas import MechanicSchema, mechanic_schema, mechanics_schema, login_schema
+from app.extensions import db, limiter
+from app.autho.passwords import password_hasher, HashingQueueFull
 from app.autho.utils import (
     encode_token, token_required, 
     encode_mechanic_token, 
@@ -12,20 +12,19 @@ from app.autho.utils import (
     encode_admin_token, admin_token_required
 )
 from app.blueprints.service_ticket.schemas import tickets_schema
+from app.blueprints.service_ticket.loaders import tickets_for_mechanic, TICKET_FIELDSET
+from app import dashboard_cache
+from app.serializers import dump_many
+from app.fieldsets import Fieldset, FieldsetError
+from app.versioning import conditional, row_version
+from app.response_cache import cached_response, invalidate_mechanic_responses
 import logging
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from flask import current_app
 from datetime import datetime
 
 logging.basicConfig(level = logging.INFO)
 logger = logging.getLogger(__name__)
 
-limiter = Limiter(
-    key_func = get_remote_address,
-    app = current_app,
-    default_limits = []
-)
+MECHANIC_FIELDSET = Fieldset(MechanicSchema)
 
 @mechanic_bp.route("/", methods = ['POST'])
 @admin_token_required
@@ -58,15 +57,21 @@ def create_mechanic(current_user_id):
         if 'password' in data and data['password']:
             if len(data['password']) < 6:
                 return jsonify({'error': 'Password must be at least 6 characters.'}), 400
-            new_mechanic.password = generate_password_hash(data['password'])
+            new_mechanic.password = password_hasher.hash(data['password'])
         
         db.session.add(new_mechanic)
         db.session.commit()
+        dashboard_cache.invalidate_mechanic_count()
+        invalidate_mechanic_responses()
         
         logger.info(f"MECHANIC_CREATED: New mechanic {new_mechanic.id} created - {new_mechanic.email}.")
         
         return mechanic_schema.jsonify(new_mechanic), 201
         
+    except HashingQueueFull as e:
+        db.session.rollback()
+        logger.warning(f"MECHANIC_CREATE_BUSY: {str(e)}")
+        return jsonify({'error': "Service is busy, please try again shortly."}), 503
     except Exception as e:
         db.session.rollback()
         logger.error(f"MECHANIC_CREATE_ERROR: {str(e)}")
@@ -91,10 +96,26 @@ def login_mechanic():
         logger.warning(f"LOGIN_FAILED: Mechanic not found or no password set - Email: {valid_data.get('email', 'unknown')}")
         return jsonify({'error': "Please set up your password first!"}), 401
     
-    if not check_password_hash(mechanic.password, valid_data["password"]):
+    try:
+        password_ok, upgraded_hash = password_hasher.verify_and_update(mechanic.password, valid_data["password"])
+    except HashingQueueFull as e:
+        logger.warning(f"LOGIN_BUSY: Mechanic ID: {mechanic.id} - {str(e)}")
+        return jsonify({'error': "Login is busy, please try again shortly."}), 503
+    
+    if not password_ok:
         logger.warning(f"LOGIN_FAILED: Invalid password - Mechanic ID: {mechanic.id}")
         return jsonify({'error': "Invalid email or password."}), 401
     
+    if upgraded_hash:
+        try:
+            mechanic.password = upgraded_hash
+            db.session.commit()
+            invalidate_mechanic_responses([mechanic.id])
+            logger.info(f"PASSWORD_REHASH: Mechanic {mechanic.id} password hash upgraded.")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"PASSWORD_REHASH_ERROR: Mechanic {mechanic.id} - {str(e)}")
+    
     
     logger.info(f"LOGIN_SUCCESS: Mechanic {mechanic.id} logged in successfully.")
     token = encode_mechanic_token(mechanic.id)
@@ -110,6 +131,7 @@ def login_mechanic():
     }), 200
      
 @mechanic_bp.route("/", methods = ['GET'])
+@cached_response('mechanics')
 def get_mechanics():
     page = request.args.get("page", 1, type = int)
     per_page = request.args.get("per_page", 5, type = int)
@@ -120,12 +142,17 @@ def get_mechanics():
         return jsonify({'error': "Per page must be between 1 and 100."}), 400
     
     try:
-        mechanics = Mechanic.query.paginate(page = page, per_page = per_page)
+        view = MECHANIC_FIELDSET.view(default_schema = mechanics_schema)
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        mechanics = Mechanic.query.options(*view.options).paginate(page = page, per_page = per_page)
         return jsonify({
             "total": mechanics.total,
             "pages": mechanics.pages,
             "current_page": mechanics.page,
-            "mechanics": mechanics_schema.dump(mechanics.items)
+            "mechanics": dump_many(view.schema, mechanics.items)
         })
     except Exception as e:
         logger.error(f"GET_MECHANICS_ERROR: {str(e)}")
@@ -134,37 +161,55 @@ def get_mechanics():
 @mechanic_bp.route("/my-tickets", methods = ['GET'])
 @mechanic_token_required
 def get_my_assigned_tickets(mechanic_id):
-    mechanic = Mechanic.query.get_or_404(mechanic_id)
-    tickets = mechanic.service_tickets
-    return tickets_schema.jsonify(tickets)
+    try:
+        view = TICKET_FIELDSET.view(default_schema = tickets_schema)
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    Mechanic.query.get_or_404(mechanic_id)
+    tickets = tickets_for_mechanic(mechanic_id, view.options).all()
+    return jsonify(dump_many(view.schema, tickets))
 
 @mechanic_bp.route("/<int:id>", methods = ['GET'])
+@cached_response('mechanic:{id}')
 def get_mechanic_by_id(id):
     try:
-        mechanic = Mechanic.query.get_or_404(id)
-        return mechanic_schema.jsonify(mechanic)
+        view = MECHANIC_FIELDSET.view(many = False, default_schema = mechanic_schema)
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        mechanic = Mechanic.query.options(*view.options).filter(Mechanic.id == id).first_or_404()
+        return view.schema.jsonify(mechanic)
         
     except Exception as e:
         logger.error(f"GET_MECHANIC_BY_ID_ERROR: {str(e)}")
         return jsonify({'error': "Mechanic not found"}), 404
     
+def _profile_version(current_mechanic_id):
+    version = row_version(Mechanic, current_mechanic_id)
+    return None if version is None else (current_mechanic_id, version)
+
 @mechanic_bp.route("/profile", methods = ['GET'])
 @mechanic_token_required
+@conditional(_profile_version)
 def get_profile(current_mechanic_id):
-    mechanic = Mechanic.query.get_or_404(current_mechanic_id)
-    return mechanic_schema.jsonify(mechanic)
-
-@mechanic_bp.route("/dashboard", methods = ['GET'])
-@mechanic_token_required
-def get_dashboard(current_mechanic_id):
-    mechanic = Mechanic.query.get_or_404(current_mechanic_id)
-    assigned_tickets = mechanic.service_tickets
-    assigned_ticket_count = len(assigned_tickets)
-    total_mechanics = Mechanic.query.count()
-
-    serialized_tickets = tickets_schema.dump(assigned_tickets)
+    try:
+        view = MECHANIC_FIELDSET.view(many = False, default_schema = mechanic_schema)
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    mechanic = Mechanic.query.options(*view.options).filter(Mechanic.id == current_mechanic_id).first_or_404()
+    return view.schema.jsonify(mechanic)
 
-    return jsonify({
+def _build_dashboard(mechanic_id):
+    mechanic = db.session.get(Mechanic, mechanic_id)
+    if mechanic is None:
+        return None
+    
+    assigned_tickets = tickets_for_mechanic(mechanic_id).all()
+    
+    return {
         'mechanic': {
             'id': mechanic.id,
             'name': mechanic.name,
@@ -172,13 +217,22 @@ def get_dashboard(current_mechanic_id):
             'hours_worked': mechanic.hours_worked
         },
         'stats': {
-            'assigned_tickets': assigned_ticket_count,
-            'total_mechanics': total_mechanics,
+            'assigned_tickets': len(assigned_tickets),
             'hours_worked': mechanic.hours_worked
         },
-        'tickets': serialized_tickets,
+        'tickets': dump_many(tickets_schema, assigned_tickets),
         'message': f'Welcome back, {mechanic.name}!'
-    }), 200
+    }
+
+@mechanic_bp.route("/dashboard", methods = ['GET'])
+@mechanic_token_required
+def get_dashboard(current_mechanic_id):
+    payload = dashboard_cache.cached_dashboard(current_mechanic_id, _build_dashboard)
+    if payload is None:
+        return jsonify({'error': "Mechanic not found."}), 404
+    
+    payload['stats']['total_mechanics'] = dashboard_cache.total_mechanics()
+    return jsonify(payload), 200
     
 @mechanic_bp.route("/secure-data", methods = ['GET'])
 @mechanic_token_required
@@ -224,6 +278,8 @@ def update_mechanic(current_mechanic_id, id):
         
         updated_mechanic = mechanic_schema.load(data, instance = mechanic, partial = True)
         db.session.commit()
+        dashboard_cache.invalidate_dashboards(dashboard_cache.colleagues_of(id))
+        invalidate_mechanic_responses([id])
         logger.info(f"MECHANIC_UPDATE: Mechanic {current_mechanic_id} updated profile.")
         return mechanic_schema.jsonify(updated_mechanic)
         
@@ -254,14 +310,19 @@ def change_password(current_mechanic_id):
     
     mechanic = Mechanic.query.get(current_mechanic_id)
     
-    if not mechanic.password or not check_password_hash(mechanic.password, old_password):
+    if not mechanic.password or not password_hasher.verify(mechanic.password, old_password):
         return jsonify({'error': "Current password is incorrect."}), 401
     
     try:
-        mechanic.password = generate_password_hash(new_password)
+        mechanic.password = password_hasher.hash(new_password)
         db.session.commit()
+        invalidate_mechanic_responses([current_mechanic_id])
         logger.info(f"MECHANIC_PASSWORD_CHANGE: Mechanic {current_mechanic_id} changed password.")
         return jsonify({'message': "Password changed successfully."}), 200
+    except HashingQueueFull as e:
+        db.session.rollback()
+        logger.warning(f"MECHANIC_PASSWORD_CHANGE_BUSY: Mechanic {current_mechanic_id} - {str(e)}")
+        return jsonify({'error': "Service is busy, please try again shortly."}), 503
     except Exception as e:
         db.session.rollback()
         logger.error(f"MECHANIC_PASSWORD_CHANGE_ERROR: Mechanic {current_mechanic_id} - {str(e)}")
@@ -280,12 +341,18 @@ def admin_update_mechanic(current_user_id, id):
         updated_mechanic = mechanic_schema.load(data, instance = mechanic, partial = True)
         
         if 'password' in data and data['password']:
-            mechanic.password = generate_password_hash(data['password'])
+            mechanic.password = password_hasher.hash(data['password'])
         
         db.session.commit()
+        dashboard_cache.invalidate_dashboards(dashboard_cache.colleagues_of(id))
+        invalidate_mechanic_responses([id])
         logger.info(f"ADMIN_MECHANIC_UPDATE: Admin {current_user_id} updated mechanic {id}")
         return mechanic_schema.jsonify(updated_mechanic)
         
+    except HashingQueueFull as e:
+        db.session.rollback()
+        logger.warning(f"ADMIN_MECHANIC_UPDATE_BUSY: Admin {current_user_id} updating mechanic {id} - {str(e)}")
+        return jsonify({'error': "Service is busy, please try again shortly."}), 503
     except Exception as e:
         db.session.rollback()
         logger.error(f"ADMIN_MECHANIC_UPDATE_ERROR: Admin {current_user_id} updating mechanic {id} - {str(e)}")
@@ -298,9 +365,13 @@ def admin_delete_mechanic(admin_id, id):
         mechanic = Mechanic.query.get_or_404(id)
         mechanic_email = mechanic.email
         mechanic_name = mechanic.name
+        colleagues = dashboard_cache.colleagues_of(id)
         
         db.session.delete(mechanic)
         db.session.commit()
+        dashboard_cache.invalidate_dashboards(colleagues)
+        dashboard_cache.invalidate_mechanic_count()
+        invalidate_mechanic_responses([id])
         
         logger.info(f"ADMIN_MECHANIC_DELETE: Admin {admin_id} deleted mechanic {id} ({mechanic_email}).")
         return jsonify({'message': f"Mechanic {mechanic_name} has been deleted successfully."}), 200
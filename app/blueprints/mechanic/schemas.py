@@ -7,11 +7,13 @@ class MechanicSchema(ma.SQLAlchemyAutoSchema):
         model = Mechanic
         load_instance = True
         exclude = ['password']
+        dump_only = ("version",)
 class MechanicCreateSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Mechanic
         load_instance = True
         exclude = []
+        dump_only = ("version",)
     
     password = fields.Str(validate=validate.Length(min = 6), load_only = True)
 
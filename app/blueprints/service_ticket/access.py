@@ -0,0 +1,35 @@
+from flask import g
+from sqlalchemy import select, exists
+from app.extensions import db
+from app.models import service_ticket_mechanic
+from . import service_ticket_bp
+
+# Assignment checks only need a yes/no, so they go straight to the
+# (service_ticket_id, mechanic_id) primary key on the association table
+# instead of loading ticket.mechanics. Answers are memoized on g, which is
+# cleared at the end of every service ticket request.
+
+def _memo():
+    if 'ticket_access' not in g:
+        g.ticket_access = {}
+    return g.ticket_access
+
+def is_assigned(ticket_id, mechanic_id):
+    key = (ticket_id, mechanic_id)
+    memo = _memo()
+    if key not in memo:
+        memo[key] = db.session.scalar(select(exists().where(
+            service_ticket_mechanic.c.service_ticket_id == ticket_id,
+            service_ticket_mechanic.c.mechanic_id == mechanic_id
+        )))
+    return memo[key]
+
+def remember_assignment(ticket_id, mechanic_id, assigned):
+    _memo()[(ticket_id, mechanic_id)] = assigned
+
+def can_modify_ticket(principal, ticket_id):
+    return principal.is_admin or is_assigned(ticket_id, principal.id)
+
+@service_ticket_bp.teardown_request
+def _forget_access(exc):
+    g.pop('ticket_access', None)
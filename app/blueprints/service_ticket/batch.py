@@ -0,0 +1,277 @@
+from sqlalchemy import select, update, bindparam, tuple_
+from app.extensions import db
+from app.models import ServiceTicket, Mechanic, Inventory, service_ticket_mechanic, service_ticket_inventory
+from .access import can_modify_ticket, remember_assignment
+from .counts import TICKET_STATUSES
+from app.blueprints.inventory.stock import move_stock
+from app.versioning import bump_counters
+
+BATCH_OPERATIONS = ('assign_mechanic', 'remove_mechanic', 'add_part', 'remove_part', 'status')
+REPAIR_LENGTH = ServiceTicket.__table__.c.repair.type.length
+
+class BatchError(ValueError):
+    pass
+
+def _int_field(operation, field):
+    value = operation.get(field)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise BatchError(f"{field} must be an integer.")
+    return value
+
+def _parse(index, operation):
+    if not isinstance(operation, dict):
+        raise BatchError("Operation must be an object.")
+
+    op = operation.get('op')
+    if op not in BATCH_OPERATIONS:
+        raise BatchError(f"op must be one of: {', '.join(BATCH_OPERATIONS)}")
+
+    parsed = {'index': index, 'op': op, 'ticket_id': _int_field(operation, 'ticket_id')}
+
+    if op in ('assign_mechanic', 'remove_mechanic'):
+        parsed['mechanic_id'] = _int_field(operation, 'mechanic_id')
+    elif op in ('add_part', 'remove_part'):
+        parsed['inventory_id'] = _int_field(operation, 'inventory_id')
+    else:
+        changes = {}
+        if 'status' in operation:
+            status = str(operation['status']).lower()
+            if status not in TICKET_STATUSES:
+                raise BatchError(f"Invalid status. Must be one of: {', '.join(TICKET_STATUSES)}")
+            changes['status'] = status
+        if 'hours_worked' in operation:
+            hours = operation['hours_worked']
+            if isinstance(hours, bool) or not isinstance(hours, int) or hours < 0:
+                raise BatchError("hours_worked must be a non-negative integer.")
+            changes['hours_worked'] = hours
+        if 'repair' in operation:
+            repair = operation['repair']
+            if repair is not None and not isinstance(repair, str):
+                raise BatchError("repair must be a string.")
+            if repair is not None and len(repair) > REPAIR_LENGTH:
+                raise BatchError(f"repair is longer than {REPAIR_LENGTH} characters.")
+            changes['repair'] = repair
+        if not changes:
+            raise BatchError("status operation needs status, hours_worked or repair.")
+        parsed['changes'] = changes
+
+    return parsed
+
+class TicketBatch:
+    """Applies a list of ticket edits with a handful of set-based statements.
+
+    Everything the operations refer to is fetched up front in one query per
+    table, the operations are replayed in order against that in-memory
+    snapshot (so "assign then remove" nets out), and only the net difference
+    is written back: one executemany per association table and one UPDATE
+    per distinct set of ticket field values, all in a single transaction.
+    """
+
+    def __init__(self, operations, principal):
+        self.operations = operations
+        self.principal = principal
+        self.results = []
+        self.parsed = []
+
+    def _load(self):
+        ticket_ids = {op['ticket_id'] for op in self.parsed}
+        mechanic_ids = {op['mechanic_id'] for op in self.parsed if 'mechanic_id' in op}
+        part_ids = {op['inventory_id'] for op in self.parsed if 'inventory_id' in op}
+
+        rows = db.session.execute(
+            select(ServiceTicket.id, ServiceTicket.customer_id, ServiceTicket.version,
+                   ServiceTicket.status, ServiceTicket.hours_worked, ServiceTicket.repair)
+            .where(ServiceTicket.id.in_(ticket_ids))
+        ).all() if ticket_ids else []
+        self.tickets = {row.id: {'status': row.status, 'hours_worked': row.hours_worked, 'repair': row.repair} for row in rows}
+        self.owners = {row.id: (row.customer_id, row.version) for row in rows}
+
+        self.mechanics = set(db.session.scalars(
+            select(Mechanic.id).where(Mechanic.id.in_(mechanic_ids))
+        )) if mechanic_ids else set()
+
+        self.parts = {
+            row.id: row._asdict() for row in db.session.execute(
+                select(Inventory.id, Inventory.name, Inventory.quantity).where(Inventory.id.in_(part_ids))
+            )
+        } if part_ids else {}
+
+        self.assignments = set(db.session.execute(
+            select(service_ticket_mechanic.c.service_ticket_id, service_ticket_mechanic.c.mechanic_id)
+            .where(service_ticket_mechanic.c.service_ticket_id.in_(ticket_ids))
+        ).tuples()) if ticket_ids else set()
+
+        for ticket_id in ticket_ids:
+            remember_assignment(ticket_id, self.principal.id, (ticket_id, self.principal.id) in self.assignments)
+
+        self.ticket_parts = set(db.session.execute(
+            select(service_ticket_inventory.c.service_ticket_id, service_ticket_inventory.c.inventory_id)
+            .where(service_ticket_inventory.c.service_ticket_id.in_(ticket_ids))
+        ).tuples()) if ticket_ids else set()
+
+    def _check_access(self, ticket_id):
+        if not can_modify_ticket(self.principal, ticket_id):
+            raise BatchError("Only mechanics assigned to this ticket or admins can change it.")
+
+    def _apply(self, op):
+        ticket_id = op['ticket_id']
+        if ticket_id not in self.tickets:
+            raise BatchError(f"Ticket {ticket_id} not found.")
+        self._check_access(ticket_id)
+
+        kind = op['op']
+        if kind in ('assign_mechanic', 'remove_mechanic'):
+            mechanic_id = op['mechanic_id']
+            if mechanic_id not in self.mechanics:
+                raise BatchError(f"Mechanic {mechanic_id} not found.")
+            pair = (ticket_id, mechanic_id)
+            if kind == 'assign_mechanic':
+                if pair in self.assignments:
+                    return 'unchanged'
+                self.assignments.add(pair)
+                remember_assignment(ticket_id, mechanic_id, True)
+            else:
+                if pair not in self.assignments:
+                    return 'unchanged'
+                self.assignments.discard(pair)
+                remember_assignment(ticket_id, mechanic_id, False)
+            return 'applied'
+
+        if kind in ('add_part', 'remove_part'):
+            inventory_id = op['inventory_id']
+            part = self.parts.get(inventory_id)
+            if part is None:
+                raise BatchError(f"Part {inventory_id} not found.")
+            pair = (ticket_id, inventory_id)
+            if kind == 'add_part':
+                if pair in self.ticket_parts:
+                    return 'unchanged'
+                if part['quantity'] <= 0:
+                    raise BatchError(f"Part {part['name']} is out of stock (quantity: {part['quantity']}).")
+                self.ticket_parts.add(pair)
+                part['quantity'] -= 1
+            else:
+                if pair not in self.ticket_parts:
+                    return 'unchanged'
+                self.ticket_parts.discard(pair)
+                part['quantity'] += 1
+            return 'applied'
+
+        current = self.tickets[ticket_id]
+        if all(current.get(field) == value for field, value in op['changes'].items()):
+            return 'unchanged'
+        current.update(op['changes'])
+        self.changed_tickets.add(ticket_id)
+        return 'applied'
+
+    def run(self, atomic = False):
+        for index, operation in enumerate(self.operations):
+            try:
+                self.parsed.append(_parse(index, operation))
+            except BatchError as e:
+                self.results.append({'index': index, 'op': operation.get('op') if isinstance(operation, dict) else None,
+                                     'status': 'error', 'error': str(e)})
+
+        self._load()
+        initial_assignments = set(self.assignments)
+        initial_parts = set(self.ticket_parts)
+        initial_tickets = {ticket_id: dict(values) for ticket_id, values in self.tickets.items()}
+        self.changed_tickets = set()
+
+        for op in self.parsed:
+            result = {'index': op['index'], 'op': op['op'], 'ticket_id': op['ticket_id']}
+            try:
+                result['status'] = self._apply(op)
+            except BatchError as e:
+                result['status'] = 'error'
+                result['error'] = str(e)
+            self.results.append(result)
+
+        self.results.sort(key = lambda result: result['index'])
+        failed = sum(1 for result in self.results if result['status'] == 'error')
+
+        if atomic and failed:
+            return False
+
+        self.assigned = self.assignments - initial_assignments
+        self.unassigned = initial_assignments - self.assignments
+        self.parts_added = self.ticket_parts - initial_parts
+        self.parts_removed = initial_parts - self.ticket_parts
+        self.ticket_updates = {
+            ticket_id: {field: value for field, value in self.tickets[ticket_id].items() if value != initial_tickets[ticket_id][field]}
+            for ticket_id in self.changed_tickets
+        }
+        self._write()
+        return True
+
+    def _write(self):
+        if self.touched_tickets:
+            bump_counters('service_ticket')
+        if self.assigned:
+            db.session.execute(service_ticket_mechanic.insert(), [
+                {'service_ticket_id': ticket_id, 'mechanic_id': mechanic_id} for ticket_id, mechanic_id in self.assigned
+            ])
+        if self.unassigned:
+            db.session.execute(service_ticket_mechanic.delete().where(
+                service_ticket_mechanic.c.service_ticket_id == bindparam('t_id'),
+                service_ticket_mechanic.c.mechanic_id == bindparam('m_id')
+            ), [{'t_id': ticket_id, 'm_id': mechanic_id} for ticket_id, mechanic_id in self.unassigned])
+        if self.parts_added:
+            db.session.execute(service_ticket_inventory.insert(), [
+                {'service_ticket_id': ticket_id, 'inventory_id': inventory_id} for ticket_id, inventory_id in self.parts_added
+            ])
+        if self.parts_removed:
+            db.session.execute(service_ticket_inventory.delete().where(
+                service_ticket_inventory.c.service_ticket_id == bindparam('t_id'),
+                service_ticket_inventory.c.inventory_id == bindparam('i_id')
+            ), [{'t_id': ticket_id, 'i_id': inventory_id} for ticket_id, inventory_id in self.parts_removed])
+
+        grouped = {}
+        for ticket_id, changes in self.ticket_updates.items():
+            if changes:
+                grouped.setdefault(tuple(sorted(changes.items())), []).append(ticket_id)
+        # Like the single-ticket routes, an update only lands on the version
+        # the batch read; a ticket changed by someone else in between fails
+        # the whole batch instead of being silently overwritten.
+        returning = db.session.get_bind().dialect.update_returning
+        for changes, ticket_ids in grouped.items():
+            statement = (update(ServiceTicket)
+                         .where(tuple_(ServiceTicket.id, ServiceTicket.version).in_([(ticket_id, self.owners[ticket_id][1]) for ticket_id in ticket_ids]))
+                         .values({**dict(changes), 'version': ServiceTicket.version + 1}))
+            if returning:
+                updated = set(db.session.scalars(statement.returning(ServiceTicket.id), execution_options = {'synchronize_session': False}))
+            else:
+                result = db.session.execute(statement, execution_options = {'synchronize_session': False})
+                updated = set(ticket_ids) if result.rowcount == len(ticket_ids) else set()
+            stale = sorted(set(ticket_ids) - updated)
+            if stale:
+                raise BatchError(f"Ticket(s) {', '.join(map(str, stale))} changed while the batch was applied.")
+
+        # Stock goes last and in id order: part rows are the hot ones, so their
+        # locks are held for as little of the transaction as possible and
+        # concurrent batches always take them in the same order.
+        stock = {}
+        for ticket_id, inventory_id in self.parts_added:
+            stock.setdefault(inventory_id, ([], []))[0].append(ticket_id)
+        for ticket_id, inventory_id in self.parts_removed:
+            stock.setdefault(inventory_id, ([], []))[1].append(ticket_id)
+        for inventory_id, (reserved_for, released_from) in sorted(stock.items()):
+            remaining = move_stock(inventory_id, sorted(reserved_for), sorted(released_from))
+            if remaining is None and len(reserved_for) > len(released_from):
+                raise BatchError(f"Part {self.parts[inventory_id]['name']} ran out of stock while the batch was applied.")
+
+        db.session.commit()
+
+    @property
+    def touched_tickets(self):
+        pairs = self.assigned | self.unassigned | self.parts_added | self.parts_removed
+        return {ticket_id for ticket_id, _ in pairs} | set(self.ticket_updates)
+
+    @property
+    def summary(self):
+        return {
+            'applied': sum(1 for result in self.results if result['status'] == 'applied'),
+            'unchanged': sum(1 for result in self.results if result['status'] == 'unchanged'),
+            'failed': sum(1 for result in self.results if result['status'] == 'error'),
+            'results': self.results
+        }
@@ -0,0 +1,45 @@
+from sqlalchemy import select, func
+from app.extensions import db
+from app.models import ServiceTicket, service_ticket_mechanic
+
+# Ticket counts come from a single GROUP BY (owner, status) so the cost
+# depends on the number of owners asked about, not on how many tickets
+# they have accumulated. Owners without tickets still get a zeroed entry.
+
+TICKET_STATUSES = ['open', 'in_progress', 'completed', 'cancelled']
+
+def _empty():
+    return {'total': 0, 'by_status': {status: 0 for status in TICKET_STATUSES}}
+
+def _collect(rows, owner_ids):
+    counts = {owner_id: _empty() for owner_id in owner_ids}
+    for owner_id, status, count in rows:
+        entry = counts.setdefault(owner_id, _empty())
+        entry['total'] += count
+        entry['by_status'][status] = entry['by_status'].get(status, 0) + count
+    return counts
+
+def mechanic_ticket_counts(mechanic_ids):
+    mechanic_ids = list(mechanic_ids)
+    if not mechanic_ids:
+        return {}
+    owner = service_ticket_mechanic.c.mechanic_id
+    rows = db.session.execute(
+        select(owner, ServiceTicket.status, func.count())
+        .join(ServiceTicket, ServiceTicket.id == service_ticket_mechanic.c.service_ticket_id)
+        .where(owner.in_(mechanic_ids))
+        .group_by(owner, ServiceTicket.status)
+    )
+    return _collect(rows, mechanic_ids)
+
+def customer_ticket_counts(customer_ids):
+    customer_ids = list(customer_ids)
+    if not customer_ids:
+        return {}
+    owner = ServiceTicket.customer_id
+    rows = db.session.execute(
+        select(owner, ServiceTicket.status, func.count())
+        .where(owner.in_(customer_ids))
+        .group_by(owner, ServiceTicket.status)
+    )
+    return _collect(rows, customer_ids)
@@ -0,0 +1,72 @@
+from sqlalchemy import select
+from app.extensions import db
+from app.models import ServiceTicket, service_ticket_mechanic
+from app.events import current_hub
+
+# Ticket changes go out on the event hub after the write has committed.
+# Every event names its ticket with the status and version it has now, and
+# is visible to the ticket's customer and assigned mechanics (plus any
+# mechanic the change just removed), so a client can tell from the event
+# alone whether its copy is stale.
+
+def _ticket_audiences(ticket_ids):
+    rows = db.session.execute(
+        select(ServiceTicket.id, ServiceTicket.customer_id, ServiceTicket.status, ServiceTicket.version)
+        .where(ServiceTicket.id.in_(ticket_ids))
+    ).all()
+    tickets = {row.id: ({'status': row.status, 'version': row.version}, {('customer', row.customer_id)}) for row in rows}
+
+    for ticket_id, mechanic_id in db.session.execute(
+        select(service_ticket_mechanic.c.service_ticket_id, service_ticket_mechanic.c.mechanic_id)
+        .where(service_ticket_mechanic.c.service_ticket_id.in_(ticket_ids))
+    ):
+        tickets[ticket_id][1].add(('mechanic', mechanic_id))
+    return tickets
+
+def _batch_audiences(batch):
+    # The batch already holds every touched ticket's owner, version and
+    # final assignments, so its events cost no extra queries.
+    tickets = {}
+    for ticket_id, (customer_id, version) in batch.owners.items():
+        if batch.ticket_updates.get(ticket_id):
+            version += 1
+        tickets[ticket_id] = ({'status': batch.tickets[ticket_id]['status'], 'version': version}, {('customer', customer_id)})
+    for ticket_id, mechanic_id in batch.assignments:
+        tickets[ticket_id][1].add(('mechanic', mechanic_id))
+    return tickets
+
+def publish_ticket_events(changes, tickets = None):
+    """Publish (type, ticket_id, data, extra_mechanic_ids) tuples in order."""
+    changes = list(changes)
+    if not changes:
+        return
+    if tickets is None:
+        tickets = _ticket_audiences({ticket_id for _, ticket_id, _, _ in changes})
+    hub = current_hub()
+
+    for event_type, ticket_id, data, extra_mechanic_ids in changes:
+        if ticket_id not in tickets:
+            continue
+        state, audience = tickets[ticket_id]
+        hub.publish(event_type, {'ticket_id': ticket_id, **state, **data},
+                    audience | {('mechanic', mechanic_id) for mechanic_id in extra_mechanic_ids})
+
+def publish_ticket_event(event_type, ticket_id, extra_mechanic_ids = (), **data):
+    publish_ticket_events([(event_type, ticket_id, data, extra_mechanic_ids)])
+
+def publish_batch_events(batch):
+    """One event per change a committed TicketBatch made."""
+    changes = []
+    for ticket_id, mechanic_id in sorted(batch.assigned):
+        changes.append(('ticket.assigned', ticket_id, {'mechanic_id': mechanic_id}, ()))
+    for ticket_id, mechanic_id in sorted(batch.unassigned):
+        changes.append(('ticket.unassigned', ticket_id, {'mechanic_id': mechanic_id}, (mechanic_id,)))
+    for ticket_id, inventory_id in sorted(batch.parts_added):
+        changes.append(('ticket.part_added', ticket_id, {'inventory_id': inventory_id}, ()))
+    for ticket_id, inventory_id in sorted(batch.parts_removed):
+        changes.append(('ticket.part_removed', ticket_id, {'inventory_id': inventory_id}, ()))
+    for ticket_id, updated in sorted(batch.ticket_updates.items()):
+        if updated:
+            event_type = 'ticket.status' if 'status' in updated else 'ticket.updated'
+            changes.append((event_type, ticket_id, {'fields': sorted(updated)}, ()))
+    publish_ticket_events(changes, _batch_audiences(batch))
@@ -0,0 +1,50 @@
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import ServiceTicket, service_ticket_mechanic
+from app.fieldsets import Fieldset
+from .schemas import ServiceTicketSchema
+
+# Loader profiles mirror what each serializer touches, so dumping a page of
+# tickets costs a fixed number of queries instead of one per relationship
+# per row. customer is many-to-one and rides along in the main SELECT;
+# collections use selectinload so LIMIT/OFFSET still applies to tickets.
+LOAD_PROFILES = {
+    'ticket_full': (
+        joinedload(ServiceTicket.customer),
+        selectinload(ServiceTicket.mechanics),
+        selectinload(ServiceTicket.parts),
+    ),
+    'ticket_mechanics': (
+        selectinload(ServiceTicket.mechanics),
+    ),
+    'ticket_bare': (),
+}
+
+# ?fields= / ?include= on the ticket read endpoints. Each relationship loads
+# the same way as in ticket_full, and only when it is asked for.
+TICKET_FIELDSET = Fieldset(
+    ServiceTicketSchema,
+    relations = {
+        'customer': joinedload(ServiceTicket.customer),
+        'mechanics': selectinload(ServiceTicket.mechanics),
+        'parts': selectinload(ServiceTicket.parts),
+    },
+    default_options = LOAD_PROFILES['ticket_full'],
+    always_load = ('created_at',),
+)
+
+def with_profile(query, profile):
+    """Apply a named LOAD_PROFILES entry, or a tuple of loader options."""
+    options = LOAD_PROFILES[profile] if isinstance(profile, str) else profile
+    return query.options(*options)
+
+def tickets_query(profile = 'ticket_full'):
+    return with_profile(ServiceTicket.query, profile)
+
+def tickets_for_mechanic(mechanic_id, profile = 'ticket_full'):
+    return tickets_query(profile).join(
+        service_ticket_mechanic,
+        service_ticket_mechanic.c.service_ticket_id == ServiceTicket.id
+    ).filter(service_ticket_mechanic.c.mechanic_id == mechanic_id)
+
+def tickets_for_customer(customer_id, profile = 'ticket_full'):
+    return tickets_query(profile).filter(ServiceTicket.customer_id == customer_id)
@@ -0,0 +1,41 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+from app.models import ServiceTicket
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(ticket):
+    raw = json.dumps([ticket.created_at.isoformat(), ticket.id], separators = (",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, ticket_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(ticket_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidCursor("Invalid cursor.") from e
+
+def keyset_page(query, cursor, per_page):
+    """Return one page of tickets, newest first, and the cursor for the next.
+
+    Pages are anchored on (created_at, id) rather than an OFFSET, so the
+    database seeks straight to the cursor position through the
+    (created_at, id) indexes and page 1,000 costs the same as page 1.
+    """
+    query = query.order_by(ServiceTicket.created_at.desc(), ServiceTicket.id.desc())
+
+    if cursor:
+        created_at, ticket_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            ServiceTicket.created_at < created_at,
+            and_(ServiceTicket.created_at == created_at, ServiceTicket.id < ticket_id)
+        ))
+
+    rows = query.limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > per_page else None
+    return items, next_cursor
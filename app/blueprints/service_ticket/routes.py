@@ -1,15 +1,137 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app, Response, stream_with_context
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from app.extensions import db
 from app.models import ServiceTicket, Mechanic, Inventory, Customer
 from . import service_ticket_bp
 from .schemas import ticket_schema, tickets_schema
-from app.autho.utils import customer_token_required, mechanic_token_required, admin_token_required
+from .loaders import tickets_query, tickets_for_mechanic, tickets_for_customer, TICKET_FIELDSET
+from .pagination import keyset_page, InvalidCursor
+from .batch import TicketBatch, BatchError
+from .access import is_assigned, can_modify_ticket, remember_assignment
+from .counts import TICKET_STATUSES, mechanic_ticket_counts, customer_ticket_counts
+from .search import search_tickets
+from .feed import publish_ticket_event, publish_batch_events
+from app.autho.utils import customer_token_required, mechanic_token_required, admin_token_required, roles_required
 from app.blueprints.mechanic.schemas import mechanics_schema
+from app.blueprints.inventory.stock import reserve_stock, release_stock
+from app.dashboard_cache import invalidate_ticket_dashboards, mechanics_for_parts
+from app.serializers import dump_many, serializer_for
+from app.fieldsets import FieldsetError
+from app.versioning import conditional, collection_versions, TICKET_COUNTERS
+from app.events import requested_last_event_id, event_stream_response
+from app.response_cache import invalidate_part_responses
 import logging
+from datetime import datetime
 
 logging.basicConfig(level = logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _filter_tickets(query):
+    status = request.args.get('status', '').strip().lower()
+    if status:
+        if status not in TICKET_STATUSES:
+            raise ValueError(f"Invalid status. Must be one of: {', '.join(TICKET_STATUSES)}")
+        query = query.filter(ServiceTicket.status == status)
+
+    since = _date_arg('since')
+    if since:
+        query = query.filter(ServiceTicket.created_at >= since)
+    
+    until = _date_arg('until')
+    if until:
+        query = query.filter(ServiceTicket.created_at < until)
+    return query
+
+def _date_arg(param):
+    value = request.args.get(param)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{param} must be an ISO 8601 date or datetime.")
+
+def _stream_tickets(query, schema = ticket_schema):
+    batch_size = current_app.config.get('TICKET_EXPORT_BATCH_SIZE', 500)
+    dumps = current_app.json.dumps
+    dump = serializer_for(schema).dump
+
+    def generate():
+        for ticket in query.order_by(ServiceTicket.id).yield_per(batch_size):
+            yield dumps(dump(ticket)) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype = "application/x-ndjson")
+
+def _flag_arg(param, default):
+    value = request.args.get(param)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes')
+
+def _wants_total(default):
+    return _flag_arg('include_total', default)
+
+def _id_list_arg(param):
+    value = request.args.get(param, '').strip()
+    if not value:
+        return []
+    try:
+        return list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ValueError(f"{param} must be a comma-separated list of integers.")
+
+def _if_match_versions():
+    """Ticket versions the request's If-Match accepts, or None for any."""
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    try:
+        return {int(tag) for tag in request.if_match.as_set(include_weak = True)}
+    except ValueError:
+        raise ValueError("If-Match must be a ticket version from a previous response.")
+
+def _ticket_conflict(ticket_id):
+    """409 carrying the ticket as it is now, so the client can merge and retry."""
+    db.session.rollback()
+    ticket = tickets_query().filter(ServiceTicket.id == ticket_id).first()
+    response = jsonify({
+        'error': "Ticket was changed by another request. Reload it and retry.",
+        'ticket': ticket_schema.dump(ticket) if ticket else None
+    })
+    response.status_code = 409
+    if ticket:
+        response.set_etag(str(ticket.version))
+    return response
+
+def _ticket_page(query, per_page, count_key, total = None, schema = tickets_schema):
+    per_page = max(per_page, 1)
+    if 'cursor' in request.args:
+        tickets, next_cursor = keyset_page(query, request.args.get('cursor', '').strip(), per_page)
+        page_info = {
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+        if total is not None:
+            page_info[count_key] = total
+        elif _wants_total(default = False):
+            page_info[count_key] = query.order_by(None).count()
+    else:
+        page = request.args.get('page', 1, type = int)
+        count = total is None and _wants_total(default = True)
+        tickets_paginated = query.paginate(page = page, per_page = per_page, error_out = False, count = count)
+        if total is not None:
+            tickets_paginated.total = total
+        tickets = tickets_paginated.items
+        page_info = {
+            "current_page": tickets_paginated.page,
+            "total_pages": tickets_paginated.pages
+        }
+        if tickets_paginated.total is not None:
+            page_info[count_key] = tickets_paginated.total
+    page_info["tickets"] = dump_many(schema, tickets)
+    return page_info
+
 @service_ticket_bp.route("/mechanic/create", methods = ['POST'])
 @mechanic_token_required
 def mechanic_create_ticket(current_mechanic_id):
@@ -39,6 +161,8 @@ def mechanic_create_ticket(current_mechanic_id):
         
         db.session.add(ticket)
         db.session.commit()
+        invalidate_ticket_dashboards([ticket.id])
+        publish_ticket_event('ticket.created', ticket.id)
         
         logger.info(f"TICKET_CREATE_MECHANIC: Mechanic {current_mechanic_id} created ticket {ticket.id}.")
         return ticket_schema.jsonify(ticket), 201
@@ -51,21 +175,78 @@ def mechanic_create_ticket(current_mechanic_id):
 @service_ticket_bp.route("/", methods = ['GET'])
 @admin_token_required
 def get_tickets(current_admin_id):
+    streaming = request.args.get('format', '').lower() == 'ndjson'
     try:
-        tickets = ServiceTicket.query.all()
+        view = TICKET_FIELDSET.view(many = not streaming, default_schema = ticket_schema if streaming else tickets_schema)
+        query = _filter_tickets(tickets_query(view.options))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        if streaming:
+            logger.info(f"GET_TICKETS_EXPORT: Admin {current_admin_id} started an NDJSON ticket export.")
+            return _stream_tickets(query, view.schema)
+        
+        tickets = query.all()
         logger.info(f"GET_TICKETS: Admin {current_admin_id} retrieved all tickets.")
-        return tickets_schema.jsonify(tickets)
+        return jsonify(dump_many(view.schema, tickets))
     except Exception as e:
         logger.error(f"GET_TICKETS_ERROR: Admin {current_admin_id} - {str(e)}")
         return jsonify({'error': "Failed to retrieve tickets."}), 500
 
+@service_ticket_bp.route("/search", methods = ['GET'])
+@admin_token_required
+def search_service_tickets(current_admin_id):
+    search = request.args.get('q', '').strip()
+    if not search:
+        return jsonify({'error': "q is required."}), 400
+    
+    try:
+        view = TICKET_FIELDSET.view(default_schema = tickets_schema)
+        query = search_tickets(_filter_tickets(tickets_query(view.options)), search)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if query is None:
+        return jsonify({'error': "q must contain at least one word or number."}), 400
+    
+    page = max(request.args.get('page', 1, type = int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type = int), 1), 50)
+    
+    try:
+        rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+        tickets = rows[:per_page]
+        
+        response = {
+            "query": search,
+            "current_page": page,
+            "per_page": per_page,
+            "has_more": len(rows) > per_page,
+            "tickets": dump_many(view.schema, tickets)
+        }
+        if _wants_total(default = False):
+            response["total"] = query.order_by(None).count()
+        
+        logger.info(f"SEARCH_TICKETS: Admin {current_admin_id} searched tickets for '{search}' ({len(tickets)} results on page {page}).")
+        return jsonify(response)
+    except Exception as e:
+        logger.error(f"SEARCH_TICKETS_ERROR: Admin {current_admin_id} - {str(e)}")
+        return jsonify({'error': "Failed to search tickets."}), 500
+
 @service_ticket_bp.route("/<int:ticket_id>", methods = ['GET'])
 @admin_token_required
 def get_ticket(current_admin_id, ticket_id):
     try:
-        ticket = ServiceTicket.query.get_or_404(ticket_id)
+        view = TICKET_FIELDSET.view(many = False, default_schema = ticket_schema)
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        ticket = tickets_query(view.options).filter(ServiceTicket.id == ticket_id).first_or_404()
         logger.info(f"GET_TICKET: Admin {current_admin_id} retrieved ticket {ticket_id}.")
-        return ticket_schema.jsonify(ticket)
+        response = view.schema.jsonify(ticket)
+        response.set_etag(str(ticket.version))
+        return response
     except Exception as e:
         logger.error(f"GET_TICKET_ERROR: Admin {current_admin_id}, Ticket {ticket_id} - {str(e)}")
         return jsonify({'error': "Failed to retrieve ticket."}), 500
@@ -81,7 +262,7 @@ def get_ticket_mechanics(current_mechanic_id, ticket_id):
         return jsonify ({
             "ticket_id": ticket_id,
             "mechanic_count": len(ticket.mechanics),
-            "mechanics": mechanics_schema.dump(ticket.mechanics)
+            "mechanics": dump_many(mechanics_schema, ticket.mechanics)
         })
     except Exception as e:
         logger.error(f"GET_TICKET_MECHANICS_ERROR: Mechanic {current_mechanic_id}, Ticket {ticket_id} - {str(e)}")
@@ -92,16 +273,26 @@ def get_ticket_mechanics(current_mechanic_id, ticket_id):
 def get_mechanic_ticket_count(current_admin_id, mechanic_id):
     try:
         mechanic = Mechanic.query.get_or_404(mechanic_id)
-        ticket_count = len(mechanic.service_tickets)
-        
-        logger.info(f"GET_MECHANIC_TICKET_COUNT: Admin {current_admin_id} viewed ticket count for mechanic {mechanic_id}.")
+        counts = mechanic_ticket_counts([mechanic_id])[mechanic_id]
         
-        return jsonify ({
+        response = {
             "mechanic_id": mechanic_id,
             "mechanic_name": mechanic.name,
-            "assigned_ticket_count": ticket_count,
-            "tickets": tickets_schema.dump(mechanic.service_tickets)
-        })
+            "assigned_ticket_count": counts['total'],
+            "status_counts": counts['by_status']
+        }
+        
+        if _flag_arg('include_tickets', False):
+            per_page = min(request.args.get('per_page', 10, type = int), 50)
+            view = TICKET_FIELDSET.view(default_schema = tickets_schema)
+            page_info = _ticket_page(tickets_for_mechanic(mechanic_id, view.options), per_page, "assigned_ticket_count", total = counts['total'], schema = view.schema)
+            response.update(page_info)
+        
+        logger.info(f"GET_MECHANIC_TICKET_COUNT: Admin {current_admin_id} viewed ticket count for mechanic {mechanic_id}.")
+        
+        return jsonify(response)
+    except (InvalidCursor, FieldsetError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"GET_MECHANIC_TICKET_COUNT_ERROR: Admin {current_admin_id}, Mechanic {mechanic_id} - {str(e)}")
         return jsonify({'error': "Failed to retrieve mechanic ticket count."}), 500
@@ -111,126 +302,135 @@ def get_mechanic_ticket_count(current_admin_id, mechanic_id):
 def get_customer_ticket_count(current_admin_id, customer_id):
     try:
         customer = Customer.query.get_or_404(customer_id)
-    
-        page = request.args.get('page', 1, type = int)
-        per_page = request.args.get('per_page', 10, type = int)
-    
-        if per_page > 50:
-            per_page = 50
-    
-        total_count = ServiceTicket.query.filter_by(customer_id = customer_id).count()
-        tickets_paginated = ServiceTicket.query.filter_by(customer_id = customer_id)\
-        .paginate(page = page, per_page = per_page, error_out = False)
+        counts = customer_ticket_counts([customer_id])[customer_id]
+        
+        response = {
+            "customer_id": customer_id,
+            "customer_name": customer.name,
+            "ticket_count": counts['total'],
+            "status_counts": counts['by_status']
+        }
+        
+        if _flag_arg('include_tickets', False):
+            per_page = min(request.args.get('per_page', 10, type = int), 50)
+            view = TICKET_FIELDSET.view(default_schema = tickets_schema)
+            page_info = _ticket_page(tickets_for_customer(customer_id, view.options), per_page, "ticket_count", total = counts['total'], schema = view.schema)
+            response.update(page_info)
     
         logger.info(f"GET_CUSTOMER_TICKET_COUNT: Admin {current_admin_id} viewed ticket count for customer {customer_id}.")
     
-        return jsonify({
-            "customer_id": customer_id,
-            "customer_name": customer.name,
-            "ticket_count": total_count,
-            "current_page": tickets_paginated.page,
-            "total_pages": tickets_paginated.pages,
-            "tickets": tickets_schema.dump(tickets_paginated.items)
-        })
+        return jsonify(response)
+    except (InvalidCursor, FieldsetError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"GET_CUSTOMER_TICKET_COUNT_ERROR: Admin {current_admin_id}, Customer {customer_id} - {str(e)}")
         return jsonify({'error': "Failed to retrieve customer ticket count."}), 500 
     
+@service_ticket_bp.route("/counts", methods = ['GET'])
+@admin_token_required
+def get_ticket_counts(current_admin_id):
+    try:
+        mechanic_ids = _id_list_arg('mechanic_ids')
+        customer_ids = _id_list_arg('customer_ids')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not mechanic_ids and not customer_ids:
+        return jsonify({'error': "mechanic_ids or customer_ids is required."}), 400
+    
+    max_ids = current_app.config['TICKET_COUNTS_MAX_IDS']
+    if len(mechanic_ids) > max_ids or len(customer_ids) > max_ids:
+        return jsonify({'error': f"At most {max_ids} ids can be requested at once."}), 400
+    
+    try:
+        response = {}
+        if mechanic_ids:
+            response['mechanics'] = {str(owner_id): counts for owner_id, counts in mechanic_ticket_counts(mechanic_ids).items()}
+        if customer_ids:
+            response['customers'] = {str(owner_id): counts for owner_id, counts in customer_ticket_counts(customer_ids).items()}
+        
+        logger.info(f"GET_TICKET_COUNTS: Admin {current_admin_id} viewed counts for {len(mechanic_ids)} mechanics and {len(customer_ids)} customers.")
+        
+        return jsonify(response)
+    except Exception as e:
+        logger.error(f"GET_TICKET_COUNTS_ERROR: Admin {current_admin_id} - {str(e)}")
+        return jsonify({'error': "Failed to retrieve ticket counts."}), 500
+    
 @service_ticket_bp.route("/customer/my-tickets", methods = ['GET'])
 @customer_token_required
 def get_my_tickets(current_customer_id):
     try:
         customer = Customer.query.get_or_404(current_customer_id)
     
-        page = request.args.get('page', 1, type = int)
         per_page = request.args.get('per_page', 10, type = int)
     
         if per_page > 50:
             per_page = 50
     
-        total_count = ServiceTicket.query.filter_by(customer_id = current_customer_id).count()
-        tickets_paginated = ServiceTicket.query.filter_by(customer_id = current_customer_id)\
-        .paginate(page = page, per_page = per_page, error_out = False)
+        view = TICKET_FIELDSET.view(default_schema = tickets_schema)
+        page_info = _ticket_page(tickets_for_customer(current_customer_id, view.options), per_page, "ticket_count", schema = view.schema)
     
         logger.info(f"GET_MY_TICKETS: Customer {current_customer_id} viewed their own ticket(s).")
     
         return jsonify({
             "customer_id": current_customer_id,
             "customer_name": customer.name,
-            "ticket_count": total_count,
-            "current_page": tickets_paginated.page,
-            "total_pages": tickets_paginated.pages,
-            "tickets": tickets_schema.dump(tickets_paginated.items)
+            **page_info
         })
+    except (InvalidCursor, FieldsetError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"GET_MY_TICKETS_ERROR: Customer {current_customer_id} - {str(e)}")
         return jsonify({'error': "Failed to retrieve your tickets."}), 500  
     
 @service_ticket_bp.route("/mechanic/my-tickets", methods = ['GET'])
 @mechanic_token_required
+@conditional(lambda current_mechanic_id: (current_mechanic_id, collection_versions(*TICKET_COUNTERS)))
 def get_my_assigned_tickets(current_mechanic_id):
     try:
         mechanic = Mechanic.query.get_or_404(current_mechanic_id)
     
-        page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type = int)
         status_filter = request.args.get('status', '').strip().lower()
     
         if per_page > 50:
             per_page = 50
     
-        tickets_query = ServiceTicket.query.filter(ServiceTicket.mechanics.contains(mechanic))
+        view = TICKET_FIELDSET.view(default_schema = tickets_schema)
+        assigned_query = tickets_for_mechanic(current_mechanic_id, view.options)
         
         if status_filter and status_filter in ['open', 'in_progress', 'completed', 'cancelled']:
-            tickets_query = tickets_query.filter(ServiceTicket.status == status_filter)
+            assigned_query = assigned_query.filter(ServiceTicket.status == status_filter)
         
-        total_count = tickets_query.count()
-        tickets_paginated = tickets_query.paginate(page = page, per_page = per_page, error_out = False)
+        page_info = _ticket_page(assigned_query, per_page, "assigned_ticket_count", schema = view.schema)
     
         logger.info(f"GET_MY_ASSIGNED_TICKETS: Mechanic {current_mechanic_id} viewed their assigned tickets.")
     
         return jsonify({
             "mechanic_id": current_mechanic_id,
             "mechanic_name": mechanic.name,
-            "assigned_ticket_count": total_count,
             "status_filter": status_filter if status_filter else "all",
-            "current_page": tickets_paginated.page,
-            "total_pages": tickets_paginated.pages,
-            "tickets": tickets_schema.dump(tickets_paginated.items)
+            **page_info
         })
+    except (InvalidCursor, FieldsetError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"GET_MY_ASSIGNED_TICKETS_ERROR: Mechanic {current_mechanic_id} - {str(e)}")
         return jsonify({'error': "Failed to retrieve your assigned tickets."}), 500
 
 @service_ticket_bp.route("/<int:ticket_id>/assign-mechanic/<int:mechanic_id>", methods = ['PUT'])
-def assign_mechanic(ticket_id, mechanic_id):
-
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    
-    if not token:
-        return jsonify({'error': 'Authorization token required.'}), 401
-    
-    from app.autho.utils import decode_admin_token
-    admin_id = decode_admin_token(token)
-    
-    from app.autho.utils import decode_mechanic_token
-    mechanic_requesting_id = decode_mechanic_token(token)
-    
-    if not admin_id and not mechanic_requesting_id:
-        return jsonify({'error': 'Invalid or expired token.'}), 401
-    
+@roles_required('admin', 'mechanic')
+def assign_mechanic(principal, ticket_id, mechanic_id):
     try:
         ticket = ServiceTicket.query.get_or_404(ticket_id)
         mechanic_to_assign = Mechanic.query.get_or_404(mechanic_id)
         
-        if mechanic_requesting_id and not admin_id:
-            requesting_mechanic = Mechanic.query.get(mechanic_requesting_id)
-            if requesting_mechanic not in ticket.mechanics:
-                return jsonify({
-                    'error': 'Only the mechanic who created this ticket or an admin can assign mechanics.'
-                }), 403
+        if not can_modify_ticket(principal, ticket_id):
+            return jsonify({
+                'error': 'Only the mechanic who created this ticket or an admin can assign mechanics.'
+            }), 403
         
-        if mechanic_to_assign in ticket.mechanics:
+        if is_assigned(ticket_id, mechanic_id):
             return jsonify({
                 'message': f'Mechanic {mechanic_to_assign.name} is already assigned to this ticket.',
                 'ticket': ticket_schema.dump(ticket)
@@ -238,11 +438,11 @@ def assign_mechanic(ticket_id, mechanic_id):
         
         ticket.mechanics.append(mechanic_to_assign)
         db.session.commit()
+        remember_assignment(ticket_id, mechanic_id, True)
+        invalidate_ticket_dashboards([ticket_id])
+        publish_ticket_event('ticket.assigned', ticket_id, mechanic_id = mechanic_id)
         
-        user_type = "Admin" if admin_id else "Mechanic"
-        user_id = admin_id if admin_id else mechanic_requesting_id
-        
-        logger.info(f"TICKET_ASSIGN: {user_type} {user_id} assigned Mechanic {mechanic_id} ({mechanic_to_assign.name}) to ticket {ticket_id}.")
+        logger.info(f"TICKET_ASSIGN: {principal.label} {principal.id} assigned Mechanic {mechanic_id} ({mechanic_to_assign.name}) to ticket {ticket_id}.")
         
         return jsonify({
             'message': f'Mechanic {mechanic_to_assign.name} was successfully assigned to ticket {ticket_id}.',
@@ -263,39 +463,25 @@ def assign_mechanic(ticket_id, mechanic_id):
         return jsonify({'error': f"Failed to assign mechanic: {str(e)}"}), 500
 
 @service_ticket_bp.route("/<int:ticket_id>/remove-mechanic/<int:mechanic_id>", methods = ['PUT'])
-def remove_mechanic(ticket_id, mechanic_id):
-
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    
-    if not token:
-        return jsonify({'error': 'Authorization token required'}), 401
-    
-    from app.autho.utils import decode_admin_token, decode_mechanic_token
-    admin_id = decode_admin_token(token)
-    mechanic_requesting_id = decode_mechanic_token(token)
-    
-    if not admin_id and not mechanic_requesting_id:
-        return jsonify({'error': 'Invalid or expired token'}), 401
-    
+@roles_required('admin', 'mechanic')
+def remove_mechanic(principal, ticket_id, mechanic_id):
     try:
         ticket = ServiceTicket.query.get_or_404(ticket_id)
         mechanic_to_remove = Mechanic.query.get_or_404(mechanic_id)
         
-        if mechanic_requesting_id and not admin_id:
-            requesting_mechanic = Mechanic.query.get(mechanic_requesting_id)
-            if requesting_mechanic not in ticket.mechanics:
-                return jsonify({
-                    'error': 'Only mechanics assigned to this ticket or admins can remove mechanics.'
-                }), 403
+        if not can_modify_ticket(principal, ticket_id):
+            return jsonify({
+                'error': 'Only mechanics assigned to this ticket or admins can remove mechanics.'
+            }), 403
     
-        if mechanic_to_remove in ticket.mechanics:
+        if is_assigned(ticket_id, mechanic_id):
             ticket.mechanics.remove(mechanic_to_remove)
             db.session.commit()
+            remember_assignment(ticket_id, mechanic_id, False)
+            invalidate_ticket_dashboards([ticket_id], extra_mechanic_ids = [mechanic_id])
+            publish_ticket_event('ticket.unassigned', ticket_id, extra_mechanic_ids = [mechanic_id], mechanic_id = mechanic_id)
             
-            user_type = "Admin" if admin_id else "Mechanic"
-            user_id = admin_id if admin_id else mechanic_requesting_id
-            
-            logger.info(f"TICKET_REMOVE_MECHANIC: {user_type} {user_id} removed Mechanic {mechanic_id} from ticket {ticket_id}.")
+            logger.info(f"TICKET_REMOVE_MECHANIC: {principal.label} {principal.id} removed Mechanic {mechanic_id} from ticket {ticket_id}.")
             
             return jsonify({
                 'message': f'Mechanic {mechanic_to_remove.name} was removed from ticket {ticket_id}.',
@@ -315,25 +501,15 @@ def remove_mechanic(ticket_id, mechanic_id):
         return jsonify({'error': f"Failed to remove mechanic: {str(e)}"}), 500
 
 @service_ticket_bp.route("/<int:ticket_id>/add-part/<int:inventory_id>", methods = ['PUT'])
-def add_part_to_ticket(ticket_id, inventory_id):
-
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    
-    if not token:
-        return jsonify({'error': 'Authorization token required'}), 401
-    
-    from app.autho.utils import decode_mechanic_token
-    mechanic_requesting_id = decode_mechanic_token(token)
-    
-    if not mechanic_requesting_id:
-        return jsonify({'error': 'Invalid or expired mechanic token'}), 401
+@roles_required('mechanic')
+def add_part_to_ticket(principal, ticket_id, inventory_id):
+    mechanic_requesting_id = principal.id
     
     try:
         ticket = ServiceTicket.query.get_or_404(ticket_id)
         part = Inventory.query.get_or_404(inventory_id)
         
-        requesting_mechanic = Mechanic.query.get(mechanic_requesting_id)
-        if requesting_mechanic not in ticket.mechanics:
+        if not is_assigned(ticket_id, mechanic_requesting_id):
             return jsonify({
                 'error': 'Only mechanics assigned to this ticket can add parts.'
             }), 403
@@ -344,14 +520,21 @@ def add_part_to_ticket(ticket_id, inventory_id):
                 'ticket': ticket_schema.dump(ticket)
             }), 200
         
-        if part.quantity <= 0:
+        ticket.parts.append(part)
+        db.session.flush()
+        
+        remaining_quantity = reserve_stock(inventory_id, service_ticket_id = ticket_id)
+        if remaining_quantity is None:
+            db.session.rollback()
+            part = Inventory.query.get_or_404(inventory_id)
             return jsonify({
                 'error': f'Part {part.name} is out of stock (quantity: {part.quantity}).'
             }), 400
         
-        ticket.parts.append(part)
-        
         db.session.commit()
+        invalidate_ticket_dashboards([ticket_id], extra_mechanic_ids = mechanics_for_parts([inventory_id]))
+        publish_ticket_event('ticket.part_added', ticket_id, inventory_id = inventory_id)
+        invalidate_part_responses([inventory_id])
         
         logger.info(f"TICKET_ADD_PART: Mechanic {mechanic_requesting_id} added part {inventory_id} ({part.name}) to ticket {ticket_id}.")
         
@@ -362,7 +545,7 @@ def add_part_to_ticket(ticket_id, inventory_id):
                 'id': part.id,
                 'name': part.name,
                 'price': part.price,
-                'remaining_quantity': part.quantity
+                'remaining_quantity': remaining_quantity
             },
             'total_parts': len(ticket.parts)
         }), 200
@@ -373,25 +556,15 @@ def add_part_to_ticket(ticket_id, inventory_id):
         return jsonify({'error': f"Failed to add part to ticket: {str(e)}"}), 500
     
 @service_ticket_bp.route("/<int:ticket_id>/remove-part/<int:inventory_id>", methods = ['PUT'])
-def remove_part_from_ticket(ticket_id, inventory_id):
-
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    
-    if not token:
-        return jsonify({'error': 'Authorization token required'}), 401
-    
-    from app.autho.utils import decode_mechanic_token
-    mechanic_requesting_id = decode_mechanic_token(token)
-    
-    if not mechanic_requesting_id:
-        return jsonify({'error': 'Invalid or expired mechanic token'}), 401
+@roles_required('mechanic')
+def remove_part_from_ticket(principal, ticket_id, inventory_id):
+    mechanic_requesting_id = principal.id
     
     try:
         ticket = ServiceTicket.query.get_or_404(ticket_id)
         part = Inventory.query.get_or_404(inventory_id)
         
-        requesting_mechanic = Mechanic.query.get(mechanic_requesting_id)
-        if requesting_mechanic not in ticket.mechanics:
+        if not is_assigned(ticket_id, mechanic_requesting_id):
             return jsonify({
                 'error': 'Only mechanics assigned to this ticket can remove parts.'
             }), 403
@@ -403,8 +576,13 @@ def remove_part_from_ticket(ticket_id, inventory_id):
             }), 200
         
         ticket.parts.remove(part)
-                
+        db.session.flush()
+        release_stock(inventory_id, service_ticket_id = ticket_id)
+        
         db.session.commit()
+        invalidate_ticket_dashboards([ticket_id], extra_mechanic_ids = mechanics_for_parts([inventory_id]))
+        publish_ticket_event('ticket.part_removed', ticket_id, inventory_id = inventory_id)
+        invalidate_part_responses([inventory_id])
         
         logger.info(f"TICKET_REMOVE_PART: Mechanic {mechanic_requesting_id} removed part {inventory_id} ({part.name}) from ticket {ticket_id}.")
         
@@ -432,20 +610,8 @@ def remove_part_from_ticket(ticket_id, inventory_id):
         return jsonify({'error': f"Failed to remove part from ticket: {str(e)}"}), 500
 
 @service_ticket_bp.route("/<int:ticket_id>/status", methods = ['PUT'])
-def update_ticket_status(ticket_id):
-
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    
-    if not token:
-        return jsonify({'error': 'Authorization token required.'}), 401
-    
-    from app.autho.utils import decode_admin_token, decode_mechanic_token
-    admin_id = decode_admin_token(token)
-    mechanic_requesting_id = decode_mechanic_token(token)
-    
-    if not admin_id and not mechanic_requesting_id:
-        return jsonify({'error': 'Invalid or expired token'}), 401
-    
+@roles_required('admin', 'mechanic')
+def update_ticket_status(principal, ticket_id):
     data = request.get_json()
     
     if not data or 'status' not in data:
@@ -457,15 +623,21 @@ def update_ticket_status(ticket_id):
     if new_status not in valid_statuses:
         return jsonify({'error': f"Invalid status. Must be one of: {', '.join(valid_statuses)}"}), 400
     
+    try:
+        expected_versions = _if_match_versions()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         ticket = ServiceTicket.query.get_or_404(ticket_id)
         
-        if mechanic_requesting_id and not admin_id:
-            requesting_mechanic = Mechanic.query.get(mechanic_requesting_id)
-            if requesting_mechanic not in ticket.mechanics:
-                return jsonify({
-                    'error': 'Only mechanics assigned to this ticket or admins can update status.'
-                }), 403
+        if not can_modify_ticket(principal, ticket_id):
+            return jsonify({
+                'error': 'Only mechanics assigned to this ticket or admins can update status.'
+            }), 403
+        
+        if expected_versions is not None and ticket.version not in expected_versions:
+            return _ticket_conflict(ticket_id)
         
         old_status = ticket.status
         ticket.status = new_status
@@ -480,11 +652,10 @@ def update_ticket_status(ticket_id):
             ticket.repair = data['repair']
         
         db.session.commit()
+        invalidate_ticket_dashboards([ticket_id])
+        publish_ticket_event('ticket.status', ticket_id, old_status = old_status)
         
-        user_type = "Admin" if admin_id else "Mechanic"
-        user_id = admin_id if admin_id else mechanic_requesting_id
-        
-        logger.info(f"TICKET_STATUS_UPDATE: {user_type} {user_id} updated ticket {ticket_id} status from '{old_status}' to '{new_status}'")
+        logger.info(f"TICKET_STATUS_UPDATE: {principal.label} {principal.id} updated ticket {ticket_id} status from '{old_status}' to '{new_status}'")
         
         response_data = {
             'message': f'Ticket {ticket_id} status updated from "{old_status}" to "{new_status}"',
@@ -496,42 +667,41 @@ def update_ticket_status(ticket_id):
         if 'hours_worked' in data:
             response_data['hours_updated'] = f"Hours worked: {old_hours} {data['hours_worked']}."
         
-        return jsonify(response_data), 200
+        response = jsonify(response_data)
+        response.set_etag(str(ticket.version))
+        return response, 200
         
+    except StaleDataError:
+        logger.info(f"TICKET_STATUS_CONFLICT: {principal.label} {principal.id} lost a concurrent update of ticket {ticket_id}.")
+        return _ticket_conflict(ticket_id)
     except Exception as e:
         db.session.rollback()
         logger.error(f"TICKET_STATUS_UPDATE_ERROR: Ticket {ticket_id} - {str(e)}")
         return jsonify({'error': f"Failed to update ticket status: {str(e)}"}), 500
     
 @service_ticket_bp.route("/<int:ticket_id>/update", methods = ['PUT'])
-def update_ticket_details(ticket_id):
-
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    
-    if not token:
-        return jsonify({'error': 'Authorization token required'}), 401
-    
-    from app.autho.utils import decode_admin_token, decode_mechanic_token
-    admin_id = decode_admin_token(token)
-    mechanic_requesting_id = decode_mechanic_token(token)
-    
-    if not admin_id and not mechanic_requesting_id:
-        return jsonify({'error': 'Invalid or expired token'}), 401
-    
+@roles_required('admin', 'mechanic')
+def update_ticket_details(principal, ticket_id):
     data = request.get_json()
     
     if not data:
         return jsonify({'error': "No data provided."}), 400
     
+    try:
+        expected_versions = _if_match_versions()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         ticket = ServiceTicket.query.get_or_404(ticket_id)
         
-        if mechanic_requesting_id and not admin_id:
-            requesting_mechanic = Mechanic.query.get(mechanic_requesting_id)
-            if requesting_mechanic not in ticket.mechanics:
-                return jsonify({
-                    'error': 'Only mechanics assigned to this ticket or admins can update the details.'
-                }), 403
+        if not can_modify_ticket(principal, ticket_id):
+            return jsonify({
+                'error': 'Only mechanics assigned to this ticket or admins can update the details.'
+            }), 403
+        
+        if expected_versions is not None and ticket.version not in expected_versions:
+            return _ticket_conflict(ticket_id)
         
         old_values = {
             'description': ticket.description,
@@ -555,25 +725,95 @@ def update_ticket_details(ticket_id):
             ticket.repair = data['repair']
         
         db.session.commit()
-        
-        user_type = "Admin" if admin_id else "Mechanic"
-        user_id = admin_id if admin_id else mechanic_requesting_id
+        invalidate_ticket_dashboards([ticket_id])
         
         changes = []
+        changed_fields = []
         for field, old_value in old_values.items():
             new_value = getattr(ticket, field)
             if old_value != new_value:
                 changes.append(f"{field}: '{old_value}' - '{new_value}'")
+                changed_fields.append(field)
+        publish_ticket_event('ticket.updated', ticket_id, fields = changed_fields)
         
-        logger.info(f"TICKET_UPDATE: {user_type} {user_id} updated ticket {ticket_id}. Changes: {', '.join(changes)}")
+        logger.info(f"TICKET_UPDATE: {principal.label} {principal.id} updated ticket {ticket_id}. Changes: {', '.join(changes)}")
         
-        return jsonify({
+        response = jsonify({
             'message': f'Ticket {ticket_id} details updated successfully.',
             'ticket': ticket_schema.dump(ticket),
             'updated_fields': list(data.keys())
-        }), 200
+        })
+        response.set_etag(str(ticket.version))
+        return response, 200
         
+    except StaleDataError:
+        logger.info(f"TICKET_UPDATE_CONFLICT: {principal.label} {principal.id} lost a concurrent update of ticket {ticket_id}.")
+        return _ticket_conflict(ticket_id)
     except Exception as e:
         db.session.rollback()
         logger.error(f"TICKET_UPDATE_ERROR: Ticket {ticket_id} - {str(e)}")
-        return jsonify({'error': f"Failed to update ticket details: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({'error': f"Failed to update ticket details: {str(e)}"}), 500
+
+@service_ticket_bp.route("/batch", methods = ['POST'])
+@roles_required('admin', 'mechanic')
+def batch_update_tickets(principal):
+    data = request.get_json(silent = True)
+    
+    if not data or not isinstance(data.get('operations'), list) or not data['operations']:
+        return jsonify({'error': "operations must be a non-empty list."}), 400
+    
+    max_operations = current_app.config['TICKET_BATCH_MAX_OPERATIONS']
+    if len(data['operations']) > max_operations:
+        return jsonify({'error': f"A batch can contain at most {max_operations} operations."}), 400
+    
+    atomic = bool(data.get('atomic', False))
+    batch = TicketBatch(data['operations'], principal)
+    
+    try:
+        committed = batch.run(atomic = atomic)
+    except BatchError as e:
+        db.session.rollback()
+        logger.info(f"TICKET_BATCH_CONFLICT: {principal.label} {principal.id} - {str(e)}")
+        return jsonify({'error': f"{str(e)} No operations were applied."}), 409
+    except IntegrityError as e:
+        db.session.rollback()
+        logger.info(f"TICKET_BATCH_CONFLICT: {principal.label} {principal.id} - {str(e.orig)}")
+        return jsonify({'error': "Another request changed the same assignments or parts. No operations were applied."}), 409
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"TICKET_BATCH_ERROR: {principal.label} {principal.id} - {str(e)}")
+        return jsonify({'error': f"Failed to apply batch: {str(e)}"}), 500
+    
+    summary = batch.summary
+    
+    if not committed:
+        logger.info(f"TICKET_BATCH_REJECTED: {principal.label} {principal.id} batch of {len(data['operations'])} rejected, {summary['failed']} failed.")
+        return jsonify({'error': "Batch rejected; no operations were applied.", **summary}), 422
+    
+    moved_parts = {inventory_id for _, inventory_id in batch.parts_added | batch.parts_removed}
+    invalidate_ticket_dashboards(batch.touched_tickets, extra_mechanic_ids = [
+        *(mechanic_id for _, mechanic_id in batch.unassigned),
+        *(mechanics_for_parts(moved_parts) if moved_parts else ())
+    ])
+    publish_batch_events(batch)
+    if moved_parts:
+        invalidate_part_responses(moved_parts)
+    logger.info(f"TICKET_BATCH: {principal.label} {principal.id} applied {summary['applied']} of {len(data['operations'])} operations.")
+    return jsonify(summary), 200
+
+@service_ticket_bp.route("/events", methods = ['GET'])
+@roles_required('admin', 'mechanic', 'customer')
+def ticket_events(principal):
+    try:
+        last_event_id = requested_last_event_id()
+    except ValueError:
+        return jsonify({'error': "Last-Event-ID must be a non-negative integer."}), 400
+    
+    if principal.is_admin:
+        can_see = lambda event: event.type.startswith('ticket.')
+    else:
+        viewer = (principal.role, principal.id)
+        can_see = lambda event: event.type.startswith('ticket.') and viewer in event.audience
+    
+    logger.info(f"TICKET_EVENTS: {principal.label} {principal.id} opened the ticket event stream (Last-Event-ID {last_event_id}).")
+    return event_stream_response(can_see, last_event_id)
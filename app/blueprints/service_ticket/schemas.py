@@ -9,6 +9,7 @@ class CustomerSchema(ma.SQLAlchemyAutoSchema):
         model = Customer
         load_instance = True
         exclude = ("password",)
+        dump_only = ("version",)
         
 class LoginSchema(ma.SQLAlchemyAutoSchema):
     email = fields.Email(required = True)
@@ -24,6 +25,7 @@ class ServiceTicketSchema(ma.SQLAlchemyAutoSchema):
         include_fk = True
         load_instance = True
         sqla_session = db.session
+        dump_only = ("version",)
         
     id = fields.Integer(dump_only = True)
     customer_id = fields.Integer(required = True)
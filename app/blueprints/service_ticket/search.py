@@ -0,0 +1,115 @@
+import re
+from sqlalchemy import event, inspect, literal_column, func, table, column
+from app.extensions import db
+from app.models import ServiceTicket
+
+# Ticket search runs on the database's own inverted index: an external
+# content FTS5 table kept in sync by triggers on SQLite, and a generated,
+# GIN-indexed tsvector column on PostgreSQL. Either way every write to
+# service_ticket, from the ORM or from set-based UPDATEs, updates the index
+# in the same transaction. Other dialects fall back to a LIKE scan.
+#
+# Every search term is matched as a prefix, so "brak squ" finds
+# "brake squeal" and the first characters of a VIN find the vehicle.
+
+FTS_TABLE = "service_ticket_fts"
+fts = table(FTS_TABLE, column("rowid"))
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "description, repair, vehicle_id, content='service_ticket', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    f"CREATE TRIGGER IF NOT EXISTS service_ticket_fts_insert AFTER INSERT ON service_ticket BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, description, repair, vehicle_id) "
+    "VALUES (new.id, new.description, new.repair, new.vehicle_id); END",
+    f"CREATE TRIGGER IF NOT EXISTS service_ticket_fts_delete AFTER DELETE ON service_ticket BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, repair, vehicle_id) "
+    "VALUES ('delete', old.id, old.description, old.repair, old.vehicle_id); END",
+    f"CREATE TRIGGER IF NOT EXISTS service_ticket_fts_update AFTER UPDATE OF description, repair, vehicle_id "
+    f"ON service_ticket BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, repair, vehicle_id) "
+    "VALUES ('delete', old.id, old.description, old.repair, old.vehicle_id); "
+    f"INSERT INTO {FTS_TABLE}(rowid, description, repair, vehicle_id) "
+    "VALUES (new.id, new.description, new.repair, new.vehicle_id); END",
+]
+
+POSTGRES_DDL = [
+    "ALTER TABLE service_ticket ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(description, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(vehicle_id, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(repair, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_service_ticket_search_vector ON service_ticket USING GIN (search_vector)",
+]
+
+def _terms(search):
+    return re.findall(r"\w+", search.lower())
+
+def install_search_index(connection):
+    """Create the search index for service_ticket if the dialect supports one.
+
+    Safe to run repeatedly. Returns True when the SQLite FTS table had to be
+    created, in which case existing rows still need rebuild_search_index().
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        created = not inspect(connection).has_table(FTS_TABLE)
+        for statement in SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+        return created
+    if dialect == "postgresql":
+        for statement in POSTGRES_DDL:
+            connection.exec_driver_sql(statement)
+    return False
+
+def rebuild_search_index(connection):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+def ensure_search_index():
+    """Install the index on an existing database and backfill it."""
+    with db.engine.begin() as connection:
+        if install_search_index(connection):
+            rebuild_search_index(connection)
+
+@event.listens_for(ServiceTicket.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+@event.listens_for(ServiceTicket.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+def search_tickets(query, search):
+    """Restrict a ServiceTicket query to matches for search, best match first.
+
+    Returns None when search has no usable terms.
+    """
+    terms = _terms(search)
+    if not terms:
+        return None
+
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        # bm25 ranks lower-is-better; description and VIN outweigh repair notes.
+        rank = literal_column(f"bm25({FTS_TABLE}, 10.0, 2.0, 10.0)")
+        return (query.join(fts, fts.c.rowid == ServiceTicket.id)
+                .filter(literal_column(FTS_TABLE).match(match))
+                .order_by(rank, ServiceTicket.id.desc()))
+
+    if dialect == "postgresql":
+        vector = literal_column("service_ticket.search_vector")
+        tsquery = func.to_tsquery("english", " & ".join(f"{term}:*" for term in terms))
+        return (query.filter(vector.op("@@")(tsquery))
+                .order_by(func.ts_rank_cd(vector, tsquery).desc(), ServiceTicket.id.desc()))
+
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.filter(
+            ServiceTicket.description.ilike(pattern)
+            | ServiceTicket.repair.ilike(pattern)
+            | ServiceTicket.vehicle_id.ilike(pattern)
+        )
+    return query.order_by(ServiceTicket.id.desc())
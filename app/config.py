@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 
 def _normalize_db_uri(uri: str | None) -> str | None:
     if not uri:
@@ -12,9 +13,40 @@ class BaseConfig:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-me")
     JSON_SORT_KEYS = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_TRACE_ENABLED = False
+    AUTH_TRACE_SAMPLE_RATE = float(os.getenv("AUTH_TRACE_SAMPLE_RATE", "0.01"))
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+    PASSWORD_HASH_TIMEOUT = 10
+    RATELIMIT_STORAGE_URI = os.getenv(
+        "RATELIMIT_STORAGE_URI",
+        "sqlite:///" + os.path.join(tempfile.gettempdir(), "mechanic_shop_ratelimit.sqlite3")
+    )
+    RATELIMIT_STRATEGY = "sliding-window-counter"
+    TICKET_EXPORT_BATCH_SIZE = 500
+    TICKET_BATCH_MAX_OPERATIONS = 500
+    TICKET_COUNTS_MAX_IDS = 500
+    INVENTORY_IMPORT_CHUNK_SIZE = 1000
+    INVENTORY_IMPORT_MAX_REJECTS = 100
+    INVENTORY_EXPORT_BATCH_SIZE = 1000
+    STOCK_SNAPSHOT_INTERVAL = int(os.getenv("STOCK_SNAPSHOT_INTERVAL", "0"))
+    STOCK_SNAPSHOT_BATCH_SIZE = 10000
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "SimpleCache")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+    # SimpleCache lives in each worker's memory, so dashboards can lag a write
+    # by this long on the other workers; set CACHE_TYPE=RedisCache to share it.
+    DASHBOARD_CACHE_TIMEOUT = int(os.getenv("DASHBOARD_CACHE_TIMEOUT", "30" if CACHE_TYPE == "SimpleCache" else "300"))
+    RESPONSE_CACHE_TIMEOUT = 60
+    LABOR_RATE_CENTS = int(os.getenv("LABOR_RATE_CENTS", "9500"))
+    EVENT_BUFFER_SIZE = 1000
+    SSE_MAX_DURATION = 300
+    SSE_HEARTBEAT_INTERVAL = 15
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
+    AUTH_TRACE_ENABLED = True
+    AUTH_TRACE_SAMPLE_RATE = 1.0
     SQLALCHEMY_DATABASE_URI = _normalize_db_uri(
         os.getenv("DATABASE_URL", "sqlite:///dev.sqlite3")
     )
@@ -23,8 +55,13 @@ class TestingConfig(BaseConfig):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     RATELIMIT_ENABLED = False
+    RATELIMIT_STORAGE_URI = "memory://"
+    AUTH_TRACE_SAMPLE_RATE = 1.0
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
     CACHE_TYPE = "NullCache"
+    STOCK_SNAPSHOT_INTERVAL = 0
 
 class ProductionConfig(BaseConfig):
     DEBUG = False
+    AUTH_TRACE_ENABLED = os.getenv("AUTH_TRACE_ENABLED", "false").lower() == "true"
     SQLALCHEMY_DATABASE_URI = os.environ.get("SQLALCHEMY_DATABASE_URI")
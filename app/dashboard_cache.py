@@ -0,0 +1,89 @@
+from flask import current_app
+from sqlalchemy import select
+from app.extensions import db, cache
+from app.models import Mechanic, ServiceTicket, service_ticket_mechanic, service_ticket_inventory
+
+# Mechanic dashboards are cached per mechanic and dropped by the writes that
+# can change them, rather than expiring on a short timer. A ticket dump nests
+# its customer, parts and every assigned mechanic, so a change to any of those
+# invalidates the dashboards of all mechanics on the affected tickets.
+# total_mechanics is shared by every dashboard and cached on its own key.
+# Moving stock changes the part quantities nested in every ticket holding
+# that part, so those dashboards go too.
+#
+# Invalidation only reaches the cache it runs against. With a shared backend
+# (RedisCache) that is every worker's; with the process-local SimpleCache it
+# is only the writing worker's, and the others keep their copy until
+# DASHBOARD_CACHE_TIMEOUT, which is why that defaults to 30 seconds there
+# instead of 300.
+
+MECHANIC_COUNT_KEY = "mechanic_dashboard:total_mechanics"
+
+def dashboard_key(mechanic_id):
+    return f"mechanic_dashboard:{mechanic_id}"
+
+def cached_dashboard(mechanic_id, build):
+    """Return the cached dashboard for mechanic_id, building it on a miss.
+
+    build(mechanic_id) returns the payload, or None when there is nothing
+    to show; None is not cached.
+    """
+    key = dashboard_key(mechanic_id)
+    payload = cache.get(key)
+
+    if payload is None:
+        payload = build(mechanic_id)
+        if payload is None:
+            return None
+        cache.set(key, payload, timeout = current_app.config['DASHBOARD_CACHE_TIMEOUT'])
+
+    return payload
+
+def total_mechanics():
+    total = cache.get(MECHANIC_COUNT_KEY)
+    if total is None:
+        total = Mechanic.query.count()
+        cache.set(MECHANIC_COUNT_KEY, total, timeout = current_app.config['DASHBOARD_CACHE_TIMEOUT'])
+    return total
+
+def invalidate_dashboards(mechanic_ids):
+    keys = [dashboard_key(mechanic_id) for mechanic_id in set(mechanic_ids)]
+    if keys:
+        cache.delete_many(*keys)
+
+def invalidate_mechanic_count():
+    cache.delete(MECHANIC_COUNT_KEY)
+
+def _mechanics_on(ticket_filter):
+    return db.session.scalars(
+        select(service_ticket_mechanic.c.mechanic_id).distinct().where(ticket_filter)
+    ).all()
+
+def mechanics_on_tickets(ticket_ids):
+    ticket_ids = set(ticket_ids)
+    if not ticket_ids:
+        return []
+    return _mechanics_on(service_ticket_mechanic.c.service_ticket_id.in_(ticket_ids))
+
+def invalidate_ticket_dashboards(ticket_ids, extra_mechanic_ids = ()):
+    invalidate_dashboards([*mechanics_on_tickets(ticket_ids), *extra_mechanic_ids])
+
+def colleagues_of(mechanic_id):
+    """Mechanics sharing a ticket with mechanic_id, including the mechanic."""
+    shared = select(service_ticket_mechanic.c.service_ticket_id).where(
+        service_ticket_mechanic.c.mechanic_id == mechanic_id
+    )
+    return [*_mechanics_on(service_ticket_mechanic.c.service_ticket_id.in_(shared)), mechanic_id]
+
+def mechanics_for_customer(customer_id):
+    tickets = select(ServiceTicket.id).where(ServiceTicket.customer_id == customer_id)
+    return _mechanics_on(service_ticket_mechanic.c.service_ticket_id.in_(tickets))
+
+def mechanics_for_part(inventory_id):
+    return mechanics_for_parts([inventory_id])
+
+def mechanics_for_parts(inventory_ids):
+    tickets = select(service_ticket_inventory.c.service_ticket_id).where(
+        service_ticket_inventory.c.inventory_id.in_(set(inventory_ids))
+    )
+    return _mechanics_on(service_ticket_mechanic.c.service_ticket_id.in_(tickets))
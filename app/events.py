@@ -0,0 +1,155 @@
+import itertools
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from flask import current_app, request, Response
+
+# Writes publish small change events to an in-process hub that keeps the
+# last EVENT_BUFFER_SIZE of them, and each Server-Sent Events connection
+# waits on the hub instead of polling the database. Event ids only ever go
+# up, so a client that reconnects with Last-Event-ID gets exactly what it
+# missed from the buffer; if that has already been dropped (or the id comes
+# from before a restart) it is sent a reset event and should refetch.
+#
+# The hub lives in the worker process: a deployment running several
+# workers only sees each worker's own writes on that worker's streams.
+
+Event = namedtuple('Event', ['id', 'type', 'data', 'audience'])
+
+class EventHub:
+    """Bounded, thread-safe buffer of published events."""
+
+    def __init__(self, size = 1000):
+        self._events = deque(maxlen = size)
+        self._ids = itertools.count(1)
+        self._changed = threading.Condition()
+        self.last_id = 0
+        self.published = 0
+        self.listeners = 0
+
+    def publish(self, type, data, audience = ()):
+        """Buffer an event and wake every waiting stream.
+
+        data is JSON-encoded once here rather than per listener; audience
+        is the set of (role, id) pairs allowed to see it besides admins.
+        """
+        payload = json.dumps(data, separators = (',', ':'))
+        with self._changed:
+            event = Event(next(self._ids), type, payload, frozenset(audience))
+            self._events.append(event)
+            self.last_id = event.id
+            self.published += 1
+            self._changed.notify_all()
+        return event
+
+    def since(self, last_id):
+        """Events after last_id, or None if some of them are no longer buffered."""
+        with self._changed:
+            if last_id > self.last_id:
+                return None
+            if last_id == self.last_id:
+                return []
+            first_id = self._events[0].id
+            if last_id < first_id - 1:
+                return None
+            return list(itertools.islice(self._events, last_id - first_id + 1, None))
+
+    def wait(self, last_id, timeout):
+        """Like since(), blocking up to timeout seconds for something new."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.last_id != last_id, timeout)
+            return self.since(last_id)
+
+    @contextmanager
+    def listening(self):
+        with self._changed:
+            self.listeners += 1
+        try:
+            yield
+        finally:
+            with self._changed:
+                self.listeners -= 1
+
+    def stats(self):
+        with self._changed:
+            return {
+                'last_id': self.last_id,
+                'published': self.published,
+                'buffered': len(self._events),
+                'buffer_size': self._events.maxlen,
+                'listeners': self.listeners
+            }
+
+def init_event_hub(app):
+    app.config.setdefault('EVENT_BUFFER_SIZE', 1000)
+    app.extensions['event_hub'] = EventHub(app.config['EVENT_BUFFER_SIZE'])
+
+def current_hub():
+    return current_app.extensions['event_hub']
+
+def _frame(event):
+    return f"id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n"
+
+def sse_stream(hub, can_see, last_id, max_duration = 300, heartbeat = 15, retry_ms = 3000):
+    """Generate an event stream of the hub events after last_id that
+    can_see(event) accepts.
+
+    Sends a comment every heartbeat seconds while idle so proxies keep the
+    connection open, and ends after max_duration seconds; the client's
+    EventSource reconnects on its own with the last id it saw.
+    """
+    deadline = time.monotonic() + max_duration
+
+    with hub.listening():
+        yield f"retry: {retry_ms}\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            events = hub.wait(last_id, min(heartbeat, remaining))
+            if events is None:
+                last_id = hub.last_id
+                yield f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+                continue
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+
+            visible = False
+            for event in events:
+                visible = can_see(event)
+                if visible:
+                    yield _frame(event)
+            last_id = events[-1].id
+            # An id-only frame moves the client's Last-Event-ID past events
+            # it was not shown, so a reconnect does not start further back.
+            if not visible:
+                yield f"id: {last_id}\n\n"
+
+def requested_last_event_id():
+    """The Last-Event-ID header (or last_event_id query argument), or None.
+
+    Raises ValueError unless it is a non-negative integer.
+    """
+    value = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    if value is None:
+        return None
+    value = int(value)
+    if value < 0:
+        raise ValueError(value)
+    return value
+
+def event_stream_response(can_see, last_event_id = None):
+    """A text/event-stream response of the current hub, starting after
+    last_event_id (or from now when it is None)."""
+    hub = current_hub()
+    if last_event_id is None:
+        last_event_id = hub.last_id
+
+    config = current_app.config
+    stream = sse_stream(hub, can_see, last_event_id,
+                        max_duration = config['SSE_MAX_DURATION'], heartbeat = config['SSE_HEARTBEAT_INTERVAL'])
+    return Response(stream, mimetype = "text/event-stream", headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
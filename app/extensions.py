@@ -4,9 +4,12 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
 from flask_migrate import Migrate
+# Imported for its side effect: defining the class registers the sqlite://
+# scheme with limits, so RATELIMIT_STORAGE_URI can point at a SQLite file.
+from app.ratelimit_storage import SQLiteStorage  # noqa: F401
 
 db = SQLAlchemy()
 ma = Marshmallow()
 limiter = Limiter(key_func=get_remote_address)
-cache = Cache(config={'CACHE_TYPE': "SimpleCache"})
+cache = Cache()
 migrate = Migrate()
\ No newline at end of file
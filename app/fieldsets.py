@@ -0,0 +1,77 @@
+from collections import namedtuple
+from functools import lru_cache
+from flask import request
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+# ?fields=id,status picks the scalar fields a client wants back and
+# ?include=customer,parts the relationships. Both feed the schema's only=
+# projection and the query's loader options together, so a relationship
+# that was not asked for is neither dumped nor loaded, and a narrow
+# fieldset only SELECTs its own columns. Without either parameter the
+# endpoint keeps its full default payload.
+
+FieldsetView = namedtuple('FieldsetView', ['schema', 'options'])
+
+class FieldsetError(ValueError):
+    pass
+
+def _names(param):
+    value = request.args.get(param)
+    if value is None:
+        return None
+    return list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+
+class Fieldset:
+    """Sparse fieldsets and opt-in includes for one schema.
+
+    relations maps each includable field to the loader option that loads
+    it; default_options is what the endpoint loads when neither parameter
+    is given. Fields in keep are always returned; columns in always_load
+    are always SELECTed (e.g. the keyset pagination columns).
+    """
+
+    def __init__(self, schema_class, relations = None, default_options = (), keep = ('id',), always_load = ()):
+        self.schema_class = schema_class
+        self.relations = dict(relations or {})
+        self.default_options = tuple(default_options)
+        self.keep = tuple(keep)
+        self.always_load = tuple(always_load)
+        self.model = schema_class.Meta.model
+        self.scalars = [name for name in schema_class().dump_fields if name not in self.relations]
+        self.columns = set(inspect(self.model).column_attrs.keys())
+        self._schema = lru_cache(maxsize = 64)(self._build_schema)
+
+    def _build_schema(self, only, many):
+        return self.schema_class(only = only, many = many)
+
+    def view(self, many = True, default_schema = None):
+        """FieldsetView for the current request, raising FieldsetError on unknown names."""
+        fields, include = _names('fields'), _names('include')
+
+        if fields is None and include is None:
+            schema = default_schema if default_schema is not None else self._schema(None, many)
+            return FieldsetView(schema, self.default_options)
+
+        fields = list(self.scalars) if fields is None else fields
+        include = include or []
+
+        unknown = [name for name in fields if name not in self.scalars and name not in self.relations]
+        if unknown:
+            raise FieldsetError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(self.scalars)}")
+        unknown = [name for name in include if name not in self.relations]
+        if unknown:
+            raise FieldsetError(f"Unknown include(s): {', '.join(unknown)}. Available: {', '.join(self.relations) or 'none'}")
+
+        # A relationship named in fields counts as included.
+        include = list(dict.fromkeys(include + [name for name in fields if name in self.relations]))
+        scalars = list(dict.fromkeys([*self.keep, *(name for name in fields if name in self.scalars)]))
+
+        options = [self.relations[name] for name in include]
+        # Defer unrequested columns only when every requested scalar is a
+        # plain column; a computed field may read columns we cannot see.
+        if all(name in self.columns for name in scalars):
+            loaded = dict.fromkeys([*scalars, *self.always_load])
+            options.append(load_only(*(getattr(self.model, name) for name in loaded)))
+
+        return FieldsetView(self._schema(frozenset(scalars + include), many), tuple(options))
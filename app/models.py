@@ -1,10 +1,16 @@
 from app.extensions import db
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy.ext.hybrid import hybrid_property
+
+def to_cents(amount):
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding = ROUND_HALF_UP))
 
 service_ticket_mechanic = db.Table('service_ticket_mechanic',
     db.Column('service_ticket_id', db.Integer, db.ForeignKey('service_ticket.id'), primary_key = True),
     db.Column('mechanic_id', db.Integer, db.ForeignKey('mechanic.id'), primary_key = True)
 )
+db.Index('ix_service_ticket_mechanic_mechanic_id', service_ticket_mechanic.c.mechanic_id, service_ticket_mechanic.c.service_ticket_id)
 
 service_ticket_inventory = db.Table('service_ticket_inventory',
     db.Column('service_ticket_id', db.Integer, db.ForeignKey('service_ticket.id'), primary_key = True),
@@ -22,11 +28,16 @@ class Mechanic(db.Model):
     hours_worked = db.Column(db.Integer, default = 0)
     password = db.Column(db.String(512), nullable = False)
     specialty = db.Column(db.String(128))
+    version = db.Column(db.Integer, nullable = False, default = 1, server_default = '1')
     
     service_tickets = db.relationship('ServiceTicket', secondary = service_ticket_mechanic, back_populates = 'mechanics')
     
 class ServiceTicket(db.Model):
     __tablename__ = 'service_ticket'
+    __table_args__ = (
+        db.Index('ix_service_ticket_created_at_id', 'created_at', 'id'),
+        db.Index('ix_service_ticket_customer_created_at_id', 'customer_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key = True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable = False)
@@ -36,11 +47,16 @@ class ServiceTicket(db.Model):
     vehicle_id = db.Column(db.String(200), nullable = True)
     hours_worked = db.Column(db.Integer, nullable = True, default = 0)
     repair = db.Column(db.String(500), nullable = True)
+    version = db.Column(db.Integer, nullable = False, default = 1, server_default = '1')
     
     mechanics = db.relationship('Mechanic', secondary = service_ticket_mechanic, back_populates = 'service_tickets')
     parts = db.relationship('Inventory', secondary = service_ticket_inventory, back_populates = 'service_tickets')
     customer = db.relationship('Customer', back_populates = 'service_tickets')
     
+    # Every UPDATE is issued as "... WHERE id = ? AND version = ?", so a write
+    # based on a stale read matches no row and raises StaleDataError.
+    __mapper_args__ = {'version_id_col': version}
+    
 class Customer(db.Model):
     __tablename__ = 'customer'
     
@@ -50,20 +66,75 @@ class Customer(db.Model):
     phone = db.Column(db.String(32))
     address = db.Column(db.String(256))
     password = db.Column(db.String(512), nullable = False)
+    version = db.Column(db.Integer, nullable = False, default = 1, server_default = '1')
     
     service_tickets = db.relationship("ServiceTicket", back_populates="customer", lazy = True) 
     
 class Inventory(db.Model):
     __tablename__ = 'inventory'
+    __table_args__ = (
+        db.CheckConstraint('quantity >= 0', name = 'ck_inventory_quantity_non_negative'),
+        db.CheckConstraint('reorder_point >= 0', name = 'ck_inventory_reorder_point_non_negative'),
+    )
     
     id = db.Column(db.Integer, primary_key = True)
     name = db.Column(db.String(128), nullable = False, unique = True)
     description = db.Column(db.String(256))
-    price = db.Column(db.Float, nullable = False)
-    quantity = db.Column(db.Integer, nullable = False, default = 0)
+    price_cents = db.Column(db.Integer, nullable = False)
+    quantity = db.Column(db.Integer, nullable = False, default = 0, index = True)
+    reorder_point = db.Column(db.Integer, nullable = False, default = 10, server_default = '10')
+    version = db.Column(db.Integer, nullable = False, default = 1, server_default = '1')
     
     service_tickets = db.relationship('ServiceTicket', secondary = service_ticket_inventory, back_populates = 'parts')
 
+    @hybrid_property
+    def price(self):
+        return self.price_cents / 100 if self.price_cents is not None else None
+
+    @price.inplace.setter
+    def _price_setter(self, value):
+        self.price_cents = to_cents(value)
+
+    @price.inplace.expression
+    @classmethod
+    def _price_expression(cls):
+        return cls.price_cents / 100.0
+
+# Only parts at or under their reorder point are in this index, most short
+# first, so the low-stock list is read straight off it in order.
+_below_reorder_point = Inventory.quantity <= Inventory.reorder_point
+db.Index('ix_inventory_low_stock', (Inventory.reorder_point - Inventory.quantity).desc(), Inventory.id,
+         sqlite_where = _below_reorder_point, postgresql_where = _below_reorder_point)
+
+class StockMovement(db.Model):
+    __tablename__ = 'stock_movement'
+    __table_args__ = (
+        db.Index('ix_stock_movement_inventory_id_id', 'inventory_id', 'id'),
+        db.Index('ix_stock_movement_inventory_id_created_at', 'inventory_id', 'created_at', 'id'),
+    )
+    
+    # Append-only: rows are never updated or deleted, and they outlive the
+    # part, so inventory_id is deliberately not a foreign key.
+    id = db.Column(db.Integer, primary_key = True)
+    inventory_id = db.Column(db.Integer, nullable = False)
+    kind = db.Column(db.String(16), nullable = False)
+    change = db.Column(db.Integer, nullable = False)
+    service_ticket_id = db.Column(db.Integer, nullable = True)
+    created_at = db.Column(db.DateTime, nullable = False, default = datetime.utcnow)
+
+class StockSnapshot(db.Model):
+    __tablename__ = 'stock_snapshot'
+    
+    inventory_id = db.Column(db.Integer, primary_key = True)
+    movement_id = db.Column(db.Integer, primary_key = True)
+    quantity = db.Column(db.Integer, nullable = False)
+
+class ChangeCounter(db.Model):
+    __tablename__ = 'change_counter'
+    
+    name = db.Column(db.String(64), primary_key = True)
+    value = db.Column(db.Integer, nullable = False, default = 0)
+
 class Admin(db.Model):
     __tablename__ = 'admin'
     id = db.Column(db.Integer, primary_key = True)
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate-limit counters in a SQLite file shared by every worker on a host.
+
+    Registered for ``sqlite:///path/to/file`` storage URIs. Each key is one
+    row, so a sliding-window-counter check is two primary-key reads and one
+    upsert inside a single ``BEGIN IMMEDIATE`` transaction, whatever the
+    traffic volume.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+    PURGE_EVERY = 1000
+
+    def __init__(self, uri = None, wrap_exceptions = False, **options):
+        super().__init__(uri, wrap_exceptions = wrap_exceptions, **options)
+        path = urlparse(uri).path if uri else ""
+        if path.startswith("/"):
+            path = path[1:]
+        self.path = path or ":memory:"
+        self.timeout = float(options.get("timeout", 5))
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_counter ("
+            "key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != pid:
+            conn = sqlite3.connect(self.path, timeout = self.timeout, isolation_level = None, check_same_thread = False)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def _incr(self, conn, key, expiry, amount, now):
+        row = conn.execute(
+            "INSERT INTO rate_limit_counter (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "value = CASE WHEN expires_at <= ? THEN excluded.value ELSE value + excluded.value END, "
+            "expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END "
+            "RETURNING value",
+            (key, amount, now + expiry, now, now)
+        ).fetchone()
+        with self._writes_lock:
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if purge:
+            conn.execute("DELETE FROM rate_limit_counter WHERE expires_at <= ?", (now,))
+        return row[0]
+
+    def _get(self, conn, key, now):
+        row = conn.execute(
+            "SELECT value FROM rate_limit_counter WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key, expiry, amount = 1):
+        return self._incr(self._connection(), key, expiry, amount, time.time())
+
+    def get(self, key):
+        return self._get(self._connection(), key, time.time())
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expires_at FROM rate_limit_counter WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        cursor = self._connection().execute("DELETE FROM rate_limit_counter")
+        return cursor.rowcount
+
+    def clear(self, key):
+        self._connection().execute("DELETE FROM rate_limit_counter WHERE key = ?", (key,))
+
+    def _window(self, conn, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(conn, previous_key, now)
+        current_count = self._get(conn, current_key, now)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return current_key, previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount = 1):
+        if amount > limit:
+            return False
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current_key, previous_count, previous_ttl, current_count, _ = self._window(conn, key, expiry, now)
+            weighted = previous_count * previous_ttl / expiry + current_count
+            if int(weighted) + amount > limit:
+                conn.execute("COMMIT")
+                return False
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_sliding_window(self, key, expiry):
+        conn = self._connection()
+        _, previous_count, previous_ttl, current_count, current_ttl = self._window(conn, key, expiry, time.time())
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
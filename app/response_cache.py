@@ -0,0 +1,129 @@
+import hashlib
+import secrets
+import threading
+import time
+from functools import wraps
+from flask import request, current_app, make_response
+from app.extensions import cache
+
+# Anonymous directory reads (the public parts list and part pages, the
+# mechanic directory) are served from the app cache, keyed by path, query
+# string and the current token of every tag the response depends on. A
+# write route "invalidates" a tag by giving it a new random token after its
+# commit, so every entry built under the old token simply stops being
+# looked up and ages out. A token is random rather than a counter so that
+# a tag evicted from the cache can never come back with an old value, and
+# tags are stored with a much longer timeout than entries because backends
+# that prune by expiry (SimpleCache) drop the soonest-expiring keys first.
+#
+# Like the dashboards, a process-local backend (SimpleCache) only sees the
+# invalidations made by its own worker; RESPONSE_CACHE_TIMEOUT bounds how
+# long another worker can serve an entry that is out of date.
+
+TAG_PREFIX = "response_tag:"
+KEY_PREFIX = "response:"
+TAG_TIMEOUT = 24 * 60 * 60
+
+class ResponseCacheMetrics:
+    """Hit/miss counts and latency per cached endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self.invalidations = 0
+
+    def observe(self, endpoint, hit, elapsed_ms):
+        with self._lock:
+            entry = self.endpoints.setdefault(endpoint, {'hits': 0, 'misses': 0, 'hit_ms': 0.0, 'miss_ms': 0.0})
+            if hit:
+                entry['hits'] += 1
+                entry['hit_ms'] += elapsed_ms
+            else:
+                entry['misses'] += 1
+                entry['miss_ms'] += elapsed_ms
+
+    def invalidated(self, count):
+        with self._lock:
+            self.invalidations += count
+
+    def stats(self):
+        with self._lock:
+            endpoints = {}
+            hits = misses = 0
+            for endpoint, entry in self.endpoints.items():
+                hits += entry['hits']
+                misses += entry['misses']
+                endpoints[endpoint] = {
+                    'hits': entry['hits'],
+                    'misses': entry['misses'],
+                    'hit_ratio': round(entry['hits'] / (entry['hits'] + entry['misses']), 4),
+                    'hit_avg_ms': round(entry['hit_ms'] / entry['hits'], 4) if entry['hits'] else 0.0,
+                    'miss_avg_ms': round(entry['miss_ms'] / entry['misses'], 4) if entry['misses'] else 0.0
+                }
+            return {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                'invalidations': self.invalidations,
+                'endpoints': endpoints
+            }
+
+response_cache_metrics = ResponseCacheMetrics()
+
+def response_cache_stats():
+    return response_cache_metrics.stats()
+
+def _tag_tokens(tags):
+    keys = [TAG_PREFIX + tag for tag in tags]
+    tokens = cache.get_many(*keys)
+    missing = {key: secrets.token_hex(8) for key, token in zip(keys, tokens) if token is None}
+    if missing:
+        cache.set_many(missing, timeout = TAG_TIMEOUT)
+        tokens = [token if token is not None else missing[key] for key, token in zip(keys, tokens)]
+    return tuple(tokens)
+
+def invalidate_tags(*tags):
+    """Drop every cached response tagged with any of tags. Call after commit."""
+    tags = set(tags)
+    if tags:
+        cache.set_many({TAG_PREFIX + tag: secrets.token_hex(8) for tag in tags}, timeout = TAG_TIMEOUT)
+        response_cache_metrics.invalidated(len(tags))
+
+def invalidate_part_responses(part_ids = ()):
+    invalidate_tags('inventory', *(f"part:{part_id}" for part_id in part_ids))
+
+def invalidate_mechanic_responses(mechanic_ids = ()):
+    invalidate_tags('mechanics', *(f"mechanic:{mechanic_id}" for mechanic_id in mechanic_ids))
+
+def cached_response(*tags):
+    """Cache a public GET view's 200 responses by path and query string.
+
+    tags are formatted with the view's keyword arguments, e.g. "part:{id}".
+    Other statuses and streamed responses are never stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def decorated(*args, **kwargs):
+            start = time.perf_counter()
+            names = [tag.format(**kwargs) for tag in tags]
+            identity = (request.path, sorted(request.args.items(multi = True)), names, _tag_tokens(names))
+            key = KEY_PREFIX + hashlib.blake2b(repr(identity).encode(), digest_size = 16).hexdigest()
+
+            entry = cache.get(key)
+            if entry is not None:
+                body, mimetype = entry
+                response = current_app.response_class(body, mimetype = mimetype)
+                response_cache_metrics.observe(request.endpoint, True, (time.perf_counter() - start) * 1000)
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                cache.set(key, (response.get_data(), response.mimetype), timeout = current_app.config['RESPONSE_CACHE_TIMEOUT'])
+            response_cache_metrics.observe(request.endpoint, False, (time.perf_counter() - start) * 1000)
+            return response
+        return decorated
+    return decorator
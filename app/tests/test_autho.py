@@ -0,0 +1,250 @@
+import unittest
+import time
+import io
+from contextlib import redirect_stdout
+from werkzeug.security import generate_password_hash
+from jose import JWTError
+from app import create_app, db
+from app.models import Mechanic
+from app.autho.utils import (
+    encode_mechanic_token, encode_customer_token, encode_admin_token,
+    decode_token, roles_required
+)
+from app.autho.token_cache import TokenCache, token_cache
+from app.autho import utils
+from app.autho.instrumentation import auth_metrics, token_fingerprint
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+class TokenCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            mechanic = Mechanic(
+                name = "Cache Mechanic",
+                username = "cachemech",
+                email = "cache@test.com",
+                phone = "55500000",
+                password = generate_password_hash("mechpass")
+            )
+            db.session.add(mechanic)
+            db.session.commit()
+
+            self.mechanic_id = mechanic.id
+            self.mechanic_token = encode_mechanic_token(self.mechanic_id)
+
+        token_cache.clear()
+
+    def tearDown(self):
+        token_cache.clear()
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_repeat_requests_hit_cache(self):
+        headers = {"Authorization": f"Bearer {self.mechanic_token}"}
+        for _ in range(3):
+            response = self.client.get("/mechanics/profile", headers = headers)
+            self.assertEqual(response.status_code, 200)
+
+        stats = token_cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 2)
+
+    def test_metrics_exposes_token_cache(self):
+        headers = {"Authorization": f"Bearer {self.mechanic_token}"}
+        self.client.get("/mechanics/profile", headers = headers)
+        with self.app.app_context():
+            admin_headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+        response = self.client.get("/metrics", headers = admin_headers)
+        self.assertEqual(response.status_code, 200)
+        # The admin token's own lookup is the second miss.
+        self.assertEqual(response.get_json()['token_cache']['misses'], 2)
+
+    def test_metrics_requires_admin(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get("/metrics", headers = {"Authorization": f"Bearer {self.mechanic_token}"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_token_is_not_cached(self):
+        headers = {"Authorization": "Bearer not-a-real-token"}
+        response = self.client.get("/mechanics/profile", headers = headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    def test_entry_evicted_at_exp(self):
+        cache = TokenCache(maxsize = 4)
+        cache.put("expired", {'sub': '1', 'exp': time.time() - 1})
+        self.assertIsNone(cache.get("expired"))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_cache_is_bounded(self):
+        cache = TokenCache(maxsize = 2)
+        exp = time.time() + 60
+        for token in ("a", "b", "c"):
+            cache.put(token, {'sub': token, 'exp': exp})
+        self.assertEqual(cache.stats()['size'], 2)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c")['sub'], "c")
+
+    def test_rotated_secret_does_not_reuse_cached_claims(self):
+        with self.app.app_context():
+            decode_token(self.mechanic_token)
+        self.app.config['SECRET_KEY'] = "rotated-secret-key"
+        with self.app.app_context():
+            with self.assertRaises(JWTError):
+                decode_token(self.mechanic_token)
+
+    def test_cached_claims_are_copies(self):
+        with self.app.app_context():
+            decode_token(self.mechanic_token)['role'] = 'admin'
+            self.assertEqual(decode_token(self.mechanic_token)['role'], 'mechanic')
+        self.assertEqual(token_cache.stats()['hits'], 1)
+
+    def test_decode_token_returns_claims(self):
+        with self.app.app_context():
+            payload = decode_token(self.mechanic_token)
+        self.assertEqual(payload['role'], 'mechanic')
+        self.assertEqual(int(payload['sub']), self.mechanic_id)
+
+class RolesRequiredTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+
+        @roles_required('admin', 'mechanic')
+        def endpoint(principal):
+            return {'role': principal.role, 'id': principal.id, 'is_admin': principal.is_admin}
+
+        self.endpoint = endpoint
+
+        with self.app.app_context():
+            self.admin_token = encode_admin_token(1)
+            self.mechanic_token = encode_mechanic_token(7)
+            self.customer_token = encode_customer_token(3)
+
+    def call(self, headers = None):
+        with self.app.test_request_context("/", headers = headers or {}):
+            result = self.endpoint()
+        if isinstance(result, tuple):
+            return result[1], result[0].get_json()
+        return 200, result
+
+    def test_admin_principal(self):
+        status, body = self.call({"Authorization": f"Bearer {self.admin_token}"})
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {'role': 'admin', 'id': 1, 'is_admin': True})
+
+    def test_mechanic_principal(self):
+        status, body = self.call({"Authorization": f"Bearer {self.mechanic_token}"})
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {'role': 'mechanic', 'id': 7, 'is_admin': False})
+
+    def test_wrong_role_forbidden(self):
+        status, _ = self.call({"Authorization": f"Bearer {self.customer_token}"})
+        self.assertEqual(status, 403)
+
+    def test_missing_token(self):
+        status, _ = self.call()
+        self.assertEqual(status, 401)
+
+    def test_invalid_token(self):
+        status, _ = self.call({"Authorization": "Bearer garbage"})
+        self.assertEqual(status, 401)
+
+class AuthInstrumentationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        self.events = []
+
+        with self.app.app_context():
+            db.create_all()
+            self.mechanic_token = encode_mechanic_token(1)
+            self.customer_token = encode_customer_token(1)
+
+        token_cache.clear()
+        auth_metrics.reset()
+        self.hook = auth_metrics.register_hook(self.events.append)
+
+    def tearDown(self):
+        auth_metrics.unregister_hook(self.hook)
+        auth_metrics.reset()
+        token_cache.clear()
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_auth_path_does_not_print(self):
+        buffer = io.StringIO()
+        with redirect_stdout(buffer):
+            with self.app.app_context():
+                encode_mechanic_token(5)
+            self.client.get("/mechanics/profile", headers = {"Authorization": f"Bearer {self.mechanic_token}"})
+        self.assertEqual(buffer.getvalue(), "")
+
+    def test_failures_counted_by_reason(self):
+        self.client.get("/mechanics/profile")
+        self.client.get("/mechanics/profile", headers = {"Authorization": "Bearer garbage"})
+
+        failures = auth_metrics.stats()['failures']
+        self.assertEqual(failures['missing_header'], 1)
+        self.assertEqual(failures['invalid_token'], 1)
+
+    def test_role_mismatch_recorded(self):
+        self.client.get("/mechanics/profile", headers = {"Authorization": f"Bearer {self.customer_token}"})
+
+        stats = auth_metrics.stats()
+        self.assertEqual(stats['role_mismatches'], {'mechanic:customer': 1})
+        mismatch = [e for e in self.events if e['event'] == 'role_mismatch'][0]
+        self.assertEqual(mismatch['endpoint'], 'mechanic_bp.get_profile')
+
+    def test_decode_timer_and_hook_events(self):
+        headers = {"Authorization": f"Bearer {self.mechanic_token}"}
+        self.client.get("/mechanics/profile", headers = headers)
+        self.client.get("/mechanics/profile", headers = headers)
+
+        stats = auth_metrics.stats()
+        self.assertEqual(stats['timers']['decode']['count'], 1)
+        self.assertEqual(stats['events']['cache_hit'], 1)
+        decoded = [e for e in self.events if e['event'] == 'decoded'][0]
+        self.assertEqual(decoded['token'], token_fingerprint(self.mechanic_token))
+        self.assertNotIn(self.mechanic_token, str(decoded))
+
+    def test_token_fingerprint_only_taken_for_emitted_events(self):
+        fingerprints = []
+
+        def counting_fingerprint(token):
+            fingerprints.append(token)
+            return "fingerprint"
+
+        auth_metrics.unregister_hook(self.hook)
+        utils.token_fingerprint = counting_fingerprint
+        try:
+            self.client.get("/mechanics/profile", headers = {"Authorization": f"Bearer {self.mechanic_token}"})
+            self.client.get("/mechanics/profile", headers = {"Authorization": "Bearer garbage"})
+            self.assertEqual(fingerprints, [])
+
+            auth_metrics.register_hook(self.hook)
+            token_cache.clear()
+            self.client.get("/mechanics/profile", headers = {"Authorization": f"Bearer {self.mechanic_token}"})
+            self.assertEqual(fingerprints, [self.mechanic_token])
+        finally:
+            utils.token_fingerprint = token_fingerprint
+
+    def test_sampling_disabled_skips_hooks(self):
+        self.app.config['AUTH_TRACE_SAMPLE_RATE'] = 0.0
+        self.client.get("/mechanics/profile")
+        self.assertEqual(self.events, [])
+        self.assertEqual(auth_metrics.stats()['failures']['missing_header'], 1)
+
+if __name__ == "__main__":
+    unittest.main()
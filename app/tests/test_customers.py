@@ -123,6 +123,17 @@ class CustomerRoutesTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("New Customer Name", response.get_data(as_text = True))
 
+    def test_customer_password_change_busy_hasher(self):
+        self.app.config['PASSWORD_HASH_MAX_QUEUE'] = 0
+        data = {"password": "newcustomerpass", "old_password": "customerpass"}
+        headers = {
+            "Authorization": f"Bearer {self.customer_token}",
+            "Content-Type": "application/json"
+        }
+        response = self.client.put(f"/customers/{self.customer_id}", data = json.dumps(data), headers = headers)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("busy", response.get_json()["error"])
+
     def test_admin_delete_customer(self):
         headers = {"Authorization": f"Bearer {self.admin_token}"}
         response = self.client.delete(f"/customers/admin/delete/{self.customer_id}", headers = headers)
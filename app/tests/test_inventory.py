@@ -1,9 +1,13 @@
 import unittest
 import json
+import tempfile
+import threading
+import time
 from werkzeug.security import generate_password_hash
-from app import create_app, db
-from app.models import Mechanic, Inventory
-from app.autho.__init__ import encode_mechanic_token
+from app import create_app, db, CONFIGS
+from app.config import TestingConfig
+from app.models import Mechanic, Inventory, Customer, ServiceTicket
+from app.autho.__init__ import encode_mechanic_token, encode_token
 import sys
 import os
 
@@ -182,5 +186,623 @@ class InventoryRoutesTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
 
 
+class StockReservationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customer = Customer(name = "Stock Customer", email = "stock@test.com", password = "x")
+            mechanic = Mechanic(name = "Stock Mechanic", username = "stockmech", email = "stockmech@test.com", password = "x")
+            part = Inventory(name = "Spark Plug", price = 8.0, quantity = 2)
+            db.session.add_all([customer, mechanic, part])
+            db.session.flush()
+
+            tickets = []
+            for i in range(3):
+                ticket = ServiceTicket(description = f"Stock job {i}", customer_id = customer.id)
+                ticket.mechanics.append(mechanic)
+                tickets.append(ticket)
+            db.session.add_all(tickets)
+            db.session.commit()
+
+            self.ticket_ids = [ticket.id for ticket in tickets]
+            self.part_id = part.id
+            self.headers = {"Authorization": f"Bearer {encode_mechanic_token(mechanic.id)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def quantity(self):
+        with self.app.app_context():
+            return db.session.get(Inventory, self.part_id).quantity
+
+    def add(self, ticket_id):
+        return self.client.put(f"/service-tickets/{ticket_id}/add-part/{self.part_id}", headers = self.headers)
+
+    def test_add_reserves_and_remove_releases(self):
+        response = self.add(self.ticket_ids[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["added_part"]["remaining_quantity"], 1)
+        self.assertEqual(self.quantity(), 1)
+
+        self.assertEqual(self.add(self.ticket_ids[0]).status_code, 200)
+        self.assertEqual(self.quantity(), 1)
+
+        self.client.put(f"/service-tickets/{self.ticket_ids[0]}/remove-part/{self.part_id}", headers = self.headers)
+        self.assertEqual(self.quantity(), 2)
+
+    def test_last_unit_cannot_be_overcommitted(self):
+        self.assertEqual(self.add(self.ticket_ids[0]).status_code, 200)
+        self.assertEqual(self.add(self.ticket_ids[1]).status_code, 200)
+        response = self.add(self.ticket_ids[2])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("out of stock", response.get_json()["error"])
+        self.assertEqual(self.quantity(), 0)
+
+        with self.app.app_context():
+            self.assertEqual(db.session.get(ServiceTicket, self.ticket_ids[2]).parts, [])
+
+    def test_batch_reserves_net_stock(self):
+        operations = [{"op": "add_part", "ticket_id": ticket_id, "inventory_id": self.part_id} for ticket_id in self.ticket_ids]
+        operations.append({"op": "remove_part", "ticket_id": self.ticket_ids[0], "inventory_id": self.part_id})
+        operations.append({"op": "add_part", "ticket_id": self.ticket_ids[2], "inventory_id": self.part_id})
+        response = self.client.post("/service-tickets/batch", json = {"operations": operations}, headers = self.headers)
+
+        statuses = [result["status"] for result in response.get_json()["results"]]
+        self.assertEqual(statuses, ["applied", "applied", "error", "applied", "applied"])
+        self.assertEqual(self.quantity(), 0)
+
+
+class StockReservationStressTestCase(unittest.TestCase):
+    WRITERS = 32
+    TICKETS_PER_WRITER = 5
+    STOCK = 100
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        class StressConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(self.tmp.name, 'stock.sqlite3')}"
+            SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": self.WRITERS, "connect_args": {"timeout": 30}}
+
+        CONFIGS["stock_stress"] = StressConfig
+        self.addCleanup(CONFIGS.pop, "stock_stress")
+        self.app = create_app("stock_stress")
+
+        with self.app.app_context():
+            customer = Customer(name = "Stress Customer", email = "stress@test.com", password = "x")
+            part = Inventory(name = "Hot SKU", price = 1.0, quantity = self.STOCK)
+            db.session.add_all([customer, part])
+            db.session.flush()
+
+            self.writers = []
+            for i in range(self.WRITERS):
+                mechanic = Mechanic(name = f"Writer {i}", username = f"writer{i}", email = f"writer{i}@test.com", password = "x")
+                tickets = [ServiceTicket(description = f"Stress {i}-{j}", customer_id = customer.id) for j in range(self.TICKETS_PER_WRITER)]
+                for ticket in tickets:
+                    ticket.mechanics.append(mechanic)
+                db.session.add_all([mechanic, *tickets])
+                db.session.flush()
+                self.writers.append((encode_mechanic_token(mechanic.id), [ticket.id for ticket in tickets]))
+            db.session.commit()
+            self.part_id = part.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+
+    def test_parallel_writers_never_oversell(self):
+        results = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.WRITERS)
+
+        def writer(token, ticket_ids):
+            client = self.app.test_client()
+            headers = {"Authorization": f"Bearer {token}"}
+            start.wait()
+            for ticket_id in ticket_ids:
+                response = client.put(f"/service-tickets/{ticket_id}/add-part/{self.part_id}", headers = headers)
+                with lock:
+                    results.append(response.status_code)
+
+        threads = [threading.Thread(target = writer, args = writer_args) for writer_args in self.writers]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        attempts = self.WRITERS * self.TICKETS_PER_WRITER
+        self.assertEqual(len(results), attempts)
+        self.assertEqual(results.count(200), self.STOCK)
+        self.assertEqual(results.count(400), attempts - self.STOCK)
+        self.assertLess(elapsed, 30)
+
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Inventory, self.part_id).quantity, 0)
+            attached = db.session.execute(db.text(
+                "SELECT count(*) FROM service_ticket_inventory WHERE inventory_id = :part_id"
+            ), {"part_id": self.part_id}).scalar()
+            self.assertEqual(attached, self.STOCK)
+
+    def test_parallel_compactors_write_each_snapshot_once(self):
+        from app.blueprints.inventory.ledger import LedgerCompactor
+        token, ticket_ids = self.writers[0]
+        client = self.app.test_client()
+        for ticket_id in ticket_ids:
+            client.put(f"/service-tickets/{ticket_id}/add-part/{self.part_id}", headers = {"Authorization": f"Bearer {token}"})
+
+        compactors = [LedgerCompactor(self.app) for _ in range(4)]
+        start = threading.Barrier(len(compactors))
+        def compact(compactor):
+            start.wait()
+            compactor.run_once()
+        threads = [threading.Thread(target = compact, args = (compactor,)) for compactor in compactors]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(compactor.failures for compactor in compactors), 0)
+        self.assertEqual(sum(compactor.snapshots for compactor in compactors), 1)
+
+
+class InventorySearchTestCase(unittest.TestCase):
+
+    NAMES = [
+        "Brake Pad", "Brake Pad Set Front", "Ceramic Brake Pads Rear", "Brake Rotor", "Oil Filter",
+        "Oil Drain Plug", "Cabin Air Filter", "Oxygen Sensor Upstream", "Spark Plug", "Serpentine Belt",
+    ]
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([Inventory(name = name, price = 10.0, quantity = 3) for name in self.NAMES])
+            mechanic = Mechanic(name = "Search Mechanic", username = "searchmech", email = "searchmech@test.com", password = "x")
+            db.session.add(mechanic)
+            db.session.commit()
+            self.headers = {"Authorization": f"Bearer {encode_mechanic_token(mechanic.id)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def names(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return [part["name"] for part in response.get_json()]
+
+    def test_exact_and_prefix_matches_rank_first(self):
+        self.assertEqual(self.names("/inventory/search?q=brake pad"),
+                         ["Brake Pad", "Brake Pad Set Front", "Ceramic Brake Pads Rear"])
+        self.assertEqual(self.names("/inventory/autocomplete?q=oil"), ["Oil Filter", "Oil Drain Plug"])
+        self.assertEqual(self.names("/inventory/autocomplete?q=o"), ["Oil Filter", "Oil Drain Plug", "Oxygen Sensor Upstream"])
+
+    def test_words_match_anywhere_in_the_name(self):
+        self.assertEqual(self.names("/inventory/search?q=filt"), ["Oil Filter", "Cabin Air Filter"])
+        self.assertEqual(self.names("/inventory/search?q=pads rear"), ["Ceramic Brake Pads Rear"])
+
+    def test_misspellings_are_corrected(self):
+        self.assertEqual(self.names("/inventory/search?q=brke rotr"), ["Brake Rotor"])
+        self.assertEqual(self.names("/inventory/search?q=oxygen sensr")[0], "Oxygen Sensor Upstream")
+        self.assertEqual(self.names("/inventory/search?q=qqqq"), [])
+
+    def test_index_follows_writes(self):
+        response = self.client.post("/inventory/", json = {"name": "Wheel Bearing", "price": 30.0, "quantity": 2}, headers = self.headers)
+        self.assertEqual(response.status_code, 201)
+        part_id = response.get_json()["id"]
+        self.assertEqual(self.names("/inventory/search?q=whel bearing"), ["Wheel Bearing"])
+
+        self.client.put(f"/inventory/{part_id}", json = {"name": "Hub Assembly"}, headers = self.headers)
+        self.assertEqual(self.names("/inventory/search?q=bearing"), [])
+        self.assertEqual(self.names("/inventory/autocomplete?q=hub"), ["Hub Assembly"])
+
+        self.client.delete(f"/inventory/{part_id}", headers = self.headers)
+        self.assertEqual(self.names("/inventory/autocomplete?q=hub"), [])
+
+    def test_mechanic_search_suggests_on_miss(self):
+        response = self.client.get("/inventory/mechanic/search?q=oil filter", headers = self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["name"], "Oil Filter")
+
+        response = self.client.get("/inventory/mechanic/search?q=oil filtr", headers = self.headers)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json()["suggestions"][0], "Oil Filter")
+
+    def test_autocomplete_validates_arguments(self):
+        self.assertEqual(self.client.get("/inventory/autocomplete").status_code, 400)
+        self.assertEqual(self.client.get("/inventory/autocomplete?q=oil&limit=50").status_code, 400)
+
+
+class LowStockTrackerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["SSE_MAX_DURATION"] = 0.2
+        self.app.config["SSE_HEARTBEAT_INTERVAL"] = 0.05
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            parts = [
+                Inventory(name = "Wiper Blade", price = 9.0, quantity = 11, reorder_point = 10),
+                Inventory(name = "Spark Plug", price = 4.0, quantity = 2, reorder_point = 20),
+                Inventory(name = "Fuse", price = 1.0, quantity = 0, reorder_point = 5),
+                Inventory(name = "Headlight", price = 30.0, quantity = 40, reorder_point = 4),
+            ]
+            customer = Customer(name = "Stock Customer", email = "stock@test.com", password = "x")
+            mechanic = Mechanic(name = "Stock Mechanic", username = "stockmech", email = "stockmech@test.com", password = "x")
+            db.session.add_all([*parts, customer, mechanic])
+            db.session.flush()
+
+            ticket = ServiceTicket(description = "Wipers", customer_id = customer.id)
+            ticket.mechanics.append(mechanic)
+            db.session.add(ticket)
+            db.session.commit()
+
+            self.part_ids = {part.name: part.id for part in parts}
+            self.ticket_id = ticket.id
+            self.headers = {"Authorization": f"Bearer {encode_mechanic_token(mechanic.id)}"}
+            self.customer_headers = {"Authorization": f"Bearer {encode_token(customer.id)}"}
+        self.created = self.app.extensions["event_hub"].last_id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def low_stock(self, query = ""):
+        response = self.client.get(f"/inventory/low-stock{query}", headers = self.headers)
+        self.assertEqual(response.status_code, 200)
+        return [part["name"] for part in response.get_json()]
+
+    def events(self, since = None):
+        since = self.created if since is None else since
+        return [(event.type, json.loads(event.data)) for event in self.app.extensions["event_hub"].since(since)
+                if event.type.startswith("inventory.")]
+
+    def test_parts_created_short_publish_low_stock(self):
+        self.assertEqual([(event_type, data["name"]) for event_type, data in self.events(since = 0)],
+                         [("inventory.low_stock", "Spark Plug"), ("inventory.low_stock", "Fuse")])
+
+    def test_list_is_ordered_by_shortfall_and_bounded(self):
+        self.assertEqual(self.low_stock(), ["Spark Plug", "Fuse"])
+        self.assertEqual(self.low_stock("?limit=1"), ["Spark Plug"])
+        self.assertEqual(self.low_stock("?threshold=11"), ["Fuse", "Spark Plug", "Wiper Blade"])
+        self.assertEqual(self.client.get("/inventory/low-stock?limit=500", headers = self.headers).status_code, 400)
+
+        self.client.put(f"/inventory/{self.part_ids['Headlight']}", json = {"reorder_point": 45}, headers = self.headers)
+        self.assertEqual(self.low_stock(), ["Spark Plug", "Fuse", "Headlight"])
+
+    def test_ticket_parts_publish_threshold_crossings(self):
+        wiper = self.part_ids["Wiper Blade"]
+        self.client.put(f"/service-tickets/{self.ticket_id}/add-part/{wiper}", headers = self.headers)
+        self.assertEqual(self.low_stock(), ["Spark Plug", "Fuse", "Wiper Blade"])
+        self.client.put(f"/service-tickets/{self.ticket_id}/remove-part/{wiper}", headers = self.headers)
+        self.assertEqual(self.low_stock(), ["Spark Plug", "Fuse"])
+
+        self.assertEqual(self.events(), [
+            ("inventory.low_stock", {"inventory_id": wiper, "name": "Wiper Blade", "quantity": 10, "reorder_point": 10}),
+            ("inventory.restocked", {"inventory_id": wiper, "name": "Wiper Blade", "quantity": 11, "reorder_point": 10}),
+        ])
+
+    def test_updates_publish_only_net_crossings(self):
+        self.client.put(f"/inventory/{self.part_ids['Spark Plug']}", json = {"quantity": 3}, headers = self.headers)
+        self.client.put(f"/inventory/{self.part_ids['Fuse']}", json = {"quantity": 50}, headers = self.headers)
+        self.assertEqual([(event_type, data["name"]) for event_type, data in self.events()], [("inventory.restocked", "Fuse")])
+
+        from app.blueprints.inventory.stock import reserve_stock, release_stock
+        with self.app.app_context():
+            reserve_stock(self.part_ids["Wiper Blade"], 5)
+            release_stock(self.part_ids["Wiper Blade"], 5)
+            db.session.commit()
+            reserve_stock(self.part_ids["Wiper Blade"], 5)
+            db.session.rollback()
+        self.assertEqual(len(self.events()), 1)
+
+    def test_event_stream_is_for_staff(self):
+        self.client.put(f"/inventory/{self.part_ids['Headlight']}", json = {"quantity": 1}, headers = self.headers)
+
+        response = self.client.get("/inventory/events", headers = {**self.headers, "Last-Event-ID": "0"})
+        self.assertEqual(response.mimetype, "text/event-stream")
+        body = response.get_data(as_text = True)
+        self.assertIn("event: inventory.low_stock", body)
+
+        ticket_stream = self.client.get("/service-tickets/events", headers = {**self.headers, "Last-Event-ID": "0"})
+        self.assertNotIn("inventory.low_stock", ticket_stream.get_data(as_text = True))
+        self.assertEqual(self.client.get("/inventory/events", headers = self.customer_headers).status_code, 403)
+        self.assertEqual(self.client.get("/inventory/events").status_code, 401)
+
+
+class InventoryBulkTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["INVENTORY_IMPORT_CHUNK_SIZE"] = 2
+        self.app.config["INVENTORY_EXPORT_BATCH_SIZE"] = 2
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            mechanic = Mechanic(name = "Bulk Mechanic", username = "bulkmech", email = "bulkmech@test.com", password = "x")
+            customer = Customer(name = "Bulk Customer", email = "bulk@test.com", password = "x")
+            db.session.add_all([mechanic, customer, Inventory(name = "Oil Filter", price = 8.0, quantity = 12, reorder_point = 10)])
+            db.session.commit()
+            self.headers = {"Authorization": f"Bearer {encode_mechanic_token(mechanic.id)}"}
+            self.customer_headers = {"Authorization": f"Bearer {encode_token(customer.id)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def upload(self, body, content_type):
+        return self.client.post("/inventory/import", data = body, content_type = content_type, headers = self.headers)
+
+    def parts(self):
+        with self.app.app_context():
+            return {part.name: (part.price, part.quantity, part.reorder_point) for part in Inventory.query.all()}
+
+    def test_csv_import_upserts_supplied_columns(self):
+        body = ("name,price,quantity,reorder_point\n"
+                "Oil Filter,9.25,,\n"
+                "Air Filter,14.10,30,5\n"
+                ",3.00,1,1\n"
+                "Cabin Filter,abc,1,1\n"
+                "Fuel Filter,,4,\n"
+                "Spark Plug,4.5,-2,1\n"
+                "Wiper Blade,7,2,\n")
+        response = self.upload(body, "text/csv")
+        self.assertEqual(response.status_code, 200)
+        summary = response.get_json()
+        self.assertEqual((summary["rows"], summary["inserted"], summary["updated"], summary["rejected"]), (7, 2, 1, 4))
+        self.assertEqual([reject["line"] for reject in summary["rejects"]], [4, 5, 6, 7])
+        self.assertEqual(summary["rejects"][2]["error"], "Part price is required for a new part.")
+        self.assertIn("rows_per_second", summary)
+
+        self.assertEqual(self.parts(), {
+            "Oil Filter": (9.25, 12, 10),
+            "Air Filter": (14.1, 30, 5),
+            "Wiper Blade": (7.0, 2, 10),
+        })
+        self.assertEqual([part["name"] for part in self.client.get("/inventory/autocomplete?q=wip").get_json()], ["Wiper Blade"])
+
+        self.upload("name,quantity\nOil Filter,3\n", "text/csv")
+        low_stock = [(event.type, json.loads(event.data)["name"]) for event in self.app.extensions["event_hub"].since(0)]
+        self.assertEqual(low_stock, [("inventory.low_stock", "Wiper Blade"), ("inventory.low_stock", "Oil Filter")])
+
+    def test_part_created_during_import_is_updated(self):
+        from app.blueprints.inventory.bulk import InventoryImport
+        from app.models import StockMovement
+        insert_new_parts = InventoryImport._insert_new_parts
+        def created_elsewhere_first(batch, rows):
+            db.session.execute(db.text("INSERT INTO inventory (name, price_cents, quantity) VALUES ('Brake Pad', 3500, 1)"))
+            return insert_new_parts(batch, rows)
+        InventoryImport._insert_new_parts = created_elsewhere_first
+        try:
+            summary = self.upload('{"name": "Brake Pad", "price": 40, "quantity": 3}\n', "application/x-ndjson").get_json()
+        finally:
+            InventoryImport._insert_new_parts = insert_new_parts
+
+        self.assertEqual((summary["inserted"], summary["updated"]), (0, 1))
+        with self.app.app_context():
+            part = Inventory.query.filter_by(name = "Brake Pad").one()
+            self.assertEqual((part.price, part.quantity), (40.0, 3))
+            self.assertEqual([(movement.kind, movement.change) for movement in StockMovement.query.filter_by(inventory_id = part.id)],
+                             [("adjustment", 2)])
+
+    def test_failed_chunk_rejects_each_row_once(self):
+        from sqlalchemy.exc import OperationalError
+        import app.blueprints.inventory.bulk as bulk
+        record_movements = bulk.record_movements
+        def commit_fails(movements):
+            raise OperationalError("INSERT INTO stock_movement", {}, Exception("database is locked"))
+        bulk.record_movements = commit_fails
+        try:
+            summary = self.upload("name,price,quantity\nOil Filter,9,3\nFuel Filter,,4\n", "text/csv").get_json()
+        finally:
+            bulk.record_movements = record_movements
+
+        self.assertEqual((summary["rows"], summary["updated"], summary["rejected"]), (2, 0, 2))
+        self.assertEqual([reject["line"] for reject in summary["rejects"]], [2, 3])
+        self.assertTrue(all(reject["error"].startswith("Chunk was not saved") for reject in summary["rejects"]))
+        self.assertEqual(self.parts()["Oil Filter"], (8.0, 12, 10))
+
+    def test_ndjson_import_in_chunks(self):
+        lines = [
+            {"name": "Brake Pad", "price": 40, "quantity": 3},
+            {"name": "Brake Pad", "price": 42.5},
+            "not json",
+            {"name": "Rotor", "price": 80, "quantity": 2, "description": "Front"},
+            {"name": "Oil Filter", "price": 8.5},
+        ]
+        body = "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines) + "\n"
+        summary = self.upload(body, "application/x-ndjson").get_json()
+        self.assertEqual((summary["inserted"], summary["updated"], summary["rejected"], summary["chunks"]), (2, 1, 1, 2))
+        self.assertEqual(summary["rejects"], [{"line": 3, "error": "Row is not a JSON object."}])
+        self.assertEqual(self.parts()["Brake Pad"], (42.5, 0, 10))
+
+    def test_export_round_trips_through_import(self):
+        self.upload("name,price,quantity\n" + "".join(f"Part {i},{i}.99,{i}\n" for i in range(5)), "text/csv")
+
+        response = self.client.get("/inventory/export", headers = self.headers)
+        self.assertEqual(response.mimetype, "text/csv")
+        lines = response.get_data(as_text = True).splitlines()
+        self.assertEqual(lines[0], "id,name,description,price,quantity,reorder_point")
+        self.assertEqual(lines[1], "1,Oil Filter,,8.00,12,10")
+        self.assertEqual(len(lines), 7)
+
+        summary = self.upload("\n".join(lines), "text/csv").get_json()
+        self.assertEqual((summary["inserted"], summary["updated"], summary["rejected"]), (0, 6, 0))
+
+        response = self.client.get("/inventory/export?format=ndjson", headers = self.headers)
+        rows = [json.loads(line) for line in response.get_data(as_text = True).splitlines()]
+        self.assertEqual(rows[-1], {"id": 6, "name": "Part 4", "description": None, "price": 4.99, "quantity": 4, "reorder_point": 10})
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.upload("name,price\n", "text/plain").status_code, 400)
+        self.assertEqual(self.upload("part,price\nX,1\n", "text/csv").status_code, 400)
+        self.assertEqual(self.client.post("/inventory/import", data = "", content_type = "text/csv",
+                                          headers = self.customer_headers).status_code, 403)
+        self.assertEqual(self.client.get("/inventory/export?format=xml", headers = self.headers).status_code, 400)
+
+
+class StockLedgerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            customer = Customer(name = "Ledger Customer", email = "ledger@test.com", password = "x")
+            mechanic = Mechanic(name = "Ledger Mechanic", username = "ledgermech", email = "ledgermech@test.com", password = "x")
+            part = Inventory(name = "Thermostat", price = 25.0, quantity = 6)
+            db.session.add_all([customer, mechanic, part])
+            db.session.flush()
+
+            ticket = ServiceTicket(description = "Overheating", customer_id = customer.id)
+            ticket.mechanics.append(mechanic)
+            db.session.add(ticket)
+            db.session.commit()
+
+            self.part_id = part.id
+            self.ticket_id = ticket.id
+            self.headers = {"Authorization": f"Bearer {encode_mechanic_token(mechanic.id)}"}
+
+    def tearDown(self):
+        self.app.extensions["stock_ledger"].stop()
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def movements(self):
+        response = self.client.get(f"/inventory/{self.part_id}/movements", headers = self.headers)
+        self.assertEqual(response.status_code, 200)
+        return [(movement["kind"], movement["change"], movement["service_ticket_id"]) for movement in response.get_json()["movements"]]
+
+    def on_hand(self, query = ""):
+        response = self.client.get(f"/inventory/{self.part_id}/on-hand{query}", headers = self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_every_stock_change_is_recorded(self):
+        self.client.put(f"/service-tickets/{self.ticket_id}/add-part/{self.part_id}", headers = self.headers)
+        self.client.put(f"/service-tickets/{self.ticket_id}/remove-part/{self.part_id}", headers = self.headers)
+        self.client.put(f"/inventory/{self.part_id}", json = {"quantity": 20}, headers = self.headers)
+        self.client.put(f"/inventory/{self.part_id}", json = {"price": 26.0}, headers = self.headers)
+
+        self.assertEqual(self.movements(), [
+            ("adjustment", 14, None),
+            ("release", 1, self.ticket_id),
+            ("reservation", -1, self.ticket_id),
+            ("receipt", 6, None),
+        ])
+        balance = self.on_hand()
+        self.assertEqual((balance["quantity"], balance["recorded_quantity"], balance["tail_movements"]), (20, 20, 4))
+
+        self.client.delete(f"/inventory/{self.part_id}", headers = self.headers)
+        balance = self.on_hand()
+        self.assertEqual((balance["quantity"], balance["recorded_quantity"]), (0, None))
+
+    def test_snapshots_fold_the_ledger(self):
+        from app.blueprints.inventory.ledger import compact_ledger
+        self.client.put(f"/service-tickets/{self.ticket_id}/add-part/{self.part_id}", headers = self.headers)
+
+        with self.app.app_context():
+            self.assertEqual(compact_ledger(), 1)
+            self.assertEqual(compact_ledger(), 0)
+        balance = self.on_hand()
+        self.assertEqual((balance["quantity"], balance["snapshot_movement_id"], balance["tail_movements"]), (5, 2, 0))
+
+        self.client.put(f"/service-tickets/{self.ticket_id}/remove-part/{self.part_id}", headers = self.headers)
+        balance = self.on_hand()
+        self.assertEqual((balance["quantity"], balance["snapshot_movement_id"], balance["tail_movements"]), (6, 2, 1))
+
+        with self.app.app_context():
+            self.assertEqual(compact_ledger(), 1)
+        self.assertEqual(self.on_hand()["snapshot_movement_id"], 3)
+
+    def test_late_commits_are_still_folded(self):
+        from app.blueprints.inventory.ledger import record_movements, compact_ledger
+        with self.app.app_context():
+            record_movements([{"id": 100, "inventory_id": self.part_id + 1, "kind": "receipt", "change": 3}])
+            db.session.commit()
+            self.assertEqual(compact_ledger(), 2)
+
+            # A transaction that took id 50 before id 100 but committed after
+            # the compactor had already moved past 100 for another part.
+            record_movements([{"id": 50, "inventory_id": self.part_id, "kind": "adjustment", "change": -2}])
+            db.session.commit()
+            self.assertEqual(compact_ledger(), 1)
+
+        balance = self.on_hand()
+        self.assertEqual((balance["quantity"], balance["snapshot_movement_id"], balance["tail_movements"]), (4, 50, 0))
+
+    def test_point_in_time(self):
+        from datetime import datetime
+        from app.blueprints.inventory.ledger import record_movements, compact_ledger
+        with self.app.app_context():
+            record_movements([
+                {"inventory_id": self.part_id, "kind": "receipt", "change": 10, "created_at": datetime(2030, 1, 1)},
+                {"inventory_id": self.part_id, "kind": "reservation", "change": -3, "created_at": datetime(2030, 2, 1)},
+            ])
+            db.session.commit()
+            compact_ledger(batch_size = 1)
+            record_movements([{"inventory_id": self.part_id, "kind": "adjustment", "change": -1, "created_at": datetime(2030, 3, 1)}])
+            db.session.commit()
+
+        self.assertEqual(self.on_hand("?at=2029-06-01")["quantity"], 6)
+        self.assertEqual(self.on_hand("?at=2030-01-15")["quantity"], 16)
+        self.assertEqual(self.on_hand("?at=2030-02-15")["quantity"], 13)
+        self.assertEqual(self.on_hand()["quantity"], 12)
+        self.assertEqual(self.on_hand("?at=2000-01-01")["quantity"], 0)
+        self.assertEqual(self.client.get(f"/inventory/{self.part_id}/on-hand?at=yesterday", headers = self.headers).status_code, 400)
+
+    def test_background_compaction_and_opening_balances(self):
+        from app.blueprints.inventory.ledger import ensure_stock_ledger
+        with self.app.app_context():
+            db.session.execute(db.text("INSERT INTO inventory (name, price_cents, quantity) VALUES ('Legacy Hose', 1500, 4)"))
+            db.session.execute(db.text("INSERT INTO inventory (name, price_cents, quantity) VALUES ('Legacy Belt', 900, 2)"))
+            belt_id = Inventory.query.filter_by(name = "Legacy Belt").one().id
+            db.session.execute(db.text(f"INSERT INTO stock_movement (inventory_id, kind, change, created_at) VALUES ({belt_id}, 'reservation', -1, '2030-01-01')"))
+            db.session.commit()
+            ensure_stock_ledger()
+            ensure_stock_ledger()
+            legacy_id = Inventory.query.filter_by(name = "Legacy Hose").one().id
+
+        response = self.client.get(f"/inventory/{legacy_id}/movements", headers = self.headers)
+        self.assertEqual([(movement["kind"], movement["change"]) for movement in response.get_json()["movements"]], [("opening", 4)])
+        response = self.client.get(f"/inventory/{belt_id}/movements", headers = self.headers)
+        self.assertEqual([(movement["kind"], movement["change"]) for movement in response.get_json()["movements"]],
+                         [("opening", 3), ("reservation", -1)])
+
+        self.app.config["STOCK_SNAPSHOT_INTERVAL"] = 0.02
+        compactor = self.app.extensions["stock_ledger"]
+        compactor.start()
+        deadline = time.monotonic() + 5
+        while compactor.stats()["snapshots_written"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        compactor.stop(timeout = 5)
+
+        stats = compactor.stats()
+        self.assertEqual((stats["snapshots_written"], stats["failures"], stats["running"]), (3, 0, False))
+        self.assertEqual(self.on_hand()["snapshot_movement_id"], 1)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
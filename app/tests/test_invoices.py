@@ -0,0 +1,112 @@
+import unittest
+from datetime import datetime
+from werkzeug.security import generate_password_hash
+from app import create_app, db
+from app.models import Customer, ServiceTicket, Inventory
+from app.autho.__init__ import encode_token
+from app.autho.utils import encode_admin_token
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+class InvoiceRoutesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config['LABOR_RATE_CENTS'] = 9500
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            owner = Customer(name = "Invoice Owner", email = "owner@test.com", password = generate_password_hash("pass123"))
+            other = Customer(name = "Other Customer", email = "other@test.com", password = generate_password_hash("pass123"))
+            db.session.add_all([owner, other])
+
+            dime = Inventory(name = "Washer", price = 0.10, quantity = 10)
+            nickel = Inventory(name = "Clip", price = 0.20, quantity = 10)
+            filter_part = Inventory(name = "Oil Filter", price = 12.345, quantity = 10)
+            db.session.add_all([dime, nickel, filter_part])
+            db.session.flush()
+
+            first = ServiceTicket(description = "Small parts", status = "completed", customer_id = owner.id,
+                                  hours_worked = 3, created_at = datetime(2024, 1, 10))
+            first.parts.extend([dime, nickel])
+            second = ServiceTicket(description = "Oil change", status = "open", customer_id = owner.id,
+                                   hours_worked = 1, created_at = datetime(2024, 2, 10))
+            second.parts.append(filter_part)
+            third = ServiceTicket(description = "Inspection", status = "completed", customer_id = other.id,
+                                  hours_worked = 0, created_at = datetime(2024, 3, 10))
+            db.session.add_all([first, second, third])
+            db.session.commit()
+
+            self.first_id, self.second_id, self.third_id = first.id, second.id, third.id
+            self.owner_id = owner.id
+            self.owner_token = encode_token(owner.id)
+            self.other_token = encode_token(other.id)
+            self.admin_token = encode_admin_token(1)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _get(self, url, token):
+        return self.client.get(url, headers = {"Authorization": f"Bearer {token}"})
+
+    def test_price_stored_as_cents(self):
+        with self.app.app_context():
+            part = db.session.query(Inventory).filter_by(name = "Oil Filter").one()
+            self.assertEqual(part.price_cents, 1235)
+            self.assertEqual(part.price, 12.35)
+
+    def test_ticket_invoice_exact_cents(self):
+        response = self._get(f"/invoices/tickets/{self.first_id}", self.owner_token)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['parts_cents'], 30)
+        self.assertEqual(data['labor_cents'], 28500)
+        self.assertEqual(data['total_cents'], 28530)
+        self.assertEqual(data['total'], "285.30")
+        self.assertEqual([part['price_cents'] for part in data['parts']], [10, 20])
+
+    def test_ticket_invoice_hidden_from_other_customer(self):
+        response = self._get(f"/invoices/tickets/{self.first_id}", self.other_token)
+        self.assertEqual(response.status_code, 404)
+
+    def test_ticket_invoice_missing(self):
+        response = self._get("/invoices/tickets/9999", self.admin_token)
+        self.assertEqual(response.status_code, 404)
+
+    def test_period_invoices_totals(self):
+        response = self._get("/invoices/", self.admin_token)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual([line['ticket_id'] for line in data['invoices']], [self.first_id, self.second_id, self.third_id])
+        self.assertEqual(data['totals']['ticket_count'], 3)
+        self.assertEqual(data['totals']['parts_cents'], 30 + 1235)
+        self.assertEqual(data['totals']['labor_cents'], 4 * 9500)
+        self.assertEqual(data['totals']['total'], "392.65")
+
+    def test_period_invoices_filters(self):
+        response = self._get("/invoices/?since=2024-02-01&until=2024-03-01&include_lines=false", self.admin_token)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertNotIn('invoices', data)
+        self.assertEqual(data['totals']['ticket_count'], 1)
+        self.assertEqual(data['totals']['total_cents'], 1235 + 9500)
+
+        response = self._get(f"/invoices/?status=completed&customer_id={self.owner_id}", self.admin_token)
+        self.assertEqual([line['ticket_id'] for line in response.get_json()['invoices']], [self.first_id])
+
+    def test_period_invoices_bad_filter(self):
+        response = self._get("/invoices/?since=yesterday", self.admin_token)
+        self.assertEqual(response.status_code, 400)
+
+    def test_period_invoices_admin_only(self):
+        response = self._get("/invoices/", self.owner_token)
+        self.assertEqual(response.status_code, 403)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,10 @@ import unittest
 import json
 from werkzeug.security import generate_password_hash
 from app import create_app, db
-from app.models import Mechanic, Admin
+from sqlalchemy import event
+from app.extensions import cache
+from app.response_cache import response_cache_metrics
+from app.models import Mechanic, Admin, Customer, ServiceTicket, Inventory
 from app.autho.__init__ import encode_mechanic_token
 from app.autho.utils import encode_admin_token
 import uuid
@@ -80,6 +83,42 @@ class TestMechanicRoutes(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("token", response.get_json())
 
+    def test_mechanic_login_upgrades_password_hash(self):
+        with self.app.app_context():
+            self.assertTrue(db.session.get(Mechanic, self.mechanic_id).password.startswith("scrypt:"))
+
+        data = {"email": "mech1@test.com", "password": "mechpass"}
+        response = self.client.post("/mechanics/login", data = json.dumps(data), content_type = "application/json")
+        self.assertEqual(response.status_code, 200)
+
+        with self.app.app_context():
+            stored = db.session.get(Mechanic, self.mechanic_id).password
+        self.assertTrue(stored.startswith(self.app.config['PASSWORD_HASH_METHOD'] + "$"))
+
+        response = self.client.post("/mechanics/login", data = json.dumps(data), content_type = "application/json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_mechanic_login_keeps_hash_written_for_short_method_name(self):
+        # werkzeug stores "pbkdf2:sha256" with its iteration count spelled out.
+        self.app.config['PASSWORD_HASH_METHOD'] = "pbkdf2:sha256"
+        data = {"email": "mech1@test.com", "password": "mechpass"}
+        response = self.client.post("/mechanics/login", data = json.dumps(data), content_type = "application/json")
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            upgraded = db.session.get(Mechanic, self.mechanic_id).password
+        self.assertTrue(upgraded.startswith("pbkdf2:sha256:"))
+
+        response = self.client.post("/mechanics/login", data = json.dumps(data), content_type = "application/json")
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Mechanic, self.mechanic_id).password, upgraded)
+
+    def test_mechanic_login_busy_hasher(self):
+        self.app.config['PASSWORD_HASH_MAX_QUEUE'] = 0
+        data = {"email": "mech1@test.com", "password": "mechpass"}
+        response = self.client.post("/mechanics/login", data = json.dumps(data), content_type = "application/json")
+        self.assertEqual(response.status_code, 503)
+
     def test_mechanic_login_invalid(self):
         data = {"email": "mech1@test.com", "password": "wrongpass"}
         response = self.client.post("/mechanics/login", data = json.dumps(data), content_type = "application/json")
@@ -229,5 +268,301 @@ class TestMechanicRoutes(unittest.TestCase):
         self.assertIn(response.status_code, [401, 400])
         self.assertIn("error", response.get_json())
 
+class DashboardCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        cache.init_app(self.app, config = {'CACHE_TYPE': "SimpleCache"})
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customer = Customer(name = "Dash Customer", email = "dash@test.com", password = "x")
+            first = Mechanic(name = "First", username = "first", email = "first@test.com", password = "x")
+            second = Mechanic(name = "Second", username = "second", email = "second@test.com", password = "x")
+            part = Inventory(name = "Filter", price = 12.0, quantity = 4)
+            db.session.add_all([customer, first, second, part])
+            db.session.flush()
+
+            ticket = ServiceTicket(description = "Dash job", customer_id = customer.id)
+            ticket.mechanics.append(first)
+            ticket.parts.append(part)
+            db.session.add(ticket)
+            db.session.commit()
+
+            self.ticket_id = ticket.id
+            self.first_id = first.id
+            self.second_id = second.id
+            self.part_id = part.id
+            self.first_headers = {"Authorization": f"Bearer {encode_mechanic_token(first.id)}"}
+            self.second_headers = {"Authorization": f"Bearer {encode_mechanic_token(second.id)}"}
+            self.admin_headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            cache.clear()
+            db.session.remove()
+            db.drop_all()
+
+    def dashboard(self, headers):
+        response = self.client.get("/mechanics/dashboard", headers = headers)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_repeat_dashboard_served_from_cache(self):
+        first = self.dashboard(self.first_headers)
+
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            second = self.dashboard(self.first_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+        self.assertEqual(first, second)
+        self.assertEqual(statements, [])
+
+    def test_status_change_invalidates(self):
+        self.assertEqual(self.dashboard(self.first_headers)["tickets"][0]["status"], "open")
+        self.client.put(f"/service-tickets/{self.ticket_id}/status", json = {"status": "completed"}, headers = self.admin_headers)
+        self.assertEqual(self.dashboard(self.first_headers)["tickets"][0]["status"], "completed")
+
+    def test_assign_and_remove_invalidate_every_mechanic_on_ticket(self):
+        self.assertEqual(self.dashboard(self.second_headers)["stats"]["assigned_tickets"], 0)
+        self.assertEqual(len(self.dashboard(self.first_headers)["tickets"][0]["mechanics"]), 1)
+
+        self.client.put(f"/service-tickets/{self.ticket_id}/assign-mechanic/{self.second_id}", headers = self.admin_headers)
+        self.assertEqual(self.dashboard(self.second_headers)["stats"]["assigned_tickets"], 1)
+        self.assertEqual(len(self.dashboard(self.first_headers)["tickets"][0]["mechanics"]), 2)
+
+        self.client.put(f"/service-tickets/{self.ticket_id}/remove-mechanic/{self.second_id}", headers = self.admin_headers)
+        self.assertEqual(self.dashboard(self.second_headers)["stats"]["assigned_tickets"], 0)
+        self.assertEqual(len(self.dashboard(self.first_headers)["tickets"][0]["mechanics"]), 1)
+
+    def test_part_update_invalidates(self):
+        self.dashboard(self.first_headers)
+        self.client.put(f"/inventory/{self.part_id}", json = {"name": "Oil Filter"}, headers = self.first_headers)
+        self.assertEqual(self.dashboard(self.first_headers)["tickets"][0]["parts"][0]["name"], "Oil Filter")
+
+    def test_stock_moves_invalidate_dashboards_holding_the_part(self):
+        with self.app.app_context():
+            ticket = ServiceTicket(description = "Other job", customer_id = db.session.get(ServiceTicket, self.ticket_id).customer_id)
+            ticket.mechanics.append(db.session.get(Mechanic, self.second_id))
+            db.session.add(ticket)
+            db.session.commit()
+            other_ticket_id = ticket.id
+
+        self.assertEqual(self.dashboard(self.first_headers)["tickets"][0]["parts"][0]["quantity"], 4)
+        self.client.put(f"/service-tickets/{other_ticket_id}/add-part/{self.part_id}", headers = self.second_headers)
+        self.assertEqual(self.dashboard(self.first_headers)["tickets"][0]["parts"][0]["quantity"], 3)
+        self.client.post("/service-tickets/batch", json = {"operations": [
+            {"op": "remove_part", "ticket_id": other_ticket_id, "inventory_id": self.part_id}
+        ]}, headers = self.second_headers)
+        self.assertEqual(self.dashboard(self.first_headers)["tickets"][0]["parts"][0]["quantity"], 4)
+
+    def test_total_mechanics_tracks_new_mechanics(self):
+        self.assertEqual(self.dashboard(self.first_headers)["stats"]["total_mechanics"], 2)
+        self.client.post("/mechanics/", json = {"name": "Third", "username": "third", "email": "third@test.com", "phone": "555", "password": "thirdpass"},
+                         headers = self.admin_headers)
+        self.assertEqual(self.dashboard(self.first_headers)["stats"]["total_mechanics"], 3)
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        cache.init_app(self.app, config = {'CACHE_TYPE': "SimpleCache"})
+        response_cache_metrics.reset()
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customer = Customer(name = "Cache Customer", email = "cache@test.com", password = "x")
+            mechanic = Mechanic(name = "Cached", username = "cached", email = "cached@test.com", password = "x")
+            part = Inventory(name = "Cached Part", price = 5.0, quantity = 4)
+            db.session.add_all([customer, mechanic, part])
+            db.session.flush()
+
+            ticket = ServiceTicket(description = "Cache job", customer_id = customer.id)
+            ticket.mechanics.append(mechanic)
+            db.session.add(ticket)
+            db.session.commit()
+
+            self.ticket_id = ticket.id
+            self.mechanic_id = mechanic.id
+            self.part_id = part.id
+            self.headers = {"Authorization": f"Bearer {encode_mechanic_token(mechanic.id)}"}
+            self.admin_headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            cache.clear()
+            db.session.remove()
+            db.drop_all()
+
+    def get(self, url):
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = self.client.get(url)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return response, statements
+
+    def test_repeat_reads_skip_the_database(self):
+        for url in (f"/inventory/{self.part_id}", f"/mechanics/{self.mechanic_id}", "/mechanics/?per_page=10"):
+            first, _ = self.get(url)
+            second, statements = self.get(url)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(second.get_json(), first.get_json())
+            self.assertEqual(statements, [], url)
+
+        response, statements = self.get("/mechanics/?per_page=10&fields=name")
+        self.assertNotEqual(statements, [])
+        self.assertEqual(set(response.get_json()["mechanics"][0]), {"id", "name"})
+
+        stats = self.client.get("/metrics", headers = self.admin_headers).get_json()["response_cache"]
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 4))
+        self.assertEqual(stats["endpoints"]["inventory_bp.get_part_public"]["hit_ratio"], 0.5)
+
+    def test_writes_invalidate_tagged_responses(self):
+        self.get(f"/inventory/{self.part_id}")
+        self.get("/inventory/")
+        self.client.put(f"/service-tickets/{self.ticket_id}/add-part/{self.part_id}", headers = self.headers)
+        self.assertEqual(self.get(f"/inventory/{self.part_id}")[0].get_json()["quantity"], 3)
+        self.assertEqual(self.get("/inventory/")[0].get_json()["parts"][0]["quantity"], 3)
+
+        self.client.put(f"/inventory/{self.part_id}", json = {"quantity": 9}, headers = self.headers)
+        self.assertEqual(self.get(f"/inventory/{self.part_id}")[0].get_json()["quantity"], 9)
+
+        self.get(f"/mechanics/{self.mechanic_id}")
+        self.get("/mechanics/")
+        self.client.put(f"/mechanics/admin/update/{self.mechanic_id}", json = {"specialty": "Brakes"}, headers = self.admin_headers)
+        self.assertEqual(self.get(f"/mechanics/{self.mechanic_id}")[0].get_json()["specialty"], "Brakes")
+        self.assertEqual(self.get("/mechanics/")[0].get_json()["mechanics"][0]["specialty"], "Brakes")
+
+        self.client.delete(f"/inventory/{self.part_id}", headers = self.headers)
+        self.assertEqual(self.get(f"/inventory/{self.part_id}")[0].status_code, 404)
+
+    def test_errors_are_not_cached(self):
+        self.get("/mechanics/999")
+        response, statements = self.get("/mechanics/999")
+        self.assertEqual(response.status_code, 404)
+        self.assertNotEqual(statements, [])
+
+
+class ConditionalGetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customer = Customer(name = "Poll Customer", email = "poll@test.com", password = "x")
+            mechanic = Mechanic(name = "Poller", username = "poller", email = "poller@test.com", password = "x")
+            part = Inventory(name = "Poll Part", price = 5.0, quantity = 4)
+            db.session.add_all([customer, mechanic, part])
+            db.session.flush()
+
+            ticket = ServiceTicket(description = "Poll job", customer_id = customer.id)
+            ticket.mechanics.append(mechanic)
+            db.session.add(ticket)
+            db.session.commit()
+
+            self.ticket_id = ticket.id
+            self.mechanic_id = mechanic.id
+            self.part_id = part.id
+            self.headers = {"Authorization": f"Bearer {encode_mechanic_token(mechanic.id)}"}
+            self.admin_headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def poll(self, url, etag = None):
+        headers = dict(self.headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = self.client.get(url, headers = headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return response, statements
+
+    def assert_revalidates(self, url):
+        first, _ = self.poll(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers["ETag"]
+
+        again, statements = self.poll(url, etag)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.headers["ETag"], etag)
+        self.assertEqual(again.get_data(), b"")
+        self.assertEqual(len(statements), 1)
+        return etag
+
+    def test_my_tickets_not_modified_until_a_ticket_changes(self):
+        url = "/service-tickets/mechanic/my-tickets"
+        etag = self.assert_revalidates(url)
+
+        self.client.put(f"/service-tickets/{self.ticket_id}/status", json = {"status": "completed"}, headers = self.admin_headers)
+        changed, _ = self.poll(url, etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.get_json()["tickets"][0]["status"], "completed")
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    def test_my_tickets_tag_follows_parts_and_query(self):
+        url = "/service-tickets/mechanic/my-tickets"
+        etag = self.assert_revalidates(url)
+        self.assertNotEqual(self.poll(url + "?fields=status")[0].headers["ETag"], etag)
+
+        self.client.put(f"/service-tickets/{self.ticket_id}/add-part/{self.part_id}", headers = self.headers)
+        self.assertEqual(self.poll(url, etag)[0].status_code, 200)
+
+    def test_profile_tracks_row_version(self):
+        etag = self.assert_revalidates("/mechanics/profile")
+
+        response = self.client.put(f"/mechanics/admin/update/{self.mechanic_id}", json = {"specialty": "Brakes"}, headers = self.admin_headers)
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Mechanic, self.mechanic_id).version, 2)
+        self.assertEqual(self.poll("/mechanics/profile", etag)[0].status_code, 200)
+
+    def test_inventory_listing_tracks_stock_moves(self):
+        etag = self.assert_revalidates("/inventory/")
+
+        with self.app.app_context():
+            from app.blueprints.inventory.stock import reserve_stock
+            reserve_stock(self.part_id, 1)
+            db.session.commit()
+            self.assertEqual(db.session.get(Inventory, self.part_id).version, 2)
+
+        changed, _ = self.poll("/inventory/", etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.get_json()["parts"][0]["quantity"], 3)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
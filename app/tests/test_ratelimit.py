@@ -0,0 +1,84 @@
+import unittest
+import json
+import os
+import tempfile
+from limits import parse
+from limits.strategies import SlidingWindowCounterRateLimiter
+from limits.storage import storage_from_string
+from app import create_app, db
+from app.extensions import limiter
+from app.ratelimit_storage import SQLiteStorage
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+class SQLiteStorageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix = ".sqlite3")
+        os.close(handle)
+        self.uri = f"sqlite:///{self.path}"
+
+    def tearDown(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_scheme_is_registered(self):
+        self.assertIsInstance(storage_from_string(self.uri), SQLiteStorage)
+
+    def test_limit_is_shared_between_workers(self):
+        worker_a = SlidingWindowCounterRateLimiter(SQLiteStorage(self.uri))
+        worker_b = SlidingWindowCounterRateLimiter(SQLiteStorage(self.uri))
+        item = parse("5 per minute")
+
+        allowed = [
+            (worker_a if i % 2 else worker_b).hit(item, "login", "10.0.0.1")
+            for i in range(8)
+        ]
+        self.assertEqual(allowed.count(True), 5)
+        self.assertFalse(worker_a.hit(item, "login", "10.0.0.1"))
+        self.assertTrue(worker_b.hit(item, "login", "10.0.0.2"))
+
+    def test_incr_get_and_clear(self):
+        storage = SQLiteStorage(self.uri)
+        self.assertEqual(storage.incr("k", 60), 1)
+        self.assertEqual(storage.incr("k", 60, amount = 2), 3)
+        self.assertEqual(storage.get("k"), 3)
+        storage.clear("k")
+        self.assertEqual(storage.get("k"), 0)
+
+    def test_expired_counter_restarts(self):
+        storage = SQLiteStorage(self.uri)
+        storage.incr("k", -1)
+        self.assertEqual(storage.get("k"), 0)
+        self.assertEqual(storage.incr("k", 60), 1)
+
+class LoginRateLimitTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config['RATELIMIT_ENABLED'] = True
+        limiter.init_app(self.app)
+        limiter.reset()
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        limiter.reset()
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_login_routes_use_shared_limiter(self):
+        data = json.dumps({"email": "nobody@test.com", "password": "x"})
+        codes = [
+            self.client.post("/customers/login", data = data, content_type = "application/json").status_code
+            for _ in range(6)
+        ]
+        self.assertEqual(codes[:5], [401] * 5)
+        self.assertEqual(codes[5], 429)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,18 @@
 import unittest
 import json
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash
-from app import create_app, db
-from app.models import Customer, Mechanic, ServiceTicket, Inventory
+from app import create_app, db, CONFIGS
+from app.config import TestingConfig
+from app.models import Customer, Mechanic, ServiceTicket, Inventory, StockMovement
 from app.autho.__init__ import encode_token, encode_mechanic_token
 from app.autho.utils import encode_admin_token
+from app.serializers import dump_many
 import sys
 import os
 from tests.base import BaseTestCase
@@ -223,5 +231,1054 @@ def create_test_ticket(self):
         self.assertIn("Oil change", response.get_data(as_text = True))
 
 
+class TicketQueryCountTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customer = Customer(name = "Query Count", email = "count@test.com", password = "x")
+            mechanic = Mechanic(name = "Count Mechanic", username = "countmech", email = "countmech@test.com", password = "x")
+            db.session.add_all([customer, mechanic])
+            db.session.commit()
+
+            self.customer_id = customer.id
+            self.mechanic_id = mechanic.id
+            self.admin_token = encode_admin_token(1)
+            self.mechanic_token = encode_mechanic_token(self.mechanic_id)
+
+        self.add_tickets(5)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def add_tickets(self, count):
+        with self.app.app_context():
+            mechanic = db.session.get(Mechanic, self.mechanic_id)
+            start = ServiceTicket.query.count()
+            for i in range(start, start + count):
+                helper = Mechanic(name = f"Helper {i}", username = f"helper{i}", email = f"helper{i}@test.com", password = "x")
+                part = Inventory(name = f"Part {i}", price = 10.0 + i, quantity = 5)
+                ticket = ServiceTicket(description = f"Job {i}", customer_id = self.customer_id)
+                ticket.mechanics.extend([mechanic, helper])
+                ticket.parts.append(part)
+                db.session.add(ticket)
+            db.session.commit()
+
+    @contextmanager
+    def count_queries(self):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    def queries_for(self, url, token):
+        headers = {"Authorization": f"Bearer {token}"}
+        with self.count_queries() as statements:
+            response = self.client.get(url, headers = headers)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def assert_constant(self, url, token):
+        small = self.queries_for(url, token)
+        self.add_tickets(25)
+        large = self.queries_for(url, token)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 6)
+
+    def test_get_tickets_query_count(self):
+        self.assert_constant("/service-tickets/", self.admin_token)
+
+    def test_my_assigned_tickets_query_count(self):
+        self.assert_constant("/service-tickets/mechanic/my-tickets?per_page=50", self.mechanic_token)
+
+    def test_dashboard_query_count(self):
+        self.assert_constant("/mechanics/dashboard", self.mechanic_token)
+
+    def test_mechanic_ticket_count_query_count(self):
+        self.assert_constant(f"/service-tickets/mechanic/{self.mechanic_id}/count?include_tickets=true", self.admin_token)
+
+    def test_plain_mechanic_ticket_count_query_count(self):
+        url = f"/service-tickets/mechanic/{self.mechanic_id}/count"
+        small = self.queries_for(url, self.admin_token)
+        self.add_tickets(25)
+        self.assertEqual(self.queries_for(url, self.admin_token), small)
+        self.assertLessEqual(small, 2)
+
+        body, tables = self.fetch(url, self.admin_token)
+        self.assertNotIn("tickets", body)
+        self.assertNotIn("inventory", tables)
+
+    def test_page_size_does_not_change_query_count(self):
+        self.add_tickets(25)
+        small = self.queries_for("/service-tickets/mechanic/my-tickets?per_page=5", self.mechanic_token)
+        large = self.queries_for("/service-tickets/mechanic/my-tickets?per_page=50", self.mechanic_token)
+        self.assertEqual(small, large)
+
+    def fetch(self, url, token, status = 200):
+        with self.count_queries() as statements:
+            response = self.client.get(url, headers = {"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, status)
+        tables = set(re.findall(r"(?:FROM|JOIN) (\w+)", " ".join(statements)))
+        return response.get_json(), tables
+
+    def test_sparse_fields_skip_relationships(self):
+        body, tables = self.fetch("/service-tickets/?fields=id,status", self.admin_token)
+        self.assertEqual(len(body), 5)
+        self.assertEqual({key for ticket in body for key in ticket}, {"id", "status"})
+        self.assertEqual(tables, {"service_ticket"})
+
+    def test_include_loads_only_requested_relationships(self):
+        body, tables = self.fetch("/service-tickets/?fields=status&include=parts", self.admin_token)
+        self.assertEqual(set(body[0]), {"id", "status", "parts"})
+        self.assertEqual(body[0]["parts"][0]["name"], "Part 0")
+        self.assertIn("inventory", tables)
+        self.assertNotIn("mechanic", tables)
+        self.assertNotIn("customer", tables)
+
+    def test_include_without_fields_keeps_scalars(self):
+        body, _ = self.fetch(f"/service-tickets/mechanic/{self.mechanic_id}/count?include_tickets=true&include=customer", self.admin_token)
+        ticket = body["tickets"][0]
+        self.assertEqual(ticket["customer"]["name"], "Query Count")
+        self.assertIn("description", ticket)
+        self.assertNotIn("mechanics", ticket)
+
+    def test_fieldsets_with_cursor_pagination(self):
+        body, _ = self.fetch("/service-tickets/mechanic/my-tickets?cursor=&per_page=2&fields=status", self.mechanic_token)
+        self.assertEqual([set(ticket) for ticket in body["tickets"]], [{"id", "status"}] * 2)
+        self.assertIsNotNone(body["next_cursor"])
+
+        url = f"/service-tickets/mechanic/my-tickets?cursor={body['next_cursor']}&per_page=2&fields=status"
+        self.assertEqual(len(self.fetch(url, self.mechanic_token)[0]["tickets"]), 2)
+
+    def test_mechanic_endpoints_accept_fieldsets(self):
+        body, tables = self.fetch("/mechanics/my-tickets?fields=description", self.mechanic_token)
+        self.assertEqual(set(body[0]), {"id", "description"})
+        self.assertEqual(tables, {"mechanic", "service_ticket", "service_ticket_mechanic"})
+
+        body, _ = self.fetch(f"/mechanics/{self.mechanic_id}?fields=name", self.mechanic_token)
+        self.assertEqual(body, {"id": self.mechanic_id, "name": "Count Mechanic"})
+
+    def test_unknown_fields_are_rejected(self):
+        self.fetch("/service-tickets/?fields=id,secret", self.admin_token, status = 400)
+        self.fetch("/service-tickets/?include=invoices", self.admin_token, status = 400)
+        self.fetch("/mechanics/?include=service_tickets", self.mechanic_token, status = 400)
+
+
+class TicketCursorPaginationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customer = Customer(name = "Cursor Customer", email = "cursor@test.com", password = "x")
+            mechanic = Mechanic(name = "Cursor Mechanic", username = "cursormech", email = "cursormech@test.com", password = "x")
+            db.session.add_all([customer, mechanic])
+            db.session.flush()
+
+            same_time = datetime(2025, 1, 1, 12, 0, 0)
+            for i in range(12):
+                ticket = ServiceTicket(
+                    description = f"Cursor job {i}",
+                    customer_id = customer.id,
+                    created_at = same_time if i < 4 else same_time + timedelta(minutes = i)
+                )
+                ticket.mechanics.append(mechanic)
+                db.session.add(ticket)
+            db.session.commit()
+
+            self.customer_id = customer.id
+            self.admin_headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+            self.customer_headers = {"Authorization": f"Bearer {encode_token(customer.id)}"}
+            self.mechanic_headers = {"Authorization": f"Bearer {encode_mechanic_token(mechanic.id)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def walk(self, url, headers):
+        seen = []
+        cursor = ""
+        while True:
+            separator = "&" if "?" in url else "?"
+            response = self.client.get(f"{url}{separator}per_page=5&cursor={cursor}", headers = headers)
+            self.assertEqual(response.status_code, 200)
+            body = response.get_json()
+            if "include_tickets" not in url:
+                self.assertNotIn("ticket_count", body)
+            seen.extend(ticket["id"] for ticket in body["tickets"])
+            if not body["has_more"]:
+                self.assertIsNone(body["next_cursor"])
+                return seen
+            cursor = body["next_cursor"]
+
+    def test_cursor_walk_visits_every_ticket_once(self):
+        for url, headers in (
+            ("/service-tickets/customer/my-tickets", self.customer_headers),
+            ("/service-tickets/mechanic/my-tickets", self.mechanic_headers),
+            (f"/service-tickets/customer/{self.customer_id}/count?include_tickets=true", self.admin_headers),
+        ):
+            seen = self.walk(url, headers)
+            self.assertEqual(len(seen), 12)
+            self.assertEqual(len(set(seen)), 12)
+
+    def test_cursor_orders_newest_first(self):
+        response = self.client.get("/service-tickets/customer/my-tickets?cursor=&per_page=3", headers = self.customer_headers)
+        descriptions = [ticket["description"] for ticket in response.get_json()["tickets"]]
+        self.assertEqual(descriptions, ["Cursor job 11", "Cursor job 10", "Cursor job 9"])
+
+    def test_total_is_opt_in(self):
+        response = self.client.get("/service-tickets/customer/my-tickets?cursor=&include_total=true", headers = self.customer_headers)
+        self.assertEqual(response.get_json()["ticket_count"], 12)
+
+        response = self.client.get("/service-tickets/customer/my-tickets?page=1&include_total=false", headers = self.customer_headers)
+        self.assertNotIn("ticket_count", response.get_json())
+
+    def test_page_mode_still_supported(self):
+        response = self.client.get("/service-tickets/customer/my-tickets?page=2&per_page=5", headers = self.customer_headers)
+        body = response.get_json()
+        self.assertEqual(body["ticket_count"], 12)
+        self.assertEqual(body["current_page"], 2)
+        self.assertEqual(len(body["tickets"]), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/service-tickets/customer/my-tickets?cursor=not-a-cursor", headers = self.customer_headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class TicketExportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config['TICKET_EXPORT_BATCH_SIZE'] = 4
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customer = Customer(name = "Export Customer", email = "export@test.com", password = "x")
+            mechanic = Mechanic(name = "Export Mechanic", username = "exportmech", email = "exportmech@test.com", password = "x")
+            part = Inventory(name = "Export Part", price = 5.5, quantity = 3)
+            db.session.add_all([customer, mechanic, part])
+            db.session.flush()
+
+            for i in range(10):
+                ticket = ServiceTicket(
+                    description = f"Export job {i}",
+                    customer_id = customer.id,
+                    status = "completed" if i % 2 else "open",
+                    created_at = datetime(2025, 1, 1 + i)
+                )
+                ticket.mechanics.append(mechanic)
+                ticket.parts.append(part)
+                db.session.add(ticket)
+            db.session.commit()
+
+            self.headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def export(self, query = ""):
+        response = self.client.get(f"/service-tickets/?format=ndjson{query}", headers = self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        return [json.loads(line) for line in response.get_data(as_text = True).splitlines()]
+
+    def test_export_streams_every_ticket(self):
+        rows = self.export()
+        self.assertEqual([row["description"] for row in rows], [f"Export job {i}" for i in range(10)])
+        self.assertEqual(rows[0]["customer"]["name"], "Export Customer")
+        self.assertEqual(rows[0]["parts"][0]["name"], "Export Part")
+
+    def test_export_matches_json_listing(self):
+        listing = self.client.get("/service-tickets/", headers = self.headers).get_json()
+        self.assertEqual(self.export(), listing)
+
+    def test_export_filters(self):
+        rows = self.export("&status=completed&since=2025-01-03&until=2025-01-08")
+        self.assertEqual([row["description"] for row in rows], ["Export job 3", "Export job 5"])
+
+    def test_export_rejects_bad_filters(self):
+        response = self.client.get("/service-tickets/?format=ndjson&since=yesterday", headers = self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/service-tickets/?format=ndjson&status=lost", headers = self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class TicketBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customer = Customer(name = "Batch Customer", email = "batch@test.com", password = "x")
+            self.mechanics = [
+                Mechanic(name = f"Batch Mechanic {i}", username = f"batchmech{i}", email = f"batchmech{i}@test.com", password = "x")
+                for i in range(3)
+            ]
+            in_stock = Inventory(name = "Brake Pads", price = 40.0, quantity = 5)
+            sold_out = Inventory(name = "Rotor", price = 90.0, quantity = 0)
+            db.session.add_all([customer, in_stock, sold_out, *self.mechanics])
+            db.session.flush()
+
+            tickets = []
+            for i in range(50):
+                ticket = ServiceTicket(description = f"Batch job {i}", customer_id = customer.id)
+                ticket.mechanics.append(self.mechanics[0])
+                tickets.append(ticket)
+            db.session.add_all(tickets)
+            db.session.commit()
+
+            self.ticket_ids = [ticket.id for ticket in tickets]
+            self.mechanic_ids = [mechanic.id for mechanic in self.mechanics]
+            self.part_id = in_stock.id
+            self.sold_out_id = sold_out.id
+            self.admin_headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+            self.mechanic_headers = {"Authorization": f"Bearer {encode_mechanic_token(self.mechanic_ids[1])}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def batch(self, operations, headers = None, **extra):
+        return self.client.post("/service-tickets/batch", json = {"operations": operations, **extra},
+                                headers = headers or self.admin_headers)
+
+    def test_hundred_edits_in_one_commit(self):
+        operations = []
+        for ticket_id in self.ticket_ids:
+            operations.append({"op": "assign_mechanic", "ticket_id": ticket_id, "mechanic_id": self.mechanic_ids[1]})
+            operations.append({"op": "status", "ticket_id": ticket_id, "status": "completed", "hours_worked": 2})
+
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = self.batch(operations)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["applied"], 100)
+        self.assertEqual(body["failed"], 0)
+        self.assertLessEqual(len(statements), 8)
+
+        with self.app.app_context():
+            self.assertEqual(ServiceTicket.query.filter_by(status = "completed", hours_worked = 2).count(), 50)
+            mechanic = db.session.get(Mechanic, self.mechanic_ids[1])
+            self.assertEqual(len(mechanic.service_tickets), 50)
+
+    def test_per_item_results(self):
+        ticket_id = self.ticket_ids[0]
+        response = self.batch([
+            {"op": "add_part", "ticket_id": ticket_id, "inventory_id": self.part_id},
+            {"op": "add_part", "ticket_id": ticket_id, "inventory_id": self.sold_out_id},
+            {"op": "assign_mechanic", "ticket_id": ticket_id, "mechanic_id": self.mechanic_ids[0]},
+            {"op": "status", "ticket_id": 999999, "status": "completed"},
+            {"op": "status", "ticket_id": ticket_id, "status": "lost"},
+            {"op": "explode", "ticket_id": ticket_id},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()["results"]
+        self.assertEqual([result["status"] for result in results],
+                         ["applied", "error", "unchanged", "error", "error", "error"])
+        self.assertIn("out of stock", results[1]["error"])
+
+        with self.app.app_context():
+            ticket = db.session.get(ServiceTicket, ticket_id)
+            self.assertEqual([part.id for part in ticket.parts], [self.part_id])
+
+    def test_operations_net_out_in_order(self):
+        ticket_id = self.ticket_ids[0]
+        response = self.batch([
+            {"op": "assign_mechanic", "ticket_id": ticket_id, "mechanic_id": self.mechanic_ids[2]},
+            {"op": "remove_mechanic", "ticket_id": ticket_id, "mechanic_id": self.mechanic_ids[2]},
+            {"op": "remove_mechanic", "ticket_id": ticket_id, "mechanic_id": self.mechanic_ids[0]},
+        ])
+        self.assertEqual(response.get_json()["applied"], 3)
+
+        with self.app.app_context():
+            self.assertEqual(db.session.get(ServiceTicket, ticket_id).mechanics, [])
+
+    def test_stock_movements_name_their_ticket(self):
+        first, second, third = self.ticket_ids[:3]
+        self.batch([{"op": "add_part", "ticket_id": ticket_id, "inventory_id": self.part_id} for ticket_id in (first, second)])
+        self.batch([
+            {"op": "remove_part", "ticket_id": first, "inventory_id": self.part_id},
+            {"op": "add_part", "ticket_id": third, "inventory_id": self.part_id},
+        ])
+
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Inventory, self.part_id).quantity, 3)
+            movements = StockMovement.query.filter_by(inventory_id = self.part_id).order_by(StockMovement.id).all()
+            self.assertEqual([(movement.kind, movement.change, movement.service_ticket_id) for movement in movements], [
+                ("receipt", 5, None),
+                ("reservation", -1, first),
+                ("reservation", -1, second),
+                ("reservation", -1, third),
+                ("release", 1, first),
+            ])
+
+    def test_atomic_batch_rolls_back_on_error(self):
+        response = self.batch([
+            {"op": "status", "ticket_id": self.ticket_ids[0], "status": "completed"},
+            {"op": "status", "ticket_id": 999999, "status": "completed"},
+        ], atomic = True)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.get_json()["failed"], 1)
+
+        with self.app.app_context():
+            self.assertEqual(db.session.get(ServiceTicket, self.ticket_ids[0]).status, "open")
+
+    @contextmanager
+    def concurrent_write_after_load(self, statement):
+        from app.blueprints.service_ticket.batch import TicketBatch
+        load = TicketBatch._load
+        def load_then_race(batch):
+            load(batch)
+            db.session.execute(statement)
+        TicketBatch._load = load_then_race
+        try:
+            yield
+        finally:
+            TicketBatch._load = load
+
+    def test_stale_ticket_fails_the_batch(self):
+        stale_id, other_id = self.ticket_ids[:2]
+        bump = db.update(ServiceTicket).where(ServiceTicket.id == stale_id).values(version = ServiceTicket.version + 1)
+        with self.concurrent_write_after_load(bump):
+            response = self.batch([
+                {"op": "status", "ticket_id": other_id, "status": "completed"},
+                {"op": "status", "ticket_id": stale_id, "status": "completed"},
+            ])
+        self.assertEqual(response.status_code, 409)
+        self.assertIn(str(stale_id), response.get_json()["error"])
+
+        with self.app.app_context():
+            self.assertEqual(ServiceTicket.query.filter_by(status = "completed").count(), 0)
+
+    def test_concurrent_duplicate_assignment_is_a_conflict(self):
+        ticket_id, mechanic_id = self.ticket_ids[0], self.mechanic_ids[2]
+        assign = db.text("INSERT INTO service_ticket_mechanic (service_ticket_id, mechanic_id) VALUES (:t, :m)").bindparams(t = ticket_id, m = mechanic_id)
+        with self.concurrent_write_after_load(assign):
+            response = self.batch([{"op": "assign_mechanic", "ticket_id": ticket_id, "mechanic_id": mechanic_id}])
+        self.assertEqual(response.status_code, 409)
+
+    def test_repair_must_be_a_short_string(self):
+        ticket_id = self.ticket_ids[0]
+        results = self.batch([
+            {"op": "status", "ticket_id": ticket_id, "repair": {"text": "brakes"}},
+            {"op": "status", "ticket_id": ticket_id, "repair": "x" * 501},
+            {"op": "status", "ticket_id": ticket_id, "repair": "Replaced pads"},
+        ]).get_json()["results"]
+        self.assertEqual([result["status"] for result in results], ["error", "error", "applied"])
+        self.assertIn("string", results[0]["error"])
+        self.assertIn("500", results[1]["error"])
+
+    def test_mechanic_limited_to_assigned_tickets(self):
+        response = self.batch([
+            {"op": "status", "ticket_id": self.ticket_ids[0], "status": "in_progress"},
+        ], headers = self.mechanic_headers)
+        result = response.get_json()["results"][0]
+        self.assertEqual(result["status"], "error")
+        self.assertIn("assigned", result["error"])
+
+    def test_rejects_bad_payload(self):
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.app.config["TICKET_BATCH_MAX_OPERATIONS"] = 1
+        operations = [{"op": "status", "ticket_id": ticket_id, "status": "open"} for ticket_id in self.ticket_ids[:2]]
+        self.assertEqual(self.batch(operations).status_code, 400)
+        self.assertEqual(self.client.post("/service-tickets/batch", json = {"operations": []}).status_code, 401)
+
+
+class TicketAccessTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customer = Customer(name = "Access Customer", email = "access@test.com", password = "x")
+            assigned = Mechanic(name = "Assigned", username = "assigned", email = "assigned@test.com", password = "x")
+            outsider = Mechanic(name = "Outsider", username = "outsider", email = "outsider@test.com", password = "x")
+            db.session.add_all([customer, assigned, outsider])
+            db.session.flush()
+
+            ticket = ServiceTicket(description = "Access job", customer_id = customer.id)
+            ticket.mechanics.append(assigned)
+            db.session.add(ticket)
+            db.session.commit()
+
+            self.ticket_id = ticket.id
+            self.assigned_id = assigned.id
+            self.outsider_id = outsider.id
+            self.tokens = {mechanic.id: encode_mechanic_token(mechanic.id) for mechanic in (assigned, outsider)}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def update_status(self, mechanic_id):
+        headers = {"Authorization": f"Bearer {self.tokens[mechanic_id]}"}
+        return self.client.put(f"/service-tickets/{self.ticket_id}/status", json = {"status": "in_progress"}, headers = headers)
+
+    def test_only_assigned_mechanic_can_modify(self):
+        self.assertEqual(self.update_status(self.outsider_id).status_code, 403)
+        self.assertEqual(self.update_status(self.assigned_id).status_code, 200)
+
+    def test_assignment_check_is_memoized_per_request(self):
+        from app.blueprints.service_ticket.access import is_assigned
+
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.test_request_context():
+            event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+            try:
+                self.assertTrue(is_assigned(self.ticket_id, self.assigned_id))
+                self.assertTrue(is_assigned(self.ticket_id, self.assigned_id))
+                self.assertFalse(is_assigned(self.ticket_id, self.outsider_id))
+            finally:
+                event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+        self.assertEqual(len(statements), 2)
+        self.assertIn("EXISTS", statements[0])
+
+
+class TicketCountsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customers = [Customer(name = f"Counts Customer {i}", email = f"counts{i}@test.com", password = "x") for i in range(2)]
+            mechanics = [
+                Mechanic(name = f"Counts Mechanic {i}", username = f"countsmech{i}", email = f"countsmech{i}@test.com", password = "x")
+                for i in range(3)
+            ]
+            db.session.add_all([*customers, *mechanics])
+            db.session.flush()
+
+            statuses = ["open", "open", "completed", "in_progress", "completed", "cancelled"]
+            for i, status in enumerate(statuses):
+                ticket = ServiceTicket(description = f"Counts job {i}", customer_id = customers[i % 2].id, status = status)
+                ticket.mechanics.append(mechanics[0])
+                if status == "completed":
+                    ticket.mechanics.append(mechanics[1])
+                db.session.add(ticket)
+            db.session.commit()
+
+            self.customer_ids = [customer.id for customer in customers]
+            self.mechanic_ids = [mechanic.id for mechanic in mechanics]
+            self.headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_mechanic_count_breaks_down_by_status(self):
+        response = self.client.get(f"/service-tickets/mechanic/{self.mechanic_ids[0]}/count", headers = self.headers)
+        body = response.get_json()
+        self.assertEqual(body["assigned_ticket_count"], 6)
+        self.assertEqual(body["status_counts"], {"open": 2, "in_progress": 1, "completed": 2, "cancelled": 1})
+        self.assertNotIn("tickets", body)
+
+    def test_tickets_are_opt_in_and_paginated(self):
+        url = f"/service-tickets/mechanic/{self.mechanic_ids[0]}/count?include_tickets=true&per_page=4"
+        body = self.client.get(url, headers = self.headers).get_json()
+        self.assertEqual(body["assigned_ticket_count"], 6)
+        self.assertEqual(len(body["tickets"]), 4)
+        self.assertEqual(body["total_pages"], 2)
+
+        body = self.client.get(f"/service-tickets/customer/{self.customer_ids[0]}/count", headers = self.headers).get_json()
+        self.assertEqual(body["ticket_count"], 3)
+        self.assertNotIn("tickets", body)
+
+    def test_batch_counts(self):
+        mechanic_ids = ",".join(str(mechanic_id) for mechanic_id in self.mechanic_ids)
+        customer_ids = ",".join(str(customer_id) for customer_id in self.customer_ids)
+        response = self.client.get(f"/service-tickets/counts?mechanic_ids={mechanic_ids}&customer_ids={customer_ids}", headers = self.headers)
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+
+        mechanics = body["mechanics"]
+        self.assertEqual(mechanics[str(self.mechanic_ids[0])]["total"], 6)
+        self.assertEqual(mechanics[str(self.mechanic_ids[1])]["by_status"]["completed"], 2)
+        self.assertEqual(mechanics[str(self.mechanic_ids[2])]["total"], 0)
+        self.assertEqual(body["customers"][str(self.customer_ids[1])]["by_status"],
+                         {"open": 1, "in_progress": 1, "completed": 0, "cancelled": 1})
+
+    def test_batch_counts_validation(self):
+        self.assertEqual(self.client.get("/service-tickets/counts", headers = self.headers).status_code, 400)
+        self.assertEqual(self.client.get("/service-tickets/counts?mechanic_ids=1,x", headers = self.headers).status_code, 400)
+        self.app.config["TICKET_COUNTS_MAX_IDS"] = 1
+        self.assertEqual(self.client.get("/service-tickets/counts?customer_ids=1,2", headers = self.headers).status_code, 400)
+
+
+class TicketSearchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customer = Customer(name = "Search Customer", email = "search@test.com", password = "x")
+            db.session.add(customer)
+            db.session.flush()
+
+            jobs = [
+                ("Brake squeal at low speed", "Replaced front pads", "1HGCM82633A004352", "completed"),
+                ("Front brake squeal when cold", None, "JH4KA7561PC008269", "open"),
+                ("Oil change", "Noted brake wear", "WDBRF40J43F433412", "completed"),
+                ("Engine squeal on startup", "Belt tensioner", "1FTFW1ET5DFC10312", "open"),
+            ]
+            self.ticket_ids = []
+            for description, repair, vin, status in jobs:
+                ticket = ServiceTicket(description = description, repair = repair, vehicle_id = vin,
+                                       status = status, customer_id = customer.id)
+                db.session.add(ticket)
+                db.session.flush()
+                self.ticket_ids.append(ticket.id)
+            db.session.commit()
+
+            self.headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def search(self, query, status = 200):
+        response = self.client.get(f"/service-tickets/search?{query}", headers = self.headers)
+        self.assertEqual(response.status_code, status)
+        return response.get_json()
+
+    def ids(self, query):
+        return [ticket["id"] for ticket in self.search(query)["tickets"]]
+
+    def test_keywords_ranked_by_relevance(self):
+        ids = self.ids("q=brake squeal")
+        self.assertEqual(set(ids), set(self.ticket_ids[:2]))
+        self.assertEqual(self.ids("q=brake")[-1], self.ticket_ids[2])
+
+    def test_partial_vin(self):
+        self.assertEqual(self.ids("q=JH4KA75"), [self.ticket_ids[1]])
+
+    def test_index_follows_writes(self):
+        self.client.put(f"/service-tickets/{self.ticket_ids[3]}/update", json = {"description": "Transmission slipping"}, headers = self.headers)
+        self.assertEqual(self.ids("q=transmission"), [self.ticket_ids[3]])
+        self.assertEqual(self.ids("q=engine"), [])
+
+        self.client.post("/service-tickets/batch", json = {"operations": [
+            {"op": "status", "ticket_id": self.ticket_ids[0], "repair": "Machined rotors"}
+        ]}, headers = self.headers)
+        self.assertEqual(self.ids("q=rotors"), [self.ticket_ids[0]])
+
+        with self.app.app_context():
+            db.session.delete(db.session.get(ServiceTicket, self.ticket_ids[1]))
+            db.session.commit()
+        self.assertEqual(self.ids("q=JH4KA75"), [])
+
+    def test_pagination_and_filters(self):
+        body = self.search("q=squeal&per_page=2&include_total=true")
+        self.assertEqual(len(body["tickets"]), 2)
+        self.assertTrue(body["has_more"])
+        self.assertEqual(body["total"], 3)
+        self.assertEqual(len(self.search("q=squeal&per_page=2&page=2")["tickets"]), 1)
+        self.assertEqual(self.ids("q=squeal&status=completed"), [self.ticket_ids[0]])
+
+    def test_rejects_empty_query(self):
+        self.search("q=", status = 400)
+        self.search("q=%22%2A", status = 400)
+        self.search("q=brake&status=lost", status = 400)
+
+
+class FastSerializerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        customer = Customer(name = "Serializer Customer", email = "serial@test.com", password = "x", phone = "555")
+        mechanic = Mechanic(name = "Serializer Mechanic", username = "serialmech", email = "serialmech@test.com", password = "x")
+        parts = [Inventory(name = "Serial Part A", price = 12.5, quantity = 3), Inventory(name = "Serial Part B", price = 0.1, quantity = 0)]
+        db.session.add_all([customer, mechanic, *parts])
+        db.session.flush()
+
+        first = ServiceTicket(description = "Serialized job", customer_id = customer.id, vehicle_id = "1HGCM82633A004352", hours_worked = 2)
+        first.mechanics.append(mechanic)
+        first.parts.extend(parts)
+        second = ServiceTicket(description = "Bare job", customer_id = customer.id, status = "completed", hours_worked = None)
+        db.session.add_all([first, second])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def assertSameDump(self, schema, objs):
+        expected = self.app.json.dumps(schema.dump(objs))
+        self.assertEqual(self.app.json.dumps(dump_many(schema, objs)), expected)
+
+    def test_matches_marshmallow_for_list_schemas(self):
+        from app.blueprints.service_ticket.schemas import tickets_schema
+        from app.blueprints.mechanic.schemas import mechanics_schema
+        from app.blueprints.inventory.schemas import inventories_schema
+        from app.blueprints.customer.schemas import customers_schema
+
+        self.assertSameDump(tickets_schema, ServiceTicket.query.all())
+        self.assertSameDump(mechanics_schema, Mechanic.query.all())
+        self.assertSameDump(inventories_schema, Inventory.query.all())
+        self.assertSameDump(customers_schema, Customer.query.all())
+
+    def test_matches_marshmallow_with_only(self):
+        from app.blueprints.service_ticket.schemas import ServiceTicketSchema
+
+        schema = ServiceTicketSchema(many = True, only = ("id", "status", "customer.name", "parts.price"))
+        self.assertSameDump(schema, ServiceTicket.query.all())
+
+    def test_hooked_schema_uses_marshmallow(self):
+        from marshmallow import post_dump
+        from app.blueprints.mechanic.schemas import MechanicSchema
+
+        class ShoutingSchema(MechanicSchema):
+            @post_dump
+            def shout(self, data, **kwargs):
+                data["name"] = data["name"].upper()
+                return data
+
+        dumped = dump_many(ShoutingSchema(many = True), Mechanic.query.all())
+        self.assertEqual(dumped[0]["name"], "SERIALIZER MECHANIC")
+
+class TicketOptimisticLockingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            customer = Customer(name = "Lock Customer", email = "lock@test.com", password = "x")
+            db.session.add(customer)
+            db.session.flush()
+            ticket = ServiceTicket(description = "Lock job", customer_id = customer.id)
+            db.session.add(ticket)
+            db.session.commit()
+            self.ticket_id = ticket.id
+            self.headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def put(self, path, body, if_match = None):
+        headers = dict(self.headers)
+        if if_match is not None:
+            headers["If-Match"] = if_match
+        return self.client.put(f"/service-tickets/{self.ticket_id}/{path}", json = body, headers = headers)
+
+    def test_writes_return_the_new_version(self):
+        etag = self.client.get(f"/service-tickets/{self.ticket_id}", headers = self.headers).headers["ETag"]
+        self.assertEqual(etag, '"1"')
+
+        response = self.put("status", {"status": "in_progress"}, if_match = etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], '"2"')
+        self.assertEqual(response.get_json()["ticket"]["version"], 2)
+
+        response = self.put("update", {"repair": "Replaced pads"}, if_match = '"2"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], '"3"')
+
+    def test_stale_if_match_gets_current_state(self):
+        self.put("status", {"status": "in_progress"})
+
+        response = self.put("update", {"repair": "Based on old copy"}, if_match = '"1"')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.headers["ETag"], '"2"')
+        body = response.get_json()
+        self.assertEqual(body["ticket"]["status"], "in_progress")
+        self.assertIsNone(body["ticket"]["repair"])
+
+    def test_if_match_is_optional_and_validated(self):
+        self.assertEqual(self.put("status", {"status": "completed"}).status_code, 200)
+        self.assertEqual(self.put("status", {"status": "open"}, if_match = "*").status_code, 200)
+        self.assertEqual(self.put("status", {"status": "open"}, if_match = '"latest"').status_code, 400)
+
+
+class TicketConcurrentUpdateTestCase(unittest.TestCase):
+    WRITERS = 24
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        class ConcurrencyConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(self.tmp.name, 'tickets.sqlite3')}"
+            SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": self.WRITERS, "connect_args": {"timeout": 30}}
+
+        CONFIGS["ticket_concurrency"] = ConcurrencyConfig
+        self.addCleanup(CONFIGS.pop, "ticket_concurrency")
+        self.app = create_app("ticket_concurrency")
+
+        with self.app.app_context():
+            customer = Customer(name = "Race Customer", email = "race@test.com", password = "x")
+            db.session.add(customer)
+            db.session.flush()
+            ticket = ServiceTicket(description = "Race job", customer_id = customer.id, hours_worked = 0)
+            db.session.add(ticket)
+            db.session.commit()
+            self.ticket_id = ticket.id
+            self.headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+
+    def run_writers(self, writer):
+        results = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.WRITERS)
+
+        def run(index):
+            client = self.app.test_client()
+            start.wait()
+            outcome = writer(client, index)
+            with lock:
+                results.append(outcome)
+
+        threads = [threading.Thread(target = run, args = (i,)) for i in range(self.WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def current(self):
+        with self.app.app_context():
+            return db.session.get(ServiceTicket, self.ticket_id)
+
+    def test_parallel_updates_from_one_version_have_one_winner(self):
+        def writer(client, index):
+            headers = {**self.headers, "If-Match": '"1"'}
+            response = client.put(f"/service-tickets/{self.ticket_id}/status",
+                                  json = {"status": "in_progress", "repair": f"writer {index}"}, headers = headers)
+            return response.status_code, index
+
+        results = self.run_writers(writer)
+        winners = [index for status, index in results if status == 200]
+        self.assertEqual(len(winners), 1)
+        self.assertEqual(sorted(status for status, _ in results), [200] + [409] * (self.WRITERS - 1))
+
+        ticket = self.current()
+        self.assertEqual(ticket.version, 2)
+        self.assertEqual(ticket.repair, f"writer {winners[0]}")
+
+    def test_retrying_on_conflict_loses_no_update(self):
+        def writer(client, index):
+            response = client.get(f"/service-tickets/{self.ticket_id}", headers = self.headers)
+            ticket, etag = response.get_json(), response.headers["ETag"]
+            conflicts = 0
+            while True:
+                response = client.put(f"/service-tickets/{self.ticket_id}/update", json = {"hours_worked": ticket["hours_worked"] + 1},
+                                      headers = {**self.headers, "If-Match": etag})
+                if response.status_code == 200:
+                    return conflicts
+                self.assertEqual(response.status_code, 409)
+                conflicts += 1
+                ticket, etag = response.get_json()["ticket"], response.headers["ETag"]
+
+        conflicts = self.run_writers(writer)
+        ticket = self.current()
+        self.assertEqual(ticket.hours_worked, self.WRITERS)
+        self.assertEqual(ticket.version, 1 + self.WRITERS)
+        self.assertGreater(sum(conflicts), 0)
+
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
+
+class TicketEventStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["SSE_MAX_DURATION"] = 0.2
+        self.app.config["SSE_HEARTBEAT_INTERVAL"] = 0.05
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+
+            customers = [Customer(name = f"Feed Customer {i}", email = f"feed{i}@test.com", password = "x") for i in range(2)]
+            self.mechanics = [
+                Mechanic(name = f"Feed Mechanic {i}", username = f"feedmech{i}", email = f"feedmech{i}@test.com", password = "x")
+                for i in range(2)
+            ]
+            part = Inventory(name = "Filter", price = 12.0, quantity = 50)
+            db.session.add_all([*customers, *self.mechanics, part])
+            db.session.flush()
+
+            ticket = ServiceTicket(description = "Feed job", customer_id = customers[0].id)
+            ticket.mechanics.append(self.mechanics[0])
+            db.session.add(ticket)
+            db.session.commit()
+
+            self.ticket_id = ticket.id
+            self.part_id = part.id
+            self.customer_ids = [customer.id for customer in customers]
+            self.mechanic_ids = [mechanic.id for mechanic in self.mechanics]
+            self.admin_headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+            self.mechanic_headers = [{"Authorization": f"Bearer {encode_mechanic_token(mechanic_id)}"} for mechanic_id in self.mechanic_ids]
+            self.customer_headers = [{"Authorization": f"Bearer {encode_token(customer_id)}"} for customer_id in self.customer_ids]
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def stream(self, headers, last_event_id = "0"):
+        headers = dict(headers)
+        if last_event_id is not None:
+            headers["Last-Event-ID"] = last_event_id
+        response = self.client.get("/service-tickets/events", headers = headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        return self.frames(response.get_data(as_text = True))
+
+    @staticmethod
+    def frames(body):
+        frames = []
+        for block in body.split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+            if "event" in fields:
+                frames.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+        return frames
+
+    def test_resume_replays_buffered_changes(self):
+        mechanic = self.mechanic_headers[0]
+        self.client.put(f"/service-tickets/{self.ticket_id}/status", json = {"status": "in_progress"}, headers = mechanic)
+        self.client.put(f"/service-tickets/{self.ticket_id}/add-part/{self.part_id}", headers = mechanic)
+
+        frames = self.stream(self.admin_headers)
+        self.assertEqual([(event_id, event_type) for event_id, event_type, _ in frames],
+                         [(1, "ticket.status"), (2, "ticket.part_added")])
+        self.assertEqual(frames[0][2], {"ticket_id": self.ticket_id, "status": "in_progress", "version": 2, "old_status": "open"})
+        self.assertEqual(frames[1][2]["inventory_id"], self.part_id)
+
+        self.assertEqual([frame[0] for frame in self.stream(self.admin_headers, last_event_id = "1")], [2])
+        self.assertEqual(self.stream(self.admin_headers, last_event_id = None), [])
+
+    def test_events_are_filtered_per_viewer(self):
+        self.client.post("/service-tickets/mechanic/create", json = {"customer_id": self.customer_ids[1], "description": "Other job"},
+                         headers = self.mechanic_headers[1])
+        self.client.put(f"/service-tickets/{self.ticket_id}/status", json = {"status": "completed"}, headers = self.mechanic_headers[0])
+
+        def seen(headers):
+            return [(event_type, data["ticket_id"]) for _, event_type, data in self.stream(headers)]
+
+        other_id = seen(self.customer_headers[1])[0][1]
+        self.assertEqual(seen(self.customer_headers[0]), [("ticket.status", self.ticket_id)])
+        self.assertEqual(seen(self.customer_headers[1]), [("ticket.created", other_id)])
+        self.assertEqual(seen(self.mechanic_headers[0]), [("ticket.status", self.ticket_id)])
+        self.assertEqual(seen(self.mechanic_headers[1]), [("ticket.created", other_id)])
+        self.assertEqual(len(seen(self.admin_headers)), 2)
+
+    def test_removed_mechanic_hears_about_it(self):
+        self.client.put(f"/service-tickets/{self.ticket_id}/assign-mechanic/{self.mechanic_ids[1]}", headers = self.admin_headers)
+        self.client.put(f"/service-tickets/{self.ticket_id}/remove-mechanic/{self.mechanic_ids[1]}", headers = self.admin_headers)
+
+        events = [(event_type, data["mechanic_id"]) for _, event_type, data in self.stream(self.mechanic_headers[1])]
+        self.assertEqual(events, [("ticket.assigned", self.mechanic_ids[1]), ("ticket.unassigned", self.mechanic_ids[1])])
+
+    def test_batch_changes_are_published(self):
+        response = self.client.post("/service-tickets/batch", headers = self.admin_headers, json = {"operations": [
+            {"op": "assign_mechanic", "ticket_id": self.ticket_id, "mechanic_id": self.mechanic_ids[1]},
+            {"op": "status", "ticket_id": self.ticket_id, "status": "completed", "hours_worked": 3},
+        ]})
+        self.assertEqual(response.status_code, 200)
+
+        frames = self.stream(self.mechanic_headers[1])
+        self.assertEqual([event_type for _, event_type, _ in frames], ["ticket.assigned", "ticket.status"])
+        self.assertEqual(frames[1][2]["fields"], ["hours_worked", "status"])
+        self.assertEqual(frames[1][2]["status"], "completed")
+
+    def test_reset_when_resume_point_was_dropped(self):
+        from app.events import EventHub
+        hub = self.app.extensions["event_hub"] = EventHub(size = 2)
+        for i in range(5):
+            hub.publish("ticket.updated", {"ticket_id": self.ticket_id})
+
+        self.assertEqual([frame[:2] for frame in self.stream(self.admin_headers, last_event_id = "3")],
+                         [(4, "ticket.updated"), (5, "ticket.updated")])
+        self.assertEqual([frame[:2] for frame in self.stream(self.admin_headers, last_event_id = "1")], [(5, "reset")])
+        self.assertEqual([frame[:2] for frame in self.stream(self.admin_headers, last_event_id = "40")], [(5, "reset")])
+
+        response = self.client.get("/service-tickets/events", headers = {**self.admin_headers, "Last-Event-ID": "latest"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_waiting_stream_wakes_on_publish(self):
+        self.app.config["SSE_MAX_DURATION"] = 5
+        self.app.config["SSE_HEARTBEAT_INTERVAL"] = 5
+        hub = self.app.extensions["event_hub"]
+
+        response = self.client.get("/service-tickets/events", headers = self.admin_headers)
+        publisher = threading.Timer(0.1, hub.publish, args = ("ticket.updated", {"ticket_id": self.ticket_id}))
+        started = datetime.now()
+        publisher.start()
+        try:
+            for chunk in response.response:
+                chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+                if "event: ticket.updated" in chunk:
+                    break
+        finally:
+            response.close()
+            publisher.join()
+
+        self.assertLess((datetime.now() - started).total_seconds(), 2)
+        self.assertEqual(hub.stats()["listeners"], 0)
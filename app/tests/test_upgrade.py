@@ -0,0 +1,94 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+from app import create_app, db, CONFIGS
+from app.config import TestingConfig
+from app.models import Inventory, ServiceTicket
+from app.upgrade import upgrade_schema
+from app.autho.__init__ import encode_mechanic_token
+from app.autho.utils import encode_admin_token
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The tables as the first release created them, before versions, reorder
+# points and prices in cents.
+FIRST_RELEASE_SCHEMA = """
+CREATE TABLE customer (
+    id INTEGER NOT NULL, name VARCHAR(128) NOT NULL, email VARCHAR(128) NOT NULL, phone VARCHAR(32),
+    address VARCHAR(256), password VARCHAR(512) NOT NULL, PRIMARY KEY (id), UNIQUE (email)
+);
+CREATE TABLE inventory (
+    id INTEGER NOT NULL, name VARCHAR(128) NOT NULL, description VARCHAR(256), price FLOAT NOT NULL,
+    quantity INTEGER NOT NULL, PRIMARY KEY (id), UNIQUE (name)
+);
+CREATE TABLE mechanic (
+    id INTEGER NOT NULL, name VARCHAR(128) NOT NULL, username VARCHAR(128) NOT NULL, email VARCHAR(128) NOT NULL,
+    phone VARCHAR(32), address VARCHAR(256), hours_worked INTEGER, password VARCHAR(512) NOT NULL,
+    specialty VARCHAR(128), PRIMARY KEY (id), UNIQUE (username), UNIQUE (email)
+);
+CREATE TABLE service_ticket (
+    id INTEGER NOT NULL, customer_id INTEGER NOT NULL, description TEXT NOT NULL, status VARCHAR(50) NOT NULL,
+    created_at DATETIME NOT NULL, vehicle_id VARCHAR(200), hours_worked INTEGER, repair VARCHAR(500),
+    PRIMARY KEY (id), FOREIGN KEY(customer_id) REFERENCES customer (id)
+);
+CREATE TABLE service_ticket_inventory (
+    service_ticket_id INTEGER NOT NULL, inventory_id INTEGER NOT NULL, PRIMARY KEY (service_ticket_id, inventory_id),
+    FOREIGN KEY(service_ticket_id) REFERENCES service_ticket (id), FOREIGN KEY(inventory_id) REFERENCES inventory (id)
+);
+CREATE TABLE service_ticket_mechanic (
+    service_ticket_id INTEGER NOT NULL, mechanic_id INTEGER NOT NULL, PRIMARY KEY (service_ticket_id, mechanic_id),
+    FOREIGN KEY(service_ticket_id) REFERENCES service_ticket (id), FOREIGN KEY(mechanic_id) REFERENCES mechanic (id)
+);
+INSERT INTO customer (id, name, email, password) VALUES (1, 'Old Customer', 'old@test.com', 'x');
+INSERT INTO mechanic (id, name, username, email, password) VALUES (1, 'Old Mechanic', 'oldmech', 'oldmech@test.com', 'x');
+INSERT INTO inventory (id, name, price, quantity) VALUES (1, 'Old Filter', 12.345, 3), (2, 'Old Belt', 0.285, 0);
+INSERT INTO service_ticket (id, customer_id, description, status, created_at) VALUES (1, 1, 'Old job', 'open', '2024-01-01 00:00:00');
+"""
+
+
+class SchemaUpgradeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        path = os.path.join(self.tmp.name, "first_release.sqlite3")
+        with sqlite3.connect(path) as connection:
+            connection.executescript(FIRST_RELEASE_SCHEMA)
+
+        class FirstReleaseConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+
+        CONFIGS["first_release"] = FirstReleaseConfig
+        self.addCleanup(CONFIGS.pop, "first_release")
+        self.app = create_app("first_release")
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    def test_upgrade_adds_columns_and_converts_prices(self):
+        with self.app.app_context():
+            changes = upgrade_schema()
+            self.assertIn("moved inventory.price to inventory.price_cents", changes)
+            self.assertIn("added service_ticket.version", changes)
+            self.assertIn("created index ix_inventory_low_stock", changes)
+            self.assertEqual(upgrade_schema(), [])
+
+            self.assertEqual([(part.price_cents, part.reorder_point, part.version) for part in Inventory.query.order_by(Inventory.id)],
+                             [(1235, 10, 1), (29, 10, 1)])
+            self.assertEqual(db.session.get(ServiceTicket, 1).version, 1)
+            mechanic_headers = {"Authorization": f"Bearer {encode_mechanic_token(1)}"}
+            admin_headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+
+        response = self.client.post("/inventory/", json = {"name": "New Hose", "price": 8.5, "quantity": 2}, headers = mechanic_headers)
+        self.assertEqual(response.status_code, 201)
+        response = self.client.put("/service-tickets/1/status", json = {"status": "completed"}, headers = admin_headers)
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+from sqlalchemy import inspect, text, CheckConstraint
+from sqlalchemy.schema import AddConstraint
+from app.extensions import db
+from app.models import Inventory, to_cents
+
+# Databases created before a column was added to the models are brought up
+# to date here: the version columns behind optimistic locking and ETags,
+# Inventory.price_cents in place of the old float price, and reorder points.
+# db.create_all only creates missing tables, never the new columns, indexes
+# or constraints of tables that already exist, so each step checks the live
+# schema first and running the upgrade again changes nothing.
+
+# (table, column, column definition) for columns added to existing tables.
+# price_cents is filled from price before the old column is dropped.
+ADDED_COLUMNS = (
+    ('customer', 'version', "INTEGER NOT NULL DEFAULT 1"),
+    ('mechanic', 'version', "INTEGER NOT NULL DEFAULT 1"),
+    ('service_ticket', 'version', "INTEGER NOT NULL DEFAULT 1"),
+    ('inventory', 'version', "INTEGER NOT NULL DEFAULT 1"),
+    ('inventory', 'reorder_point', "INTEGER NOT NULL DEFAULT 10"),
+    ('inventory', 'price_cents', "INTEGER"),
+)
+
+def _columns(connection, table):
+    return {column['name'] for column in inspect(connection).get_columns(table)}
+
+def _has_index(connection, table, name):
+    # SQLite's inspector leaves out expression indexes such as the low-stock one.
+    if connection.dialect.name == 'sqlite':
+        return connection.scalar(text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"), {'name': name}) is not None
+    return inspect(connection).has_index(table, name)
+
+def _move_prices_to_cents(connection):
+    rows = connection.execute(text("SELECT id, price FROM inventory WHERE price_cents IS NULL")).all()
+    if rows:
+        connection.execute(text("UPDATE inventory SET price_cents = :price_cents WHERE id = :id"),
+                           [{'id': part_id, 'price_cents': to_cents(price)} for part_id, price in rows])
+    # SQLite can't add NOT NULL to an existing column; the model still
+    # requires a price on every insert.
+    if connection.dialect.name != 'sqlite':
+        connection.execute(text("ALTER TABLE inventory ALTER COLUMN price_cents SET NOT NULL"))
+    connection.execute(text("ALTER TABLE inventory DROP COLUMN price"))
+
+def upgrade_schema():
+    """Bring an existing database up to the current models, in one
+    transaction. Returns a description of each change made."""
+    changes = []
+    with db.engine.begin() as connection:
+        existing = set(inspect(connection).get_table_names())
+
+        for table, column, definition in ADDED_COLUMNS:
+            if table in existing and column not in _columns(connection, table):
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+                changes.append(f"added {table}.{column}")
+
+        if 'inventory' in existing and 'price' in _columns(connection, 'inventory'):
+            _move_prices_to_cents(connection)
+            changes.append("moved inventory.price to inventory.price_cents")
+
+        # SQLite only takes CHECK constraints when a table is created.
+        if 'inventory' in existing and connection.dialect.name != 'sqlite':
+            named = {constraint['name'] for constraint in inspect(connection).get_check_constraints('inventory')}
+            for constraint in Inventory.__table__.constraints:
+                if isinstance(constraint, CheckConstraint) and constraint.name not in named:
+                    connection.execute(AddConstraint(constraint))
+                    changes.append(f"added constraint {constraint.name}")
+
+        db.metadata.create_all(connection)
+        changes += [f"created table {table}" for table in sorted(set(inspect(connection).get_table_names()) - existing)]
+
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+            for index in table.indexes:
+                if not _has_index(connection, table.name, index.name):
+                    index.create(connection)
+                    changes.append(f"created index {index.name}")
+    return changes
@@ -0,0 +1,170 @@
+import hashlib
+import logging
+from functools import wraps
+from flask import request, make_response
+from sqlalchemy import event, inspect, select, update, insert, text, Sequence
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import db
+from app.models import ChangeCounter, ServiceTicket, Mechanic, Customer, Inventory
+
+# Versioned rows carry a version that goes up with every UPDATE (for
+# ServiceTicket the mapper's version_id_col does this and also guards the
+# UPDATE against stale reads), and every collection has a change count that
+# goes up with any insert, update or delete of its rows. ORM flushes are
+# counted automatically; code that writes with set-based statements (batch
+# edits, stock reservations) calls bump_counters itself. ETags are built
+# from those numbers, so a poll whose If-None-Match still matches is
+# answered 304 after one tiny read, before the endpoint queries or
+# serializes anything.
+#
+# On SQLite the count is a change_counter row updated in the writing
+# transaction; SQLite only lets one transaction write at a time anyway, so
+# the row costs no concurrency. On PostgreSQL that row would be locked
+# until commit by every writer to the collection and serialize them all,
+# so each collection gets a sequence instead: nextval takes no lock and
+# never waits. It is not rolled back with the transaction, so the writer
+# calls it once while writing and once more after commit; either way
+# readers can see the new number before the data, and the second call makes
+# sure the number they end up with is newer than the data they fetched.
+#
+# The ETag is read before the view runs. A write landing in between only
+# means the client gets the newer body under the older tag and refetches
+# once more on its next poll; a stale body is never tagged as current.
+
+logger = logging.getLogger(__name__)
+
+VERSIONED = (ServiceTicket, Mechanic, Customer, Inventory)
+
+COUNTERS = {
+    'service_ticket': 'service_ticket',
+    'service_ticket_mechanic': 'service_ticket',
+    'service_ticket_inventory': 'service_ticket',
+    'mechanic': 'mechanic',
+    'customer': 'customer',
+    'inventory': 'inventory',
+}
+
+# A dumped ticket nests its customer, mechanics and parts.
+TICKET_COUNTERS = ('service_ticket', 'customer', 'mechanic', 'inventory')
+
+SEQUENCES = {name: Sequence(f"change_seq_{name}", metadata = db.metadata) for name in sorted(set(COUNTERS.values()))}
+PENDING_KEY = 'changed_collections'
+
+def _uses_sequences(connection):
+    return connection.dialect.name == 'postgresql'
+
+def _next_values(connection, names):
+    connection.execute(select(*(SEQUENCES[name].next_value() for name in sorted(names))))
+
+def _bump(session, names):
+    connection = session.connection()
+    if _uses_sequences(connection):
+        _next_values(connection, names)
+        session.info.setdefault(PENDING_KEY, set()).update(names)
+        return
+
+    names = sorted(names)
+    table = ChangeCounter.__table__
+    result = connection.execute(
+        update(table).where(table.c.name.in_(names)).values(value = table.c.value + 1)
+    )
+    if result.rowcount < len(names):
+        existing = set(connection.scalars(select(table.c.name).where(table.c.name.in_(names))))
+        connection.execute(insert(table), [{'name': name, 'value': 1} for name in names if name not in existing])
+
+def _touched(session):
+    names = set()
+    for obj in session.new:
+        names.add(COUNTERS.get(obj.__table__.name))
+    for obj in session.deleted:
+        names.add(COUNTERS.get(obj.__table__.name))
+        names.update(COUNTERS.get(rel.secondary.name) for rel in inspect(obj).mapper.relationships if rel.secondary is not None)
+    for obj in session.dirty:
+        if not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        names.add(COUNTERS.get(obj.__table__.name))
+        for rel in state.mapper.relationships:
+            if rel.secondary is not None and state.attrs[rel.key].history.has_changes():
+                names.add(COUNTERS.get(rel.secondary.name))
+    names.discard(None)
+    return names
+
+@event.listens_for(ChangeCounter.__table__, "after_create")
+def _seed_counters(target, connection, **kw):
+    connection.execute(insert(target), [{'name': name, 'value': 0} for name in sorted(set(COUNTERS.values()))])
+
+@event.listens_for(db.session, "before_flush")
+def _bump_row_versions(session, flush_context, instances):
+    for obj in session.dirty:
+        if (isinstance(obj, VERSIONED) and obj.__mapper__.version_id_col is None
+                and session.is_modified(obj, include_collections = False)):
+            obj.version = (obj.version or 0) + 1
+
+@event.listens_for(db.session, "after_flush")
+def _bump_flushed_counters(session, flush_context):
+    names = _touched(session)
+    if names:
+        _bump(session, names)
+
+@event.listens_for(db.session, "after_commit")
+def _bump_committed_sequences(session):
+    names = session.info.pop(PENDING_KEY, None)
+    if not names:
+        return
+    try:
+        with session.get_bind().connect() as connection:
+            _next_values(connection, names)
+    except SQLAlchemyError as e:
+        logger.warning(f"CHANGE_SEQUENCE_BUMP_FAILED: {sorted(names)}: {e}")
+
+@event.listens_for(db.session, "after_rollback")
+def _forget_sequences(session):
+    session.info.pop(PENDING_KEY, None)
+
+def bump_counters(*names):
+    """Count a change made outside the ORM flush, in the current transaction."""
+    _bump(db.session, names)
+
+def collection_versions(*names):
+    """Current change counts for names, in the order given."""
+    if _uses_sequences(db.session.connection()):
+        # Collection names come from COUNTERS, never from the request.
+        values = db.session.execute(text("SELECT " + ", ".join(
+            f"(SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {SEQUENCES[name].name})" for name in names
+        ))).one()
+        return tuple(values)
+
+    rows = db.session.execute(select(ChangeCounter.name, ChangeCounter.value).where(ChangeCounter.name.in_(names)))
+    values = dict(rows.all())
+    return tuple(values.get(name, 0) for name in names)
+
+def row_version(model, row_id):
+    """Version of one row, or None if it does not exist."""
+    return db.session.scalar(select(model.version).where(model.id == row_id))
+
+def conditional(key):
+    """ETag a GET view and answer If-None-Match without running it.
+
+    key receives the view's arguments and returns the versions the response
+    depends on, or None to skip the check (the view then runs as usual).
+    The request path and query string are always part of the tag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def decorated(*args, **kwargs):
+            versions = key(*args, **kwargs)
+            if versions is None:
+                return view(*args, **kwargs)
+
+            etag = hashlib.blake2b(repr((request.path, request.query_string, versions)).encode(), digest_size = 12).hexdigest()
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak = True)
+            return response
+        return decorated
+    return decorator
@@ -0,0 +1,90 @@
+"""Throughput of POST /inventory/import and GET /inventory/export on a
+SQLite file database, next to loading the same rows one POST /inventory/
+at a time.
+
+Builds a supplier price list (100,000 rows by default) as CSV and NDJSON,
+imports it into an empty catalog, imports it again so every row is an
+update, then streams both exports and reports rows/sec and the peak Python
+memory of each export. The one-row-at-a-time baseline only loads the first
+2,000 rows and is extrapolated.
+
+Run with:  python benchmarks/bench_inventory_import.py [row_count]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db, CONFIGS
+from app.config import TestingConfig
+from app.models import Mechanic
+from app.autho import encode_mechanic_token
+
+BASELINE_ROWS = 2000
+
+def price_list(count):
+    return [{"name": f"Supplier Part {i:07d}", "price": f"{(i % 9000) / 100 + 1:.2f}", "quantity": i % 50}
+            for i in range(count)]
+
+def as_csv(rows):
+    return "name,price,quantity\n" + "".join(f"{row['name']},{row['price']},{row['quantity']}\n" for row in rows)
+
+def as_ndjson(rows):
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    path = os.path.join(tempfile.mkdtemp(), "bench_inventory_import.sqlite3")
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+
+    CONFIGS["bench"] = BenchConfig
+    app = create_app("bench")
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        mechanic = Mechanic(name = "Bench Mechanic", username = "benchmech", email = "bench@test.com", password = "x")
+        db.session.add(mechanic)
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {encode_mechanic_token(mechanic.id)}"}
+
+    rows = price_list(count)
+
+    start = time.perf_counter()
+    for row in rows[:BASELINE_ROWS]:
+        response = client.post("/inventory/", json = {"name": f"Baseline {row['name']}", "price": float(row["price"]),
+                                                      "quantity": row["quantity"]}, headers = headers)
+        assert response.status_code == 201
+    rate = BASELINE_ROWS / (time.perf_counter() - start)
+    print(f"{'POST /inventory/':<24} {rate:9.0f} rows/s   ({count / rate:6.1f}s for {count} rows, extrapolated)")
+
+    for label, body, content_type in (("csv insert", as_csv(rows), "text/csv"),
+                                      ("ndjson update", as_ndjson(rows), "application/x-ndjson")):
+        start = time.perf_counter()
+        response = client.post("/inventory/import", data = body, content_type = content_type, headers = headers)
+        elapsed = time.perf_counter() - start
+        summary = response.get_json()
+        assert response.status_code == 200 and summary["rejected"] == 0, summary
+        print(f"{'import ' + label:<24} {count / elapsed:9.0f} rows/s   ({elapsed:6.1f}s, "
+              f"{summary['inserted']} inserted, {summary['updated']} updated)")
+
+    for data_format in ("csv", "ndjson"):
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = client.get(f"/inventory/export?format={data_format}", headers = headers)
+        size = sum(len(chunk) for chunk in response.response)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        response.close()
+        print(f"{'export ' + data_format:<24} {(count + BASELINE_ROWS) / elapsed:9.0f} rows/s   "
+              f"({elapsed:6.1f}s, {size / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
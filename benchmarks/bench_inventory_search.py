@@ -0,0 +1,99 @@
+"""Latency of GET /inventory/search and /inventory/autocomplete against a
+large SQLite catalog, next to the ILIKE '%q%' scan they replaced.
+
+Seeds a temporary database with synthetic part names (500,000 by default)
+built from brands, part types, positions and SKU codes, then times exact,
+partial, misspelled and keystroke-by-keystroke queries through the full
+request path.
+
+Run with:  python benchmarks/bench_inventory_search.py [part_count]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db, CONFIGS
+from app.config import TestingConfig
+from app.models import Inventory
+
+ROUNDS = 20
+BRANDS = ("Bosch", "ACDelco", "Denso", "Motorcraft", "NGK", "Moog", "Monroe", "Gates", "Dayco", "Wagner",
+          "Raybestos", "Brembo", "Akebono", "Champion", "Fram", "Wix", "Mobil", "Castrol", "Valvoline", "Dorman")
+KINDS = ("Brake Pads", "Brake Rotor", "Oil Filter", "Air Filter", "Cabin Filter", "Spark Plug", "Ignition Coil",
+         "Serpentine Belt", "Timing Belt", "Water Pump", "Alternator", "Starter Motor", "Wheel Bearing", "Tie Rod End",
+         "Ball Joint", "Shock Absorber", "Strut Assembly", "Radiator Hose", "Thermostat", "Fuel Pump",
+         "Oxygen Sensor", "Wiper Blade", "Headlight Bulb", "Battery", "Control Arm")
+POSITIONS = ("Front", "Rear", "Left", "Right", "Upper", "Lower", "", "")
+QUERIES = (
+    ("search", "oxygen sensor"),
+    ("search", "bosch brake pads front"),
+    ("search", "brke rotr"),
+    ("search", "moog bal joint"),
+    ("search", "48213"),
+    ("autocomplete", "w"),
+    ("autocomplete", "wa"),
+    ("autocomplete", "wat"),
+    ("autocomplete", "dorman wat"),
+)
+
+def seed(count):
+    rng = random.Random(42)
+    names = set()
+    while len(names) < count:
+        names.add(" ".join(filter(None, (rng.choice(BRANDS), rng.choice(KINDS), rng.choice(POSITIONS),
+                                          f"{rng.randrange(10000, 100000)}-{rng.choice('ABCDEFGHJK')}"))))
+    names = sorted(names)
+    for start in range(0, count, 50000):
+        db.session.execute(db.text("INSERT INTO inventory (name, price_cents, quantity) VALUES (:name, 999, 10)"),
+                           [{"name": name} for name in names[start:start + 50000]])
+    db.session.commit()
+
+def timed(call):
+    call()
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    path = os.path.join(tempfile.mkdtemp(), "bench_inventory_search.sqlite3")
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+
+    CONFIGS["bench"] = BenchConfig
+    app = create_app("bench")
+
+    with app.app_context():
+        start = time.perf_counter()
+        seed(count)
+        print(f"seeded {count} parts in {time.perf_counter() - start:.1f}s")
+
+        def ilike(query):
+            return lambda: Inventory.query.filter(Inventory.name.ilike(f"%{query}%")).limit(10).all()
+
+        for endpoint, query in QUERIES:
+            if endpoint != "search":
+                continue
+            median, p95 = timed(ilike(query))
+            print(f"{'ilike':<13} {query!r:<26} median {median:7.1f} ms   p95 {p95:7.1f} ms")
+
+    client = app.test_client()
+    for endpoint, query in QUERIES:
+        def call():
+            response = client.get(f"/inventory/{endpoint}?q={query}&limit=10")
+            assert response.status_code == 200 and response.get_json(), (endpoint, query)
+        median, p95 = timed(call)
+        top = client.get(f"/inventory/{endpoint}?q={query}&limit=1").get_json()[0]["name"]
+        print(f"{endpoint:<13} {query!r:<26} median {median:7.1f} ms   p95 {p95:7.1f} ms   top: {top}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Rows per second dumping list payloads with marshmallow and with the
+generated serializers in app/serializers.py.
+
+Tickets are dumped with their customer, mechanics and parts nested, the
+shape returned by the ticket list endpoints; mechanics and inventory parts
+are flat. Objects are loaded once so only serialization is timed.
+
+Run with:  python benchmarks/bench_serializers.py [ticket_count]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.orm import selectinload
+from app import create_app, db
+from app.models import Customer, Mechanic, Inventory, ServiceTicket
+from app.serializers import dump_many
+from app.blueprints.service_ticket.schemas import tickets_schema
+from app.blueprints.mechanic.schemas import mechanics_schema
+from app.blueprints.inventory.schemas import inventories_schema
+
+ROUNDS = 5
+
+def seed(count):
+    customers = [Customer(name = f"Customer {i}", email = f"c{i}@bench.com", password = "x", phone = "555-0100") for i in range(50)]
+    mechanics = [Mechanic(name = f"Mechanic {i}", username = f"m{i}", email = f"m{i}@bench.com", password = "x", specialty = "General") for i in range(20)]
+    parts = [Inventory(name = f"Part {i}", description = "Bench part", price = 9.99 + i, quantity = 100) for i in range(40)]
+    db.session.add_all([*customers, *mechanics, *parts])
+    db.session.flush()
+    for i in range(count):
+        ticket = ServiceTicket(description = f"Bench ticket {i}", customer_id = customers[i % 50].id, vehicle_id = f"VIN{i:08d}", hours_worked = i % 7)
+        ticket.mechanics.extend(mechanics[i % 20:i % 20 + 2])
+        ticket.parts.extend(parts[i % 40:i % 40 + 3])
+        db.session.add(ticket)
+    db.session.commit()
+
+def rate(dump, objs):
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        dump(objs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(objs) / best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = create_app("testing")
+
+    with app.app_context():
+        db.create_all()
+        seed(count)
+        payloads = [
+            ("tickets (nested)", tickets_schema, ServiceTicket.query.options(
+                selectinload(ServiceTicket.customer), selectinload(ServiceTicket.mechanics), selectinload(ServiceTicket.parts)).all()),
+            ("mechanics", mechanics_schema, Mechanic.query.all()),
+            ("inventory", inventories_schema, Inventory.query.all()),
+        ]
+
+        for label, schema, objs in payloads:
+            assert app.json.dumps(dump_many(schema, objs)) == app.json.dumps(schema.dump(objs))
+            slow = rate(schema.dump, objs)
+            fast = rate(lambda rows: dump_many(schema, rows), objs)
+            print(f"{label:<18} marshmallow {slow:>10,.0f} rows/s   generated {fast:>10,.0f} rows/s   x{fast / slow:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Latency of GET /service-tickets/search against a large SQLite database.
+
+Seeds a temporary database with synthetic tickets (one million by default),
+then times a handful of keyword and partial-VIN searches through the full
+request path, including ranking, loading and serialization of one page.
+
+Run with:  python benchmarks/bench_ticket_search.py [ticket_count]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db, CONFIGS
+from app.config import TestingConfig
+from app.autho.utils import encode_admin_token
+
+ROUNDS = 20
+# Descriptions are mostly filler drawn from a large vocabulary, with a
+# recognisable complaint in a few percent of tickets, so the queries below
+# match thousands of rows at a million tickets rather than a quarter of them.
+FILLER = [f"w{n}" for n in range(5000)]
+COMPLAINTS = ("brake squeal", "coolant leak", "transmission slipping", "exhaust rattle", "engine misfire",
+              "suspension clunk", "battery drain", "steering vibration", "oil leak", "alternator noise")
+QUERIES = ("brake squeal", "coolant leak", "transmission", "1HGCM82", "rattle exhaust")
+
+def seed(count):
+    rng = random.Random(42)
+    db.session.execute(db.text("INSERT INTO customer (name, email, password) VALUES ('Bench', 'bench@test.com', 'x')"))
+    rows = []
+    for i in range(count):
+        words = rng.choices(FILLER, k = 8)
+        if rng.random() < 0.05:
+            words.insert(rng.randrange(8), rng.choice(COMPLAINTS))
+        rows.append({
+            "description": " ".join(words),
+            "repair": " ".join(rng.choices(FILLER, k = 4)),
+            "vehicle_id": f"{rng.choice(('1HGCM', 'JH4KA', 'WDBRF', '1FTFW'))}{rng.randrange(10**11):011d}",
+            "created_at": datetime(2020, 1, 1),
+        })
+        if len(rows) == 50000:
+            _insert(rows)
+            rows = []
+    if rows:
+        _insert(rows)
+    db.session.commit()
+
+def _insert(rows):
+    db.session.execute(db.text(
+        "INSERT INTO service_ticket (customer_id, description, status, created_at, vehicle_id, hours_worked, repair) "
+        "VALUES (1, :description, 'completed', :created_at, :vehicle_id, 0, :repair)"
+    ), rows)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    path = os.path.join(tempfile.mkdtemp(), "bench_search.sqlite3")
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+
+    CONFIGS["bench"] = BenchConfig
+    app = create_app("bench")
+
+    with app.app_context():
+        start = time.perf_counter()
+        seed(count)
+        print(f"seeded {count} tickets in {time.perf_counter() - start:.1f}s")
+        headers = {"Authorization": f"Bearer {encode_admin_token(1)}"}
+
+    client = app.test_client()
+    for query in QUERIES:
+        client.get(f"/service-tickets/search?q={query}", headers = headers)
+        timings = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            response = client.get(f"/service-tickets/search?q={query}&per_page=20", headers = headers)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+        timings.sort()
+        print(f"{query!r:<26} median {timings[len(timings) // 2]:7.1f} ms   p95 {timings[int(len(timings) * 0.95) - 1]:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import sys
+import time
+from app import create_app
+
+# Folds the stock ledger into snapshots every interval seconds (300 by
+# default). Run it as one process next to the web workers:
+#   python compact_stock_ledger.py [interval_seconds]
+
+app = create_app("production")
+interval = float(sys.argv[1]) if len(sys.argv) > 1 else 300
+compactor = app.extensions["stock_ledger"]
+
+while True:
+    written = compactor.run_once()
+    print(f"Stock ledger compacted: {written} snapshots written.", flush = True)
+    time.sleep(interval)
@@ -1,7 +1,9 @@
-import os
 from app.extensions import db
 
 from app import create_app
+from app.blueprints.service_ticket.search import ensure_search_index
+from app.blueprints.inventory.search import ensure_search_index as ensure_inventory_search_index
+from app.blueprints.inventory.ledger import ensure_stock_ledger
 
 app = create_app("production")
 
@@ -9,4 +11,7 @@ with app.app_context():
     
     #db.drop_all()
 
-    db.create_all()
\ No newline at end of file
+    db.create_all()
+    ensure_search_index()
+    ensure_inventory_search_index()
+    ensure_stock_ledger()
\ No newline at end of file
@@ -1,6 +1,12 @@
 from app import create_app, db
+from app.blueprints.service_ticket.search import ensure_search_index
+from app.blueprints.inventory.search import ensure_search_index as ensure_inventory_search_index
+from app.blueprints.inventory.ledger import ensure_stock_ledger
 
 app = create_app("default")
 with app.app_context():
     db.create_all()
+    ensure_search_index()
+    ensure_inventory_search_index()
+    ensure_stock_ledger()
     print("All tables created successfully.")
@@ -0,0 +1,18 @@
+import sys
+from app import create_app
+from app.upgrade import upgrade_schema
+from app.blueprints.service_ticket.search import ensure_search_index
+from app.blueprints.inventory.search import ensure_search_index as ensure_inventory_search_index
+from app.blueprints.inventory.ledger import ensure_stock_ledger
+
+# Run once before starting a new release against an existing database:
+#   python upgrade_db.py [config_name]
+
+app = create_app(sys.argv[1] if len(sys.argv) > 1 else "production")
+with app.app_context():
+    for change in upgrade_schema():
+        print(change)
+    ensure_search_index()
+    ensure_inventory_search_index()
+    ensure_stock_ledger()
+    print("Database is up to date.")